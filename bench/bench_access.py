@@ -0,0 +1,62 @@
+"""GET /api/gardens/<id> throughput with many parallel readers
+
+Compares in-memory access tracking (flushed in bulk later) against the old
+behaviour of writing last_accessed and committing on every read, emulated
+by flushing the tracker after each request.
+
+    python bench/bench_access.py --readers 8 --requests 200
+"""
+import argparse
+import threading
+import time
+
+import common
+
+def run(clients, garden_id, requests, write_per_read):
+    from model import app, flush_access_times
+    errors = []
+
+    def read(client):
+        for _ in range(requests):
+            rv = client.get(f'/api/gardens/{garden_id}')
+            if rv.status_code != 200:
+                errors.append(rv.status_code)
+            if write_per_read:
+                with app.app_context():
+                    flush_access_times()
+
+    threads = [threading.Thread(target=read, args=(client,)) for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    assert not errors, errors
+    return len(clients) * requests / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per reader')
+    args = parser.parse_args()
+
+    from model import app
+    with app.app_context():
+        common.reset_database()
+    setup = app.test_client()
+    setup.post('/api/register', json={'username': 'bench', 'password': 'benchpass'})
+    setup.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+    garden_id = setup.post('/api/gardens', json={'name': 'Bench', 'sensor_type': 'manual'}).get_json()['garden']['id']
+    clients = []
+    for _ in range(args.readers):
+        client = app.test_client()
+        client.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+        clients.append(client)
+
+    print(f'{args.readers} readers x {args.requests} requests')
+    for label, write_per_read in (('write per read', True), ('tracked in memory', False)):
+        print(f'  {label:>18}: {run(clients, garden_id, args.requests, write_per_read):8.0f} requests/s')
+
+if __name__ == '__main__':
+    main()
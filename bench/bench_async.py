@@ -0,0 +1,121 @@
+"""p50/p99 latency of the dashboard reads on the Flask app and the async FastAPI app
+
+Seeds one database, then serves it from two subprocesses in turn: the Flask
+app on its threaded development server and basic.py under uvicorn. A pool
+of concurrent clients (asyncio + httpx, one shared login cookie) requests
+the garden list, a readings page and a chart series round-robin; latencies
+are reported per endpoint.
+
+    python bench/bench_async.py --clients 32 --requests 2000 --gardens 20 --readings 2000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import common
+
+START = datetime(2026, 1, 1)
+FLASK_SERVER = 'import sys, model; model.app.run(port=int(sys.argv[1]), threaded=True)'
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def seed(gardens, readings):
+    """Create a user with gardens and readings; returns (session cookie, garden ids)"""
+    from model import app
+    with app.app_context():
+        common.reset_database()
+    client = app.test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'benchpass'})
+    client.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+    garden_ids = [client.post('/api/gardens', json={'name': f'Garden {i}', 'sensor_type': 'manual'})
+                        .get_json()['garden']['id'] for i in range(gardens)]
+    batch = [{'garden_id': garden_id, 'moisture_level': 40 + i % 50, 'temperature': 20 + i % 7,
+              'light_intensity': 300 + i % 400, 'timestamp': (START + timedelta(seconds=30 * i)).isoformat()}
+             for garden_id in garden_ids for i in range(readings)]
+    for offset in range(0, len(batch), 5000):
+        rv = client.post('/api/readings/batch', json=batch[offset:offset + 5000])
+        assert rv.status_code == 201, rv.get_json()
+    return client.get_cookie('session').value, garden_ids
+
+def start_server(command, port):
+    process = subprocess.Popen(command, cwd=common.HOST_DIR, env=os.environ.copy(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{command[0]} did not start on port {port}')
+
+async def load(port, cookie, paths, clients, requests):
+    import httpx
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    latencies = {path_name: [] for path_name, _ in paths}
+    counter = iter(range(requests))
+
+    async def worker(client):
+        for i in counter:
+            name, path = paths[i % len(paths)]
+            start = time.perf_counter()
+            rv = await client.get(path)
+            latencies[name].append(time.perf_counter() - start)
+            assert rv.status_code == 200, (path, rv.status_code, rv.text[:200])
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', cookies={'session': cookie},
+                                 limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--gardens', type=int, default=20)
+    parser.add_argument('--readings', type=int, default=2000, help='readings per garden')
+    args = parser.parse_args()
+
+    cookie, garden_ids = seed(args.gardens, args.readings)
+    paths = [('garden list', '/api/gardens')]
+    paths += [('readings page', f'/api/gardens/{garden_id}/readings?limit=100') for garden_id in garden_ids[:4]]
+    paths += [('series', f'/api/gardens/{garden_id}/readings/series?from=2025-12-31T00:00:00&to=2026-01-02T00:00:00'
+                         f'&points=200') for garden_id in garden_ids[:4]]
+
+    print(f'{args.clients} concurrent clients, {args.requests} requests, '
+          f'{args.gardens} gardens x {args.readings} readings')
+    for label, command in (('flask', [sys.executable, '-c', FLASK_SERVER]),
+                           ('fastapi', [sys.executable, '-m', 'uvicorn', 'basic:app', '--log-level', 'warning',
+                                        '--port'])):
+        port = free_port()
+        process = start_server(command + [str(port)], port)
+        try:
+            asyncio.run(load(port, cookie, paths, args.clients, 50))  # warm up
+            latencies, elapsed = asyncio.run(load(port, cookie, paths, args.clients, args.requests))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f'  {label:>8}: {args.requests / elapsed:7.0f} requests/s')
+        for name, values in latencies.items():
+            print(f'    {name:>14}: p50 {percentile(values, 0.5) * 1000:7.1f} ms  '
+                  f'p99 {percentile(values, 0.99) * 1000:7.1f} ms')
+
+if __name__ == '__main__':
+    main()
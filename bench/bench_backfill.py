@@ -0,0 +1,46 @@
+"""Simulated readings per second: backfill_simulation against one simulate_tick per time step
+
+Creates simulated gardens, then fills --days of history at --interval
+seconds with the vectorised, bulk-inserting backfill, and times a few
+steps of the live tick driven by the virtual clock for comparison.
+
+    python bench/bench_backfill.py --gardens 1000 --days 7 --interval 900
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import common
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gardens', type=int, default=1000)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--interval', type=int, default=900, help='seconds between readings')
+    parser.add_argument('--tick-steps', type=int, default=20)
+    args = parser.parse_args()
+
+    from model import app, db, Garden, backfill_simulation, simulate_tick
+    with app.app_context():
+        common.reset_database()
+        user_id, _ = common.create_user_and_garden()
+        db.session.execute(Garden.__table__.insert(), [
+            {'user_id': user_id, 'name': f'Garden {i}', 'sensor_type': ('simulated_basic', 'simulated_full')[i % 2],
+             'location_lon': (i % 360) - 180.0} for i in range(args.gardens)])
+        db.session.commit()
+
+        end = datetime(2026, 1, 1)
+        interval = timedelta(seconds=args.interval)
+        written, elapsed = common.timed(backfill_simulation, end - timedelta(days=args.days), end, interval, seed=1)
+        print(f'{args.gardens} gardens, {args.days:g} days every {args.interval} s')
+        print(f'  {"backfill":>10}: {written:9d} readings in {elapsed:6.1f} s  {written / elapsed:9.0f} readings/s  '
+              f'peak RSS {common.peak_rss_mb():.0f} MiB')
+
+        def ticks():
+            for step in range(args.tick_steps):
+                simulate_tick(now=end + step * interval)
+        _, elapsed = common.timed(ticks)
+        written = args.tick_steps * args.gardens
+        print(f'  {"tick loop":>10}: {written:9d} readings in {elapsed:6.1f} s  {written / elapsed:9.0f} readings/s')
+
+if __name__ == '__main__':
+    main()
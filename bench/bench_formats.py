@@ -0,0 +1,74 @@
+"""Compare CSV, Parquet and Arrow IPC exports of one garden: size, encode time and parse time
+
+    python bench/bench_formats.py --rows 500000
+"""
+import argparse
+import io
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import common
+
+def seed_readings(garden_id, rows):
+    from model import db, PlantReading
+    start = datetime(2023, 1, 1)
+    insert = PlantReading.__table__.insert()
+    batch = []
+    for i in range(rows):
+        batch.append({
+            'garden_id': garden_id,
+            'timestamp': start + timedelta(minutes=i),
+            'moisture_level': 40 + (i % 500) / 10,
+            'temperature': 18 + (i % 120) / 10,
+            'light_intensity': float(i % 1400),
+            'humidity': 50 + (i % 30),
+            'ph_level': 6.5,
+            'notes': '',
+            'is_manual': False
+        })
+        if len(batch) == 10000:
+            db.session.execute(insert, batch)
+            batch = []
+    if batch:
+        db.session.execute(insert, batch)
+    db.session.commit()
+
+def encode(fmt, garden_id):
+    import columnar
+    from model import iter_readings_csv, iter_readings_batches
+    if fmt == 'csv':
+        return ''.join(iter_readings_csv(garden_id)).encode()
+    if fmt == 'parquet':
+        return columnar.write_parquet(iter_readings_batches(garden_id))
+    return b''.join(columnar.iter_arrow_stream(iter_readings_batches(garden_id)))
+
+def parse(fmt, payload):
+    if fmt == 'csv':
+        return pa_csv.read_csv(io.BytesIO(payload)).num_rows
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(payload)).num_rows
+    return pa.ipc.open_stream(payload).read_all().num_rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+    
+    from model import app
+    with app.app_context():
+        common.reset_database()
+        _, garden_id = common.create_user_and_garden()
+        seed_readings(garden_id, args.rows)
+        
+        print(f'{args.rows} readings')
+        for fmt in ('csv', 'parquet', 'arrow'):
+            payload, encode_time = common.timed(encode, fmt, garden_id)
+            parsed, parse_time = common.timed(parse, fmt, payload)
+            assert parsed == args.rows
+            print(f'{fmt:>8}: {len(payload) / 1e6:8.2f} MB  encode {encode_time:6.2f}s  parse {parse_time:6.3f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Compare the streaming bulk CSV importer against the previous ORM-per-row import
+
+Each mode runs in its own subprocess so that peak RSS is measured independently.
+
+    python bench/bench_import.py --rows 200000
+"""
+import argparse
+import csv
+import io
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import common
+
+def build_csv(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['timestamp', 'moisture_level', 'temperature', 'light_intensity', 'humidity', 'notes'])
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        writer.writerow([(start + timedelta(minutes=i)).isoformat(), 40 + i % 50, 20 + i % 7,
+                         500 + i % 900, 55, 'historical'])
+    return output.getvalue().encode()
+
+def legacy_import(garden_id, data):
+    """The pre-streaming importer: decode everything, one ORM object per row, one commit"""
+    from model import db, PlantReading
+    stream = io.StringIO(data.decode('UTF8'), newline=None)
+    imported = 0
+    for row in csv.DictReader(stream):
+        db.session.add(PlantReading(
+            garden_id=garden_id,
+            timestamp=datetime.fromisoformat(row['timestamp']),
+            moisture_level=float(row['moisture_level']),
+            temperature=float(row['temperature']),
+            light_intensity=float(row['light_intensity']),
+            humidity=float(row['humidity']) if row.get('humidity') else None,
+            notes=row.get('notes', ''),
+            is_manual=True
+        ))
+        imported += 1
+    db.session.commit()
+    return imported
+
+def run_mode(mode, rows):
+    from model import app, import_readings_csv
+    with app.app_context():
+        common.reset_database()
+        _, garden_id = common.create_user_and_garden()
+        data = build_csv(rows)
+        baseline_rss = common.peak_rss_mb()
+        if mode == 'legacy':
+            imported, elapsed = common.timed(legacy_import, garden_id, data)
+        else:
+            (imported, _, _), elapsed = common.timed(import_readings_csv, garden_id, io.BytesIO(data))
+        print(f'{mode:>9}: {imported} rows in {elapsed:.2f}s '
+              f'({imported / elapsed:,.0f} rows/s), peak RSS {common.peak_rss_mb():.0f} MiB '
+              f'(+{common.peak_rss_mb() - baseline_rss:.0f} MiB during import)')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--mode', choices=['legacy', 'streaming'])
+    args = parser.parse_args()
+    
+    if args.mode:
+        run_mode(args.mode, args.rows)
+        return
+    for mode in ('legacy', 'streaming'):
+        subprocess.run([sys.executable, __file__, '--rows', str(args.rows), '--mode', mode], check=True)
+
+if __name__ == '__main__':
+    main()
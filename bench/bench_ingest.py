@@ -0,0 +1,76 @@
+"""Readings per second through the single-reading endpoint and the batch ingest endpoint
+
+Posts the same readings, spread over several gardens, once per request to
+POST /api/gardens/<id>/readings and in batches to POST /api/readings/batch
+(as a JSON array and as NDJSON), then through the single-reading endpoint
+again with the write-behind queue enabled (timed until the queue is flushed).
+
+    python bench/bench_ingest.py --readings 2000 --gardens 10 --batch-size 500
+"""
+import argparse
+import json
+import time
+
+import common
+
+def make_readings(garden_ids, count):
+    return [{'garden_id': garden_ids[i % len(garden_ids)], 'moisture_level': 40 + (i % 50),
+             'temperature': 20 + (i % 7), 'light_intensity': 300 + (i % 400), 'humidity': 55}
+            for i in range(count)]
+
+def run_single(client, readings):
+    for reading in readings:
+        rv = client.post(f'/api/gardens/{reading["garden_id"]}/readings', json=reading)
+        assert rv.status_code == 201, rv.get_json()
+
+def run_write_behind(client, readings):
+    from model import app, ingest_queue
+    app.config['INGEST_WRITE_BEHIND'] = True
+    try:
+        for reading in readings:
+            rv = client.post(f'/api/gardens/{reading["garden_id"]}/readings', json=reading)
+            assert rv.status_code == 202, rv.get_json()
+        ingest_queue.stop()
+    finally:
+        app.config['INGEST_WRITE_BEHIND'] = False
+
+def run_batch(client, readings, batch_size, ndjson=False):
+    for offset in range(0, len(readings), batch_size):
+        batch = readings[offset:offset + batch_size]
+        if ndjson:
+            rv = client.post('/api/readings/batch', data='\n'.join(json.dumps(item) for item in batch),
+                             content_type='application/x-ndjson')
+        else:
+            rv = client.post('/api/readings/batch', json=batch)
+        assert rv.status_code == 201 and rv.get_json()['inserted'] == len(batch), rv.get_json()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readings', type=int, default=2000)
+    parser.add_argument('--gardens', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    from model import app
+    with app.app_context():
+        common.reset_database()
+    client = app.test_client()
+    client.post('/api/register', json={'username': 'bench', 'password': 'benchpass'})
+    client.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+    garden_ids = [client.post('/api/gardens', json={'name': f'Gateway {i}', 'sensor_type': 'manual'})
+                        .get_json()['garden']['id'] for i in range(args.gardens)]
+    readings = make_readings(garden_ids, args.readings)
+
+    print(f'{args.readings} readings over {args.gardens} gardens')
+    for label, run in (('single', lambda: run_single(client, readings)),
+                       (f'batch of {args.batch_size}', lambda: run_batch(client, readings, args.batch_size)),
+                       (f'ndjson batch of {args.batch_size}',
+                        lambda: run_batch(client, readings, args.batch_size, ndjson=True)),
+                       ('single, write-behind', lambda: run_write_behind(client, readings))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f'  {label:>22}: {elapsed * 1000:8.1f} ms  {args.readings / elapsed:10.0f} readings/s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compare row and columnar JSON responses for a large readings page, with each encoder
+
+Times GET /api/gardens/<id>/readings?per_page=N in the default row format and
+with ?format=columnar, once through the orjson provider and once through
+Flask's standard json provider, and reports the response size.
+
+    python bench/bench_json.py --rows 10000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import common
+
+def seed(garden_id, rows):
+    from model import db, PlantReading, rebuild_garden_stats
+    start = datetime(2024, 1, 1)
+    db.session.execute(PlantReading.__table__.insert(), [
+        {'garden_id': garden_id, 'timestamp': start + timedelta(minutes=i), 'moisture_level': 40 + (i % 500) / 10,
+         'temperature': 18 + (i % 120) / 10, 'light_intensity': float(i % 1400), 'humidity': 55.0,
+         'ph_level': 6.5, 'notes': None, 'is_manual': False}
+        for i in range(rows)
+    ])
+    rebuild_garden_stats([garden_id])
+    db.session.commit()
+
+def best_of(client, url, params, repeat):
+    times = []
+    for _ in range(repeat):
+        rv, elapsed = common.timed(client.get, url, query_string=params)
+        assert rv.status_code == 200, rv.get_json()
+        times.append(elapsed)
+    return min(times) * 1000, len(rv.data)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from flask.json.provider import DefaultJSONProvider
+    from model import app, db
+    import jsonprovider
+    with app.app_context():
+        common.reset_database()
+        client = app.test_client()
+        client.post('/api/register', json={'username': 'bench', 'password': 'benchpass'})
+        client.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+        garden_id = client.post('/api/gardens', json={'name': 'Bench', 'sensor_type': 'manual'}).get_json()['garden']['id']
+        seed(garden_id, args.rows)
+        db.session.remove()
+
+    url = f'/api/gardens/{garden_id}/readings'
+    print(f'{args.rows} readings in one response')
+    for label, provider in (('orjson', jsonprovider.FastJSONProvider), ('json', DefaultJSONProvider)):
+        app.json = provider(app)
+        for fmt in ('rows', 'columnar'):
+            params = {'per_page': args.rows}
+            if fmt == 'columnar':
+                params['format'] = 'columnar'
+            elapsed, size = best_of(client, url, params, args.repeat)
+            print(f'  {label:>6} {fmt:>8}: {elapsed:7.1f} ms  {size / 1024:8.1f} KiB')
+
+if __name__ == '__main__':
+    main()
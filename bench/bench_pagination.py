@@ -0,0 +1,71 @@
+"""Compare OFFSET pagination against keyset (cursor) pagination of a garden's readings
+
+Times GET /api/gardens/<id>/readings for the first and a deep page in both
+modes; the cursor for the deep page is looked up beforehand.
+
+    python bench/bench_pagination.py --rows 200000 --per-page 100 --deep-page 1000
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import common
+
+def seed(garden_id, rows):
+    from model import db, PlantReading, rebuild_garden_stats
+    start = datetime(2024, 1, 1)
+    insert = PlantReading.__table__.insert()
+    for offset in range(0, rows, 10000):
+        db.session.execute(insert, [
+            {'garden_id': garden_id, 'timestamp': start + timedelta(minutes=i), 'moisture_level': 50.0,
+             'temperature': 20.0, 'light_intensity': 500.0, 'is_manual': False}
+            for i in range(offset, min(rows, offset + 10000))
+        ])
+    rebuild_garden_stats([garden_id])
+    db.session.commit()
+
+def best_of(client, url, params, repeat):
+    times = []
+    for _ in range(repeat):
+        rv, elapsed = common.timed(client.get, url, query_string=params)
+        assert rv.status_code == 200, rv.get_json()
+        times.append(elapsed)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--deep-page', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from model import app, db, PlantReading, encode_cursor
+    with app.app_context():
+        common.reset_database()
+        client = app.test_client()
+        client.post('/api/register', json={'username': 'bench', 'password': 'benchpass'})
+        client.post('/api/login', json={'username': 'bench', 'password': 'benchpass'})
+        garden_id = client.post('/api/gardens', json={'name': 'Bench', 'sensor_type': 'manual'}).get_json()['garden']['id']
+        seed(garden_id, args.rows)
+
+        # Last reading of the page before the deep page, in the endpoint's order
+        previous = PlantReading.query.filter_by(garden_id=garden_id)\
+                                     .order_by(PlantReading.timestamp.desc(), PlantReading.id.desc())\
+                                     .offset((args.deep_page - 1) * args.per_page - 1).first()
+        deep_cursor = encode_cursor(previous)
+        db.session.remove()
+
+    url = f'/api/gardens/{garden_id}/readings'
+    print(f'{args.rows} readings, {args.per_page} per page')
+    for label, page in (('page 1', 1), (f'page {args.deep_page}', args.deep_page)):
+        offset_ms = best_of(client, url, {'page': page, 'per_page': args.per_page}, args.repeat)
+        cursor_params = {'limit': args.per_page}
+        if page > 1:
+            cursor_params['after'] = deep_cursor
+        cursor_ms = best_of(client, url, cursor_params, args.repeat)
+        total_ms = best_of(client, url, dict(cursor_params, with_total=1), args.repeat)
+        print(f'  {label:>10}: offset {offset_ms:7.1f} ms   cursor {cursor_ms:7.1f} ms   '
+              f'cursor + cached total {total_ms:7.1f} ms')
+
+if __name__ == '__main__':
+    main()
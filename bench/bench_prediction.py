@@ -0,0 +1,55 @@
+"""Time next-watering predictions for many gardens
+
+Compares the vectorised batch engine against calling the per-garden
+predictor in a Python loop, and the previous first-minus-last heuristic.
+
+    python bench/bench_prediction.py --gardens 10000 --readings 20
+"""
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import common
+from prediction import predict_watering, predict_watering_batch
+
+def synthetic_readings(gardens, readings, now):
+    rng = np.random.default_rng(0)
+    ages = np.linspace(7, 0, readings)
+    timestamps = [now - timedelta(days=float(age)) for age in ages]
+    rates = rng.uniform(1, 10, gardens)
+    moisture = 30 + rates[:, None] * ages[None, :] + rng.normal(0, 1, (gardens, readings))
+    return timestamps, moisture
+
+def legacy_prediction(moisture_values, threshold):
+    daily_decline = (moisture_values[0] - moisture_values[-1]) / len(moisture_values)
+    return max(0, (moisture_values[-1] - threshold) / max(daily_decline, 1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gardens', type=int, default=10000)
+    parser.add_argument('--readings', type=int, default=20)
+    args = parser.parse_args()
+    
+    now = datetime.utcnow()
+    timestamps, moisture = synthetic_readings(args.gardens, args.readings, now)
+    thresholds = {garden_id: 30 for garden_id in range(args.gardens)}
+    
+    garden_ids = np.repeat(np.arange(args.gardens), args.readings)
+    flat_timestamps = np.tile(np.array(timestamps, dtype='datetime64[us]'), args.gardens)
+    _, batch_time = common.timed(predict_watering_batch, garden_ids, flat_timestamps,
+                                 moisture.ravel(), thresholds, now=now, smoothing=0.5)
+    
+    def loop():
+        return [predict_watering(timestamps, row, 30, now=now, smoothing=0.5) for row in moisture]
+    _, loop_time = common.timed(loop)
+    
+    _, legacy_time = common.timed(lambda: [legacy_prediction(row.tolist(), 30) for row in moisture])
+    
+    print(f'{args.gardens} gardens x {args.readings} readings')
+    print(f'  batch (vectorised): {batch_time * 1000:8.1f} ms')
+    print(f'  per-garden loop:    {loop_time * 1000:8.1f} ms')
+    print(f'  legacy heuristic:   {legacy_time * 1000:8.1f} ms (index-based, ignores timestamps)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Time one simulation tick against the number of simulated gardens
+
+Compares the batched tick (one latest-readings query, one bulk INSERT, one
+rollup UPDATE) against the previous loop issuing a query, an ORM insert and
+a prune query per garden. Each garden is seeded with some history so the
+latest-reading lookups and pruning work against a realistic table.
+
+    python bench/bench_simulation.py --gardens 100 1000 --history 200
+    python bench/bench_simulation.py --gardens 10000 --skip-legacy
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import common
+
+def seed(gardens, history):
+    from model import db, User, Garden, PlantReading, rebuild_garden_stats
+    user = User(username='bench', password='x')
+    db.session.add(user)
+    db.session.flush()
+    db.session.execute(Garden.__table__.insert(), [
+        {'user_id': user.id, 'name': f'Garden {i}', 'sensor_type': 'simulated_basic'} for i in range(gardens)
+    ])
+    garden_ids = [garden_id for (garden_id,) in db.session.query(Garden.id).all()]
+    start = datetime.utcnow() - timedelta(minutes=history)
+    for garden_id in garden_ids:
+        db.session.execute(PlantReading.__table__.insert(), [
+            {'garden_id': garden_id, 'timestamp': start + timedelta(minutes=i), 'moisture_level': 60.0,
+             'temperature': 20.0, 'light_intensity': 500.0, 'is_manual': False} for i in range(history)
+        ])
+    rebuild_garden_stats()
+    db.session.commit()
+
+def legacy_tick():
+    """The pre-batching tick: per garden a latest query, an ORM insert and an offset(1000) prune"""
+    from model import db, Garden, PlantReading, rebuild_garden_stats, record_garden_readings
+    pruned = []
+    for garden in Garden.query.filter(Garden.sensor_type.like('simulated%')).all():
+        latest = PlantReading.query.filter_by(garden_id=garden.id)\
+                                   .order_by(PlantReading.timestamp.desc()).first()
+        reading = PlantReading(
+            garden_id=garden.id,
+            moisture_level=max(0, min(100, latest.moisture_level - random.uniform(0.5, 2.0))),
+            temperature=latest.temperature + random.uniform(-2, 2),
+            light_intensity=latest.light_intensity + random.uniform(-50, 50),
+            is_manual=False,
+            timestamp=datetime.utcnow()
+        )
+        db.session.add(reading)
+        db.session.flush()
+        record_garden_readings(garden.id, [reading])
+        old_readings = PlantReading.query.filter_by(garden_id=garden.id)\
+                                         .order_by(PlantReading.timestamp.desc()).offset(1000).all()
+        for old_reading in old_readings:
+            db.session.delete(old_reading)
+        if old_readings:
+            pruned.append(garden.id)
+    db.session.flush()
+    rebuild_garden_stats(pruned)
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--gardens', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--history', type=int, default=200, help='readings seeded per garden')
+    parser.add_argument('--ticks', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    from model import app, db, simulate_tick
+    print(f'{"gardens":>8} {"batched tick":>14} {"legacy tick":>14}')
+    with app.app_context():
+        for gardens in args.gardens:
+            common.reset_database()
+            seed(gardens, args.history)
+            batched = min(common.timed(simulate_tick)[1] for _ in range(args.ticks))
+            legacy = '-'
+            if not args.skip_legacy:
+                legacy = f'{common.timed(legacy_tick)[1] * 1000:11.1f} ms'
+            db.session.remove()
+            print(f'{gardens:>8} {batched * 1000:11.1f} ms {legacy:>14}')
+
+if __name__ == '__main__':
+    main()
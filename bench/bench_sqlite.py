@@ -0,0 +1,122 @@
+"""Concurrent load on SQLite with the "default" and "tuned" database profiles
+
+Each profile gets a fresh database file and an engine from the shared
+factory in database.py. Writer threads insert readings one per
+transaction (like the single-reading endpoint), updater threads read a
+garden and then write it in the same transaction (like update_garden),
+and reader threads run the per-garden aggregate behind the dashboards.
+Reports committed writes per second, reads per second and how many
+operations failed with "database is locked".
+
+    python bench/bench_sqlite.py --writers 4 --updaters 2 --readers 4 --seconds 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+# Engines come straight from database.py; the app (and common's default database) is not needed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+def make_engine(profile):
+    import database
+    fd, path = tempfile.mkstemp(suffix='.db', prefix=f'bench_{profile}_')
+    os.close(fd)
+    return database.make_engine(f'sqlite:///{path}', profile)
+
+def seed(engine, gardens):
+    from model import db, Garden, User
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{'username': 'bench', 'password': 'x'}])
+        connection.execute(Garden.__table__.insert(),
+                           [{'user_id': 1, 'name': f'Garden {i}', 'sensor_type': 'manual'} for i in range(gardens)])
+
+def run(engine, args):
+    from model import Garden, PlantReading
+    readings, gardens = PlantReading.__table__, Garden.__table__
+    counts = {'writes': 0, 'updates': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def attempt(key, operation):
+        try:
+            operation()
+            count(key)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            count('locked')
+
+    def writer(worker):
+        def write():
+            with engine.begin() as connection:
+                connection.execute(readings.insert(), {
+                    'garden_id': worker % args.gardens + 1, 'timestamp': datetime.utcnow(), 'moisture_level': 50.0,
+                    'temperature': 20.0, 'light_intensity': 500.0, 'is_manual': False})
+        while time.perf_counter() < deadline:
+            attempt('writes', write)
+
+    def updater(worker):
+        def update():
+            with engine.begin() as connection:
+                garden_id = worker % args.gardens + 1
+                connection.execute(select(gardens.c.name).where(gardens.c.id == garden_id)).scalar()
+                connection.execute(gardens.update().where(gardens.c.id == garden_id)
+                                              .values(last_accessed=datetime.utcnow()))
+        while time.perf_counter() < deadline:
+            attempt('updates', update)
+
+    def reader(worker):
+        def read():
+            with engine.connect() as connection:
+                connection.execute(select(readings.c.garden_id, func.count(), func.avg(readings.c.moisture_level))
+                                   .group_by(readings.c.garden_id)).all()
+        while time.perf_counter() < deadline:
+            attempt('reads', read)
+
+    threads = [threading.Thread(target=target, args=(i,))
+               for target, number in ((writer, args.writers), (updater, args.updaters), (reader, args.readers))
+               for i in range(number)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+    return counts, elapsed, journal_mode
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--updaters', type=int, default=2)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--gardens', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{args.writers} writers, {args.updaters} read-then-write updaters, {args.readers} readers, '
+          f'{args.seconds:g} s per profile')
+    for profile in ('default', 'tuned'):
+        engine = make_engine(profile)
+        seed(engine, args.gardens)
+        counts, elapsed, journal_mode = run(engine, args)
+        print(f'  {profile:>8} ({journal_mode:>6}): {counts["writes"] / elapsed:7.0f} writes/s  '
+              f'{counts["updates"] / elapsed:6.0f} updates/s  {counts["reads"] / elapsed:6.0f} reads/s  '
+              f'{counts["locked"]:5d} "database is locked"')
+        engine.dispose()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Weather lookups per second: a fresh requests.get per lookup vs the cached, pooled WeatherService
+
+Serves a stub OpenWeatherMap on localhost with a fixed upstream latency,
+then has several threads look up a small set of locations (as many users
+of the same towns would), first the old way and then through one
+WeatherService. Reports throughput, upstream requests and hit ratio.
+Then seeds gardens scattered around a few towns, prefetches their weather
+and polls GET /api/weather?garden_id= for each, counting upstream requests.
+
+    python bench/bench_weather.py --threads 8 --lookups 200 --locations 10 --latency-ms 50
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import common
+
+def start_stub(latency):
+    counter = {'requests': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            counter['requests'] += 1
+            time.sleep(latency)
+            body = json.dumps({'main': {'temp': 20.0}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/weather', counter
+
+def run(lookup, args):
+    def worker(worker_id):
+        for i in range(args.lookups):
+            lookup(f'Town {(worker_id + i) % args.locations}')
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return args.threads * args.lookups / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--lookups', type=int, default=200, help='lookups per thread')
+    parser.add_argument('--locations', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--gardens', type=int, default=200)
+    parser.add_argument('--polls', type=int, default=5, help='weather polls per garden')
+    args = parser.parse_args()
+
+    from weather import WeatherService
+    server, url, counter = start_stub(args.latency_ms / 1000)
+
+    def uncached(location):
+        requests.get(url, params={'q': location, 'appid': 'key', 'units': 'metric'}).json()
+
+    service = WeatherService('key', url=url)
+
+    print(f'{args.threads} threads x {args.lookups} lookups over {args.locations} locations, '
+          f'{args.latency_ms:g} ms upstream latency')
+    for label, lookup in (('requests.get', uncached), ('WeatherService', service.current)):
+        counter['requests'] = 0
+        rate = run(lookup, args)
+        print(f'  {label:>14}: {rate:9.0f} lookups/s  {counter["requests"]:5d} upstream requests')
+    stats = service.stats()
+    print(f'  hit ratio {stats["hit_ratio"]}, {stats["coalesced"]} coalesced, '
+          f'upstream mean {stats["upstream_seconds"]["mean"] * 1000:.1f} ms')
+
+    counter['requests'] = 0
+    rate, cells = run_prefetch(url, args)
+    print(f'  {args.gardens} gardens in {cells} grid cells, {args.polls} polls each: {counter["requests"]} upstream '
+          f'requests, {rate:.0f} polls/s served from stored weather')
+    server.shutdown()
+
+def run_prefetch(url, args):
+    os.environ['WEATHER_API_KEY'] = 'key'
+    os.environ['WEATHER_API_URL'] = url
+    from model import app, db, Garden, prefetch_weather
+    with app.app_context():
+        common.reset_database()
+        user_id, _ = common.create_user_and_garden()
+        towns = [(-33.92, 18.42), (-26.20, 28.04), (-29.86, 31.03), (-25.75, 28.19)]
+        # Gardens within a few hundred metres of a town centre share its grid cell
+        db.session.add_all(Garden(user_id=user_id, name=f'Garden {i}', sensor_type='manual',
+                                  location_lat=towns[i % 4][0] + (i % 7) * 0.0005,
+                                  location_lon=towns[i % 4][1] - (i % 5) * 0.0005)
+                           for i in range(args.gardens))
+        db.session.commit()
+        garden_ids = [garden_id for garden_id, in db.session.query(Garden.id).filter(Garden.location_lat.isnot(None))]
+        cells = prefetch_weather()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    started = time.perf_counter()
+    for _ in range(args.polls):
+        for garden_id in garden_ids:
+            assert client.get(f'/api/weather?garden_id={garden_id}').status_code == 200
+    return len(garden_ids) * args.polls / (time.perf_counter() - started), cells
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Shared setup for the benchmark scripts in this directory
+
+Importing this module points the Flask app at a fresh temporary SQLite
+database (unless DATABASE_URL is already set) and puts host/ on sys.path,
+so each benchmark can simply `from common import ...` and `import model`.
+"""
+import os
+import sys
+import tempfile
+import time
+import resource
+
+HOST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host')
+sys.path.insert(0, HOST_DIR)
+
+if 'DATABASE_URL' not in os.environ:
+    _fd, _path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+    os.close(_fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{_path}'
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB (Linux reports KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timed(func, *args, **kwargs):
+    """Run func once and return (result, elapsed_seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def reset_database():
+    """Drop and recreate every table (call inside an app context)"""
+    from model import db
+    db.drop_all()
+    db.create_all()
+
+def create_user_and_garden(username='bench', sensor_type='manual'):
+    """Create a user with one garden and return (user_id, garden_id)"""
+    from model import db, User, Garden
+    user = User(username=username, password='x')
+    db.session.add(user)
+    db.session.flush()
+    garden = Garden(user_id=user.id, name=f'{username} garden', sensor_type=sensor_type)
+    db.session.add(garden)
+    db.session.commit()
+    return user.id, garden.id
@@ -0,0 +1,39 @@
+"""In-memory record of when gardens were last accessed, flushed to the database in bulk
+
+Reads only note the time here; a periodic job drains the pending times and
+writes them with one UPDATE, so viewing a garden never takes a write lock.
+Until then, pending(garden_id) lets responses show the recorded time.
+"""
+import threading
+
+class AccessTracker:
+    def __init__(self):
+        self._pending = {}  # garden_id -> latest access time
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, garden_ids, when):
+        with self._lock:
+            for garden_id in garden_ids:
+                current = self._pending.get(garden_id)
+                if current is None or when > current:
+                    self._pending[garden_id] = when
+
+    def pending(self, garden_id):
+        return self._pending.get(garden_id)
+
+    def drain(self):
+        """Take every pending access time as {garden_id: time}"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending):
+        """Put back times from a failed flush, keeping any newer ones recorded since"""
+        with self._lock:
+            for garden_id, when in pending.items():
+                current = self._pending.get(garden_id)
+                if current is None or when > current:
+                    self._pending[garden_id] = when
@@ -1,11 +1,177 @@
-from fastapi import FastAPI
-from database import Base, engine
+"""Async read API for the dashboards: gardens, readings, series and predictions
 
-# Create all database tables
-Base.metadata.create_all(bind=engine)
+Runs on an event loop (uvicorn basic:app) over SQLAlchemy's asyncio engine
+(see database.get_async_engine), so a request waiting on the database or a
+slow client holds no worker thread. Tables, query builders and the
+prediction cache are those of the Flask app in model.py, and so is the
+login: requests carry the Flask session cookie, or a bearer access token
+from POST /api/token. Writes stay on the Flask app; responses have the
+same shape as its GET endpoints.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from itsdangerous import BadSignature
+from jose import JWTError
+from sqlalchemy import select, tuple_
+
+import database
+import model
+import security
+from cache import MISSING
+from model import Garden, PlantReading, User
+from prediction import predict_watering_batch
+from schemas import GardenDetail, GardenList, PredictionOut, ReadingSeries, ReadingsPage
 
 app = FastAPI(title="C_Gardens API")
 
+@app.exception_handler(HTTPException)
+async def http_error(request, exc):
+    # Same error body as the Flask app
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
 @app.get("/")
 def read_root():
     return {"Welcome": "C_Gardens API"}
+
+def current_user_id(request: Request):
+    """Id of the user logged in to the Flask app (its signed session cookie) or of a bearer access token"""
+    token = security.bearer_token(request.headers.get('Authorization'))
+    if token:
+        try:
+            claims = security.decode_access_token(token)
+        except JWTError:
+            claims = {}
+        if claims.get('scope') == security.ACCESS_SCOPE:
+            return int(claims['sub'])
+        raise HTTPException(status_code=401, detail='Invalid or expired token')
+
+    flask_app = model.app
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if cookie and serializer is not None:
+        try:
+            session = serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            session = {}
+        if session.get('_user_id') is not None:
+            return int(session['_user_id'])
+    raise HTTPException(status_code=401, detail='Authentication required')
+
+def naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+async def load_garden(session, garden_id, user_id):
+    """The user's garden with its rollup joined in; 404 if it is not theirs"""
+    result = await session.execute(select(Garden).where(Garden.id == garden_id, Garden.user_id == user_id))
+    garden = result.unique().scalar_one_or_none()
+    if garden is None:
+        raise HTTPException(status_code=404, detail='Garden not found')
+    return garden
+
+async def check_garden(session, garden_id, user_id):
+    result = await session.execute(select(Garden.id).where(Garden.id == garden_id, Garden.user_id == user_id))
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail='Garden not found')
+
+async def garden_summaries(session, gardens):
+    """(latest_reading, readings_count) for gardens without a rollup, like model.get_garden_summaries"""
+    summaries = {garden.id: (None, 0) for garden in gardens if garden.stats is None}
+    if summaries:
+        for reading, readings_count in await session.execute(model.garden_summaries_query(list(summaries))):
+            summaries[reading.garden_id] = (reading, readings_count)
+    return summaries
+
+@app.get('/api/gardens', response_model=GardenList)
+async def get_gardens(user_id: int = Depends(current_user_id), session=Depends(database.get_async_db)):
+    result = await session.execute(select(Garden).where(Garden.user_id == user_id))
+    gardens = result.unique().scalars().all()
+    summaries = await garden_summaries(session, gardens)
+    return {'gardens': [garden.to_dict(summaries.get(garden.id)) for garden in gardens]}
+
+@app.get('/api/gardens/{garden_id}', response_model=GardenDetail)
+async def get_garden(garden_id: int, user_id: int = Depends(current_user_id),
+                     session=Depends(database.get_async_db)):
+    garden = await load_garden(session, garden_id, user_id)
+    summaries = await garden_summaries(session, [garden])
+    model.record_access([garden.id])
+    return {'garden': garden.to_dict(summaries.get(garden.id))}
+
+@app.get('/api/gardens/{garden_id}/readings', response_model=ReadingsPage)
+async def get_garden_readings(garden_id: int,
+                              limit: int = Query(model.READINGS_DEFAULT_LIMIT, ge=1, le=model.READINGS_MAX_LIMIT),
+                              after: Optional[str] = None,
+                              user_id: int = Depends(current_user_id), session=Depends(database.get_async_db)):
+    """Newest readings first, a page at a time: pass next_cursor back as `after`"""
+    await check_garden(session, garden_id, user_id)
+    try:
+        cursor = model.parse_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = select(*[getattr(PlantReading, field) for field in model.READING_FIELDS])\
+              .where(PlantReading.garden_id == garden_id)
+    if cursor is not None:
+        query = query.where(tuple_(PlantReading.timestamp, PlantReading.id) < cursor)
+    rows = (await session.execute(query.order_by(PlantReading.timestamp.desc(), PlantReading.id.desc())
+                                       .limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = model.encode_cursor(rows[-1])
+    return {
+        'readings': [dict(zip(model.READING_FIELDS, row)) for row in rows],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
+
+@app.get('/api/gardens/{garden_id}/readings/series', response_model=ReadingSeries)
+async def get_garden_reading_series(garden_id: int,
+                                    start: Optional[datetime] = Query(None, alias='from'),
+                                    end: Optional[datetime] = Query(None, alias='to'),
+                                    points: int = Query(model.SERIES_DEFAULT_POINTS, ge=1, le=model.SERIES_MAX_POINTS),
+                                    user_id: int = Depends(current_user_id), session=Depends(database.get_async_db)):
+    await check_garden(session, garden_id, user_id)
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - model.SERIES_DEFAULT_RANGE
+    if start >= end:
+        raise HTTPException(status_code=400, detail='from must be before to')
+
+    slice_seconds, queries = model.reading_series_queries(garden_id, start, end, points, session.bind.dialect.name)
+    slices = {}
+    for query in queries:
+        model.fold_series_rows(slices, await session.execute(query), points)
+    return model.series_payload(start, end, slice_seconds, slices)
+
+@app.get('/api/gardens/{garden_id}/prediction', response_model=PredictionOut, response_model_exclude_none=True)
+async def get_prediction(garden_id: int, smoothing: Optional[float] = Query(None, gt=0, le=1),
+                         user_id: int = Depends(current_user_id), session=Depends(database.get_async_db)):
+    garden = await load_garden(session, garden_id, user_id)
+    threshold = (await session.execute(select(User.moisture_threshold).where(User.id == user_id))).scalar_one()
+
+    # Shares model.prediction_cache (and its keys) with the Flask endpoints
+    if garden.stats is not None:
+        latest_reading_id = garden.stats.latest_reading_id
+    else:
+        latest_reading = (await garden_summaries(session, [garden]))[garden.id][0]
+        latest_reading_id = latest_reading.id if latest_reading else None
+    key = (garden.id, latest_reading_id, threshold, smoothing)
+    prediction = model.prediction_cache.get(key)
+    if prediction is MISSING:
+        now = datetime.utcnow()
+        rows = (await session.execute(model.prediction_readings_query([garden.id], now - model.PREDICTION_WINDOW))).all()
+        ids, timestamps, moisture = tuple(zip(*rows)) if rows else ([], [], [])
+        prediction = predict_watering_batch(ids, timestamps, moisture, {garden.id: threshold},
+                                            now=now, smoothing=smoothing).get(garden.id)
+        model.prediction_cache.set(key, prediction)
+
+    if prediction is None:
+        return {
+            'next_watering_estimate': 'Not enough data',
+            'recommendation': 'Add more readings to get predictions'
+        }
+    return prediction
@@ -0,0 +1,149 @@
+"""Column-oriented (Apache Arrow / Parquet) encoding of plant readings
+
+Rows come in as tuples in EXPORT_COLUMNS order, straight from a database
+cursor, and are transposed into Arrow record batches without building a
+dict per reading. The same schema is used to read uploads back in.
+"""
+import io
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+READING_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('moisture_level', pa.float64()),
+    ('temperature', pa.float64()),
+    ('light_intensity', pa.float64()),
+    ('humidity', pa.float64()),
+    ('ph_level', pa.float64()),
+    ('notes', pa.string()),
+    ('is_manual', pa.bool_()),
+])
+
+MIMETYPES = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# File signature of the Arrow IPC file (random access) format
+ARROW_FILE_MAGIC = b'ARROW1'
+
+def format_for_filename(filename):
+    """Guess an upload's format from its extension, or None if unsupported"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return 'csv'
+    if extension in ('parquet', 'pq'):
+        return 'parquet'
+    if extension in ('arrow', 'arrows', 'ipc', 'feather'):
+        return 'arrow'
+    return None
+
+def record_batches(partitions, schema=READING_SCHEMA):
+    """Transpose lists of row tuples into Arrow record batches"""
+    for rows in partitions:
+        if not rows:
+            continue
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        )
+
+def write_parquet(batches, schema=READING_SCHEMA):
+    """Encode record batches as a single Parquet file and return its bytes"""
+    sink = pa.BufferOutputStream()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def iter_arrow_stream(batches, schema=READING_SCHEMA):
+    """Encode record batches in the Arrow IPC streaming format, yielding bytes as they are ready"""
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    # Closing the writer appends the end-of-stream marker
+    yield sink.getvalue()
+
+def read_batches(stream, fmt, batch_size):
+    """Iterate record batches from a Parquet or Arrow IPC (file or stream) upload"""
+    try:
+        if fmt == 'parquet':
+            yield from pq.ParquetFile(stream).iter_batches(batch_size=batch_size)
+            return
+        if fmt == 'arrow':
+            head = stream.read(len(ARROW_FILE_MAGIC))
+            stream.seek(0)
+            if head == ARROW_FILE_MAGIC:
+                reader = pa.ipc.open_file(stream)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i)
+            else:
+                yield from pa.ipc.open_stream(stream)
+            return
+    except pa.ArrowException as e:
+        raise ValueError(f'Invalid {fmt} file: {e}')
+    raise ValueError(f'Unsupported format: {fmt}')
+
+def _is_numeric(column_type):
+    return pa.types.is_integer(column_type) or pa.types.is_floating(column_type) or pa.types.is_decimal(column_type)
+
+def _is_string(column_type):
+    return pa.types.is_string(column_type) or pa.types.is_large_string(column_type)
+
+# Upload column types that convert to READING_SCHEMA's, with how to describe them in errors
+UPLOAD_TYPES = {
+    'timestamp': (pa.types.is_timestamp, 'a timestamp'),
+    'moisture_level': (_is_numeric, 'numeric'),
+    'temperature': (_is_numeric, 'numeric'),
+    'light_intensity': (_is_numeric, 'numeric'),
+    'humidity': (_is_numeric, 'numeric'),
+    'ph_level': (_is_numeric, 'numeric'),
+    'notes': (_is_string, 'a string'),
+    'is_manual': (pa.types.is_boolean, 'a boolean'),
+}
+
+def check_schema(schema, required):
+    """Raise ValueError unless an upload's schema has the required columns, with types readings can hold
+    
+    Checked before anything is written, so a file cannot fail halfway on a
+    column of the wrong type. Unknown columns are ignored; an all-null
+    column is accepted for any field.
+    """
+    missing = [name for name in required if name not in schema.names]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    for name, (is_accepted, description) in UPLOAD_TYPES.items():
+        if name in schema.names:
+            column_type = schema.field(name).type
+            if not (pa.types.is_null(column_type) or is_accepted(column_type)):
+                raise ValueError(f'Column {name} must be {description}, not {column_type}')
+
+def to_rows(batch):
+    """A record batch as a list of row dicts
+    
+    A row holding a value Python cannot represent (say a timestamp past the
+    year 9999) comes back as a ValueError, so it costs that row, not the batch.
+    """
+    try:
+        return batch.to_pylist()
+    except (ValueError, OverflowError, pa.ArrowException):
+        rows = []
+        for i in range(batch.num_rows):
+            try:
+                rows.append(batch.slice(i, 1).to_pylist()[0])
+            except (ValueError, OverflowError, pa.ArrowException) as e:
+                rows.append(ValueError(f'unreadable value: {e}'))
+        return rows
+
+def normalize_timestamp(value):
+    """Arrow timestamps may carry a timezone; readings are stored as naive UTC"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -1,45 +1,162 @@
+"""Shared data access for the Flask app (model.py) and the FastAPI app (basic.py)
+
+Both apps use one engine per database URL in a process, from get_engine(), and
+so one connection pool; the FastAPI read endpoints use the asyncio flavour
+from get_async_engine() (aiosqlite / asyncpg drivers). Engines are
+configured from the environment:
+
+    DATABASE_URL            sqlite:///plant_care.db by default; libsql:// URLs
+                            (Turso) are authenticated with DATABASE_AUTH_TOKEN
+    DATABASE_PROFILE        "tuned" (default) or "default", see dbtuning.py
+    DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_RECYCLE
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE
+    DATABASE_ECHO           log every statement (off by default)
+
+The table definitions live in model.py.
+"""
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+import threading
+from contextlib import contextmanager
+
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, pool
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+import dbtuning
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-AUTH_TOKEN = os.getenv("DATABASE_AUTH_TOKEN")
+DEFAULT_DATABASE_URL = 'sqlite:///plant_care.db'
+# Relative SQLite paths resolve here, as Flask-SQLAlchemy resolves them against the app's instance folder
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+def optional_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+def database_profile():
+    return os.environ.get('DATABASE_PROFILE', 'tuned')
 
-# The connection string for Turso
-engine = create_engine(f"sqlite+{DATABASE_URL}/?authToken={AUTH_TOKEN}&secure=true",
-                       connect_args={'check_same_thread': False},
-                       echo=True)
+def database_uri():
+    """DATABASE_URL with relative SQLite paths made absolute and Turso URLs authenticated"""
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    if url.startswith('libsql://'):
+        return f"sqlite+{url}/?authToken={os.environ.get('DATABASE_AUTH_TOKEN')}&secure=true"
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and parsed.database not in (None, '', ':memory:') \
+            and not parsed.query.get('uri') and not os.path.isabs(parsed.database):
+        os.makedirs(INSTANCE_DIR, exist_ok=True)
+        url = parsed.set(database=os.path.join(INSTANCE_DIR, parsed.database)).render_as_string(hide_password=False)
+    return url
 
+def canonical_uri(uri):
+    return make_url(uri).render_as_string(hide_password=False)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Drivers used for the asyncio engine, by backend
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
 
-# Define the User Model
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
+def async_uri(uri):
+    """uri with its driver swapped for the backend's asyncio driver"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver configured for {backend} databases')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}').render_as_string(hide_password=False)
 
-    gardens = relationship("Garden", back_populates="owner")
+def engine_settings(uri, profile):
+    """(create_engine options, SQLite pragmas) for uri under profile"""
+    options = dbtuning.engine_options(uri, profile,
+                                      pool_size=optional_int('DATABASE_POOL_SIZE'),
+                                      max_overflow=optional_int('DATABASE_MAX_OVERFLOW'),
+                                      pool_recycle=optional_int('DATABASE_POOL_RECYCLE'))
+    options['echo'] = os.environ.get('DATABASE_ECHO', '').lower() in ('1', 'true', 'yes')
+    if dbtuning.is_sqlite(uri) and make_url(uri).database in (None, '', ':memory:'):
+        # One shared connection, or every connection would see its own empty database
+        options.update(poolclass=pool.StaticPool, connect_args={'check_same_thread': False})
+    pragmas = dbtuning.sqlite_pragmas(
+        busy_timeout=optional_int('SQLITE_BUSY_TIMEOUT_MS'),
+        cache_size=optional_int('SQLITE_CACHE_SIZE'),
+        mmap_size=optional_int('SQLITE_MMAP_SIZE')
+    ) if profile == 'tuned' else {}
+    return options, pragmas
 
-# Define other models (we'll add more later)
-class Garden(Base):
-    __tablename__ = "gardens"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    location = Column(String)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+def make_engine(uri=None, profile=None):
+    """A new engine for uri (default DATABASE_URL) with the profile's pool options and pragmas"""
+    uri = uri or database_uri()
+    options, pragmas = engine_settings(uri, profile or database_profile())
+    engine = create_engine(uri, **options)
+    dbtuning.install_sqlite_pragmas(engine, pragmas)
+    return engine
 
-    owner = relationship("User", back_populates="gardens")
+def make_async_engine(uri=None, profile=None):
+    """An asyncio engine for uri (default DATABASE_URL), configured like make_engine"""
+    # Imported here so the Flask app does not need greenlet / the async drivers
+    from sqlalchemy.ext.asyncio import create_async_engine
+    uri = async_uri(uri or database_uri())
+    options, pragmas = engine_settings(uri, profile or database_profile())
+    options.pop('connect_args', None)
+    engine = create_async_engine(uri, **options)
+    # Pragmas are set through the synchronous facade every async engine wraps
+    dbtuning.install_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(uri=None):
+    """The process-wide engine for uri (default DATABASE_URL), created on first use"""
+    key = canonical_uri(uri or database_uri())
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = make_engine(key)
+    return engine
+
+_async_engines = {}
+
+def get_async_engine(uri=None):
+    """The process-wide asyncio engine for uri (default DATABASE_URL), created on first use"""
+    key = canonical_uri(uri or database_uri())
+    with _engines_lock:
+        engine = _async_engines.get(key)
+        if engine is None:
+            engine = _async_engines[key] = make_async_engine(key)
+    return engine
+
+async def get_async_db():
+    """AsyncSession on the shared asyncio engine (a FastAPI dependency)"""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
 
-# Function to get a DB session
 def get_db():
-    db = SessionLocal()
+    """Session on the shared engine, closed when the request is done (a FastAPI dependency)"""
+    session = Session(get_engine(), autoflush=False)
     try:
-        yield db
+        yield session
     finally:
-        db.close()
\ No newline at end of file
+        session.close()
+
+@contextmanager
+def read_snapshot(engine):
+    """Connection on engine whose queries all see the database as of its first one
+
+    SQLite gets this from an explicit read transaction, which in WAL mode (the
+    tuned profile) does not hold off writers; other backends from REPEATABLE
+    READ. Nothing is written through it, so it is rolled back when done.
+    """
+    with engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            # pysqlite only begins transactions before writes, so begin this one by hand
+            conn.exec_driver_sql('BEGIN')
+        else:
+            conn = conn.execution_options(isolation_level='REPEATABLE READ')
+        try:
+            yield conn
+        finally:
+            conn.rollback()
@@ -0,0 +1,69 @@
+"""Engine options and per-connection settings for the app database
+
+The "tuned" profile puts SQLite in WAL mode (readers no longer block the
+writer, nor it them), waits on a busy database instead of failing with
+"database is locked", relaxes fsync to once per checkpoint (synchronous =
+NORMAL, still safe against corruption in WAL mode) and gives each
+connection a larger page cache and a memory-mapped read window. Server
+databases get a sized, pre-pinged connection pool instead. The "default"
+profile leaves the driver's settings alone.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = ('tuned', 'default')
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,  # milliseconds
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,  # negative means KiB: 64 MiB
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'temp_store': 'MEMORY',
+}
+
+POOL_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_recycle': 1800,  # seconds
+    'pool_pre_ping': True,
+}
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+def engine_options(uri, profile='tuned', **overrides):
+    """create_engine() pool options for uri; overrides replace individual pool options"""
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown database profile {profile!r}, expected one of {", ".join(PROFILES)}')
+    if profile == 'default':
+        return {}
+    if is_sqlite(uri):
+        # SQLite is tuned per connection, see install_sqlite_pragmas
+        return {}
+    options = dict(POOL_OPTIONS)
+    options.update((key, value) for key, value in overrides.items() if value is not None)
+    return options
+
+def sqlite_pragmas(**overrides):
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas.update((key, value) for key, value in overrides.items() if value is not None)
+    return pragmas
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run `PRAGMA name = value` for each pragma on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+def current_pragmas(connection, names=SQLITE_PRAGMAS):
+    """{name: value} of pragmas as seen by a SQLAlchemy connection, for diagnostics"""
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
@@ -0,0 +1,130 @@
+"""Write-behind queue for incoming readings
+
+Request handlers put validated rows on a bounded in-process queue and return
+immediately; one writer thread drains it in group commits of up to
+batch_size rows, or whatever has arrived after interval seconds, so a burst
+of requests costs a handful of write transactions instead of one each. A
+full queue rejects new rows (the caller answers 429) rather than growing
+without bound, and stop() writes out everything still queued.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindQueue:
+    """Buffer rows and hand them to write(rows) from a background thread"""
+    name = 'ingest-writer'
+
+    def __init__(self, write, maxsize=10000, batch_size=500, interval=0.05):
+        self.write = write
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.interval = interval
+        self.accepted = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_total = 0.0
+        self.flush_max = 0.0
+        self.last_flush = None
+        self._rows = deque()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def put(self, rows):
+        """Queue rows all-or-nothing; returns False (and queues none) if they do not fit"""
+        with self._condition:
+            if len(self._rows) + len(rows) > self.maxsize:
+                self.rejected += len(rows)
+                return False
+            was_empty = not self._rows
+            self._rows.extend(rows)
+            self.accepted += len(rows)
+            # Wake the writer to start the interval timer, or early for a full batch
+            if was_empty or len(self._rows) >= self.batch_size:
+                self._condition.notify()
+        return True
+
+    def _next_batch(self):
+        """Block until a batch is due; an empty batch means the queue is stopping and drained"""
+        with self._condition:
+            while not self._rows and not self._stopping:
+                self._condition.wait()
+            # Give a partial batch until `interval` to fill up
+            if not self._stopping:
+                self._condition.wait_for(lambda: len(self._rows) >= self.batch_size or self._stopping,
+                                         timeout=self.interval)
+            return [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+
+    def flush_batch(self, batch):
+        started = time.monotonic()
+        try:
+            self.write(batch)
+            self.written += len(batch)
+        except Exception:
+            self.failed += len(batch)
+            logger.exception(f'{self.name} dropped {len(batch)} rows')
+        duration = time.monotonic() - started
+        self.flushes += 1
+        self.flush_total += duration
+        self.flush_max = max(self.flush_max, duration)
+        self.last_flush = duration
+
+    def run(self):
+        """Write batches until stop() is called and the queue is empty"""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self.flush_batch(batch)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._condition:
+            self._stopping = False
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Write out everything queued, then stop the writer thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+            self._thread = None
+        # Rows queued while no writer was running
+        while self._rows:
+            self.flush_batch([self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))])
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'depth': len(self._rows),
+            'maxsize': self.maxsize,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'written': self.written,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'flush_seconds': {
+                'last': round(self.last_flush, 4) if self.last_flush is not None else None,
+                'mean': round(self.flush_total / self.flushes, 4) if self.flushes else None,
+                'max': round(self.flush_max, 4)
+            }
+        }
@@ -0,0 +1,105 @@
+"""Flask JSON provider backed by orjson, falling back to the standard library encoder
+
+orjson serialises straight to bytes in C, several times faster than json on
+the list-of-dicts and list-of-arrays payloads the readings endpoints return.
+Keys are not sorted (the default provider sorts them), and types orjson does
+not know are handed to Flask's usual default hook.
+
+Without orjson the standard encoder is set up to write the same JSON: compact
+UTF-8, dates and times in ISO 8601 rather than Flask's HTTP dates, and NaN or
+infinite floats as null. It is slower, not different.
+"""
+import json
+import math
+from datetime import date, time
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+def iso_default(o):
+    """Flask's default hook, except that dates and times are written in ISO 8601 as orjson does"""
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+def finite(obj):
+    """obj with NaN and infinite floats replaced by None, as orjson writes them"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [finite(value) for value in obj]
+    return obj
+
+def reject_constant(name):
+    raise ValueError(f'{name} is not valid JSON')
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+    ensure_ascii = False
+    default = staticmethod(iso_default)
+
+    def _indented(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    if orjson is not None:
+        def _options(self):
+            options = orjson.OPT_NON_STR_KEYS
+            if self._indented():
+                options |= orjson.OPT_INDENT_2
+            return options
+
+        def dumps(self, obj, **kwargs):
+            if kwargs:
+                # Callers asking for json.dumps options get the standard encoder
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                orjson.dumps(obj, default=self.default, option=self._options()),
+                mimetype=self.mimetype
+            )
+    else:
+        def _encode(self, obj):
+            options = {'default': self.default, 'ensure_ascii': False, 'sort_keys': False, 'allow_nan': False}
+            if self._indented():
+                options['indent'] = 2
+            else:
+                options['separators'] = (',', ':')
+            try:
+                return json.dumps(obj, **options)
+            except ValueError:
+                # Only payloads holding NaN or infinity pay for the copy
+                return json.dumps(finite(obj), **options)
+
+        def dumps(self, obj, **kwargs):
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return self._encode(obj)
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return json.loads(s, parse_constant=reject_constant)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(self._encode(obj), mimetype=self.mimetype)
+
+def install(app):
+    """Use the fast provider for jsonify() and request.get_json() on app"""
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    return app.json
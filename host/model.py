@@ -1,26 +1,77 @@
 from flask import Flask, render_template, send_from_directory, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import declared_attr
 from flask_login import LoginManager
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timedelta
+import atexit
 import os
+import tempfile
+import zlib
 from dotenv import load_dotenv
 import logging
+import database
+import jsonprovider
 
 # Load environment variables
 load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='static', static_url_path='')
+jsonprovider.install(app)
 
 # Configuration
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your_super_secret_development_key_change_in_production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///plant_care.db')
+# The engine itself (pool, pragmas, echo) comes from database.py, shared with the FastAPI app
+app.config['SQLALCHEMY_DATABASE_URI'] = database.database_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['WTF_CSRF_ENABLED'] = False  # Disable CSRF for API
+app.config['DATABASE_PROFILE'] = database.database_profile()
+# Raw readings older than this are compacted into hourly buckets, and hourly buckets into daily ones
+app.config['RAW_RETENTION_DAYS'] = int(os.environ.get('RAW_RETENTION_DAYS', 30))
+app.config['HOURLY_RETENTION_DAYS'] = int(os.environ.get('HOURLY_RETENTION_DAYS', 365))
+# Write-behind ingestion: readings are queued and written by a background thread in group commits
+app.config['INGEST_WRITE_BEHIND'] = os.environ.get('INGEST_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+app.config['INGEST_QUEUE_SIZE'] = int(os.environ.get('INGEST_QUEUE_SIZE', 10000))
+app.config['INGEST_FLUSH_ROWS'] = int(os.environ.get('INGEST_FLUSH_ROWS', 500))
+app.config['INGEST_FLUSH_INTERVAL_MS'] = int(os.environ.get('INGEST_FLUSH_INTERVAL_MS', 50))
+# Garden access times are kept in memory and written at most this many seconds late
+app.config['ACCESS_FLUSH_INTERVAL'] = int(os.environ.get('ACCESS_FLUSH_INTERVAL', 60))
+# /api/metrics exposes cache, job and pool internals, so it is off unless asked for and then needs a login
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+def default_lock_file(job):
+    """Lock file shared by every process using the same database; only its holder runs the job"""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    return os.path.join(tempfile.gettempdir(), f'c_gardens_{job}_{zlib.crc32(uri.encode()):08x}.lock')
+
+app.config['SIMULATION_LOCK_FILE'] = os.environ.get('SIMULATION_LOCK_FILE', default_lock_file('simulation'))
+app.config['COMPACTION_LOCK_FILE'] = os.environ.get('COMPACTION_LOCK_FILE', default_lock_file('compaction'))
+# With a seed the simulator is reproducible: a garden's readings depend only on the seed, its id and the tick time
+app.config['SIMULATION_SEED'] = database.optional_int('SIMULATION_SEED')
+# Weather for every garden's coordinates is refetched this often, with at most this many requests in flight
+app.config['WEATHER_PREFETCH_INTERVAL'] = int(os.environ.get('WEATHER_PREFETCH_INTERVAL', 900))
+app.config['WEATHER_PREFETCH_CONCURRENCY'] = int(os.environ.get('WEATHER_PREFETCH_CONCURRENCY', 4))
+app.config['WEATHER_PREFETCH_LOCK_FILE'] = os.environ.get('WEATHER_PREFETCH_LOCK_FILE',
+                                                          default_lock_file('weather_prefetch'))
 
 # Initialize extensions
-db = SQLAlchemy(app)
+class SharedEngineSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy on the process-wide engine from database.get_engine instead of its own
+    
+    Flask-SQLAlchemy 3.0 has no public way to be handed an existing engine,
+    so this overrides its private _make_engine hook, as found in 3.0.5 (the
+    version pinned in requirements.txt). SharedEngineTestCase fails if the
+    hook stops being called. Only the URL is taken from `options`: engine
+    settings live in database.py, and SQLALCHEMY_ENGINE_OPTIONS, which
+    would be silently dropped, is refused.
+    """
+    def _make_engine(self, bind_key, options, app):
+        if app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+            raise ValueError('Set engine options in database.py (DATABASE_PROFILE), not SQLALCHEMY_ENGINE_OPTIONS')
+        return database.get_engine(options['url'])
+
+db = SharedEngineSQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
@@ -50,7 +101,8 @@ class User(UserMixin, db.Model):
     light_min = db.Column(db.Integer, default=200)  # lux
     
     # Relationships
-    gardens = db.relationship('Garden', backref='owner', lazy=True, cascade='all, delete-orphan')
+    gardens = db.relationship('Garden', backref='owner', lazy=True, cascade='all, delete-orphan',
+                              foreign_keys='Garden.user_id')
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -94,8 +146,19 @@ class Garden(db.Model):
     def __repr__(self):
         return f'<Garden {self.name}>'
     
-    def to_dict(self):
-        latest_reading = PlantReading.query.filter_by(garden_id=self.id).order_by(PlantReading.timestamp.desc()).first()
+    def to_dict(self, summary=None):
+        # summary is a precomputed (latest_reading, readings_count) pair, see get_garden_summaries
+        if summary is None:
+            if self.stats:
+                summary = (self.stats.latest_reading, self.stats.readings_count)
+            else:
+                summary = get_garden_summaries([self.id])[self.id]
+        latest_reading, readings_count = summary
+        # Include an access recorded in memory but not flushed yet
+        last_accessed = self.last_accessed
+        pending = access_tracker.pending(self.id)
+        if pending is not None and (last_accessed is None or pending > last_accessed):
+            last_accessed = pending
         return {
             'id': self.id,
             'name': self.name,
@@ -103,16 +166,22 @@ class Garden(db.Model):
             'location_lat': self.location_lat,
             'location_lon': self.location_lon,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_accessed': self.last_accessed.isoformat() if self.last_accessed else None,
+            'last_accessed': last_accessed.isoformat() if last_accessed else None,
             'sensor_type': self.sensor_type,
             'plant_type': self.plant_type,
             'watering_frequency': self.watering_frequency,
             'latest_reading': latest_reading.to_dict() if latest_reading else None,
-            'readings_count': len(self.readings)
+            'readings_count': readings_count,
+            'stats': self.stats.to_dict() if self.stats else None
         }
 
 class PlantReading(db.Model):
     __tablename__ = 'plant_readings'
+    __table_args__ = (
+        # Serves every per-garden "newest first" query without a sort; ascending
+        # exports scan it backwards
+        db.Index('ix_plant_readings_garden_timestamp', 'garden_id', db.desc('timestamp'), db.desc('id')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     garden_id = db.Column(db.Integer, db.ForeignKey('gardens.id'), nullable=False)
@@ -142,18 +211,385 @@ class PlantReading(db.Model):
             'is_manual': self.is_manual
         }
 
+# Metrics tracked by the per-garden rollup
+STATS_METRICS = ('moisture_level', 'temperature', 'light_intensity', 'humidity', 'ph_level')
+
+class GardenStats(db.Model):
+    """Rollup of a garden's readings, maintained on write so garden reads skip plant_readings"""
+    __tablename__ = 'garden_stats'
+    
+    garden_id = db.Column(db.Integer, db.ForeignKey('gardens.id'), primary_key=True)
+    latest_reading_id = db.Column(db.Integer, db.ForeignKey('plant_readings.id'), nullable=True)
+    latest_timestamp = db.Column(db.DateTime, nullable=True)
+    # Every reading ever recorded, including those compacted into hourly and daily
+    # aggregates; plant_readings (and so the readings endpoints' total) may hold fewer
+    readings_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Per-metric min/max/sum/count; the mean is sum / count
+    moisture_level_min = db.Column(db.Float, nullable=True)
+    moisture_level_max = db.Column(db.Float, nullable=True)
+    moisture_level_sum = db.Column(db.Float, default=0.0, nullable=False)
+    moisture_level_count = db.Column(db.Integer, default=0, nullable=False)
+    temperature_min = db.Column(db.Float, nullable=True)
+    temperature_max = db.Column(db.Float, nullable=True)
+    temperature_sum = db.Column(db.Float, default=0.0, nullable=False)
+    temperature_count = db.Column(db.Integer, default=0, nullable=False)
+    light_intensity_min = db.Column(db.Float, nullable=True)
+    light_intensity_max = db.Column(db.Float, nullable=True)
+    light_intensity_sum = db.Column(db.Float, default=0.0, nullable=False)
+    light_intensity_count = db.Column(db.Integer, default=0, nullable=False)
+    humidity_min = db.Column(db.Float, nullable=True)
+    humidity_max = db.Column(db.Float, nullable=True)
+    humidity_sum = db.Column(db.Float, default=0.0, nullable=False)
+    humidity_count = db.Column(db.Integer, default=0, nullable=False)
+    ph_level_min = db.Column(db.Float, nullable=True)
+    ph_level_max = db.Column(db.Float, nullable=True)
+    ph_level_sum = db.Column(db.Float, default=0.0, nullable=False)
+    ph_level_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Relationships
+    garden = db.relationship('Garden', backref=db.backref('stats', uselist=False, lazy='joined',
+                                                          cascade='all, delete-orphan'))
+    latest_reading = db.relationship('PlantReading', lazy='joined')
+    
+    def __repr__(self):
+        return f'<GardenStats for Garden {self.garden_id}>'
+    
+    def reset(self):
+        self.latest_reading = None
+        self.latest_timestamp = None
+        self.readings_count = 0
+        for metric in STATS_METRICS:
+            setattr(self, f'{metric}_min', None)
+            setattr(self, f'{metric}_max', None)
+            setattr(self, f'{metric}_sum', 0.0)
+            setattr(self, f'{metric}_count', 0)
+    
+    def to_dict(self):
+        metrics = {}
+        for metric in STATS_METRICS:
+            count = getattr(self, f'{metric}_count')
+            metrics[metric] = {
+                'min': getattr(self, f'{metric}_min'),
+                'max': getattr(self, f'{metric}_max'),
+                'mean': round(getattr(self, f'{metric}_sum') / count, 2) if count else None
+            }
+        return {
+            'readings_count': self.readings_count,
+            'latest_timestamp': self.latest_timestamp.isoformat() if self.latest_timestamp else None,
+            'metrics': metrics
+        }
+
+class ReadingAggregateMixin:
+    """Per-metric min/max/sum/count of one garden's readings within a time bucket
+    
+    Raw readings older than the retention window are compacted into hourly
+    buckets, and old hourly buckets into daily ones (see compact_readings).
+    The columns mirror GardenStats so buckets merge by min/max/sum/count.
+    """
+    @declared_attr
+    def garden_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('gardens.id'), primary_key=True)
+    
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour or day
+    readings_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    moisture_level_min = db.Column(db.Float, nullable=True)
+    moisture_level_max = db.Column(db.Float, nullable=True)
+    moisture_level_sum = db.Column(db.Float, default=0.0, nullable=False)
+    moisture_level_count = db.Column(db.Integer, default=0, nullable=False)
+    temperature_min = db.Column(db.Float, nullable=True)
+    temperature_max = db.Column(db.Float, nullable=True)
+    temperature_sum = db.Column(db.Float, default=0.0, nullable=False)
+    temperature_count = db.Column(db.Integer, default=0, nullable=False)
+    light_intensity_min = db.Column(db.Float, nullable=True)
+    light_intensity_max = db.Column(db.Float, nullable=True)
+    light_intensity_sum = db.Column(db.Float, default=0.0, nullable=False)
+    light_intensity_count = db.Column(db.Integer, default=0, nullable=False)
+    humidity_min = db.Column(db.Float, nullable=True)
+    humidity_max = db.Column(db.Float, nullable=True)
+    humidity_sum = db.Column(db.Float, default=0.0, nullable=False)
+    humidity_count = db.Column(db.Integer, default=0, nullable=False)
+    ph_level_min = db.Column(db.Float, nullable=True)
+    ph_level_max = db.Column(db.Float, nullable=True)
+    ph_level_sum = db.Column(db.Float, default=0.0, nullable=False)
+    ph_level_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def merge(self, readings_count, values):
+        """Fold another bucket's count and per-metric (min, max, sum, count) values into this one"""
+        self.readings_count = (self.readings_count or 0) + readings_count
+        for metric in STATS_METRICS:
+            merged = merge_metric_values(
+                (getattr(self, f'{metric}_min'), getattr(self, f'{metric}_max'),
+                 getattr(self, f'{metric}_sum'), getattr(self, f'{metric}_count')),
+                values[metric]
+            )
+            for suffix, value in zip(('min', 'max', 'sum', 'count'), merged):
+                setattr(self, f'{metric}_{suffix}', value)
+
+class HourlyReadingAggregate(ReadingAggregateMixin, db.Model):
+    __tablename__ = 'reading_aggregates_hourly'
+    
+    garden = db.relationship('Garden', backref=db.backref('hourly_aggregates', lazy=True,
+                                                          cascade='all, delete-orphan'))
+
+class DailyReadingAggregate(ReadingAggregateMixin, db.Model):
+    __tablename__ = 'reading_aggregates_daily'
+    
+    garden = db.relationship('Garden', backref=db.backref('daily_aggregates', lazy=True,
+                                                          cascade='all, delete-orphan'))
+
+class WeatherSnapshot(db.Model):
+    """Latest weather for one grid cell (rounded garden coordinates), refreshed by prefetch_weather"""
+    __tablename__ = 'weather_snapshots'
+    
+    lat = db.Column(db.Float, primary_key=True)
+    lon = db.Column(db.Float, primary_key=True)
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    data = db.Column(db.JSON, nullable=False)  # the upstream response
+
+class DeviceTokenVersion(db.Model):
+    """Version of a garden's device tokens; bumping it revokes every token issued before"""
+    __tablename__ = 'device_token_versions'
+    
+    garden_id = db.Column(db.Integer, db.ForeignKey('gardens.id', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def merge_metric_values(a, b):
+    """Combine two (min, max, sum, count) tuples, either of which may be empty"""
+    a_min, a_max, a_sum, a_count = a
+    b_min, b_max, b_sum, b_count = b
+    return (
+        b_min if a_min is None else a_min if b_min is None else min(a_min, b_min),
+        b_max if a_max is None else a_max if b_max is None else max(a_max, b_max),
+        (a_sum or 0.0) + (b_sum or 0.0),
+        (a_count or 0) + (b_count or 0)
+    )
+
+def garden_summaries_query(garden_ids):
+    """Select (latest PlantReading, readings_count) for each of the gardens that has readings"""
+    # Both windows share the index order, so neither needs a sort
+    newest_first = (PlantReading.timestamp.desc(), PlantReading.id.desc())
+    ranked = db.select(
+        PlantReading.id.label('id'),
+        db.func.row_number().over(partition_by=PlantReading.garden_id, order_by=newest_first).label('rank'),
+        db.func.count().over(partition_by=PlantReading.garden_id, order_by=newest_first,
+                             rows=(None, None)).label('readings_count')
+    ).where(PlantReading.garden_id.in_(garden_ids)).subquery()
+    return db.select(PlantReading, ranked.c.readings_count)\
+             .join(ranked, PlantReading.id == ranked.c.id)\
+             .where(ranked.c.rank == 1)
+
+def get_garden_summaries(garden_ids):
+    """Latest reading and reading count for each garden, fetched in a single query"""
+    summaries = {garden_id: (None, 0) for garden_id in garden_ids}
+    if not summaries:
+        return summaries
+    
+    for reading, readings_count in db.session.execute(garden_summaries_query(list(summaries))):
+        summaries[reading.garden_id] = (reading, readings_count)
+    return summaries
+
+def record_garden_readings(garden_id, readings):
+    """Update a garden's rollup with newly flushed readings
+    
+    The fold is done in SQL by rollup_fold_statement, not on a loaded
+    GardenStats, so concurrent writers to one garden cannot lose each
+    other's counts.
+    """
+    has_rollup = db.session.query(GardenStats.garden_id).filter_by(garden_id=garden_id).first()
+    if has_rollup is None:
+        # No rollup yet (new garden or pre-existing data): seed it from the table,
+        # which already contains the flushed readings
+        rebuild_garden_stats([garden_id])
+        return
+    folds = []
+    for reading in readings:
+        fold = {f'b_{metric}': getattr(reading, metric) for metric in STATS_METRICS}
+        fold.update(b_garden_id=garden_id, b_timestamp=reading.timestamp, b_reading_id=reading.id)
+        folds.append(fold)
+    if folds:
+        db.session.execute(rollup_fold_statement(), folds)
+
+def load_compacted_totals(garden_ids):
+    """Per-garden totals of the hourly and daily aggregate tables
+    
+    Returns {garden_id: (readings_count, {metric: (min, max, sum, count)})}.
+    """
+    totals = {}
+    for model in (HourlyReadingAggregate, DailyReadingAggregate):
+        columns = [model.garden_id, db.func.sum(model.readings_count)]
+        for metric in STATS_METRICS:
+            columns += [db.func.min(getattr(model, f'{metric}_min')), db.func.max(getattr(model, f'{metric}_max')),
+                        db.func.sum(getattr(model, f'{metric}_sum')), db.func.sum(getattr(model, f'{metric}_count'))]
+        rows = db.session.query(*columns).filter(model.garden_id.in_(garden_ids))\
+                                         .group_by(model.garden_id).all()
+        for row in rows:
+            readings_count, values = totals.get(row[0], (0, {}))
+            for i, metric in enumerate(STATS_METRICS):
+                values[metric] = merge_metric_values(values.get(metric, (None, None, None, 0)),
+                                                     row[2 + i * 4:6 + i * 4])
+            totals[row[0]] = (readings_count + row[1], values)
+    return totals
+
+def rebuild_garden_stats(garden_ids=None):
+    """Recompute rollups from plant_readings and the compacted aggregates to repair drift
+    
+    Returns the number of rollups rebuilt.
+    """
+    if garden_ids is None:
+        garden_ids = [garden_id for (garden_id,) in db.session.query(Garden.id).all()]
+    if not garden_ids:
+        return 0
+    
+    columns = [PlantReading.garden_id]
+    for metric in STATS_METRICS:
+        column = getattr(PlantReading, metric)
+        columns += [db.func.min(column), db.func.max(column), db.func.sum(column), db.func.count(column)]
+    aggregates = {
+        row[0]: row[1:]
+        for row in db.session.query(*columns)
+                             .filter(PlantReading.garden_id.in_(garden_ids))
+                             .group_by(PlantReading.garden_id).all()
+    }
+    compacted = load_compacted_totals(garden_ids)
+    summaries = get_garden_summaries(garden_ids)
+    existing = {stats.garden_id: stats for stats in
+                GardenStats.query.filter(GardenStats.garden_id.in_(garden_ids)).all()}
+    
+    for garden_id in garden_ids:
+        stats = existing.get(garden_id)
+        if stats is None:
+            stats = GardenStats(garden_id=garden_id)
+            db.session.add(stats)
+        stats.reset()
+        latest_reading, readings_count = summaries[garden_id]
+        stats.latest_reading = latest_reading
+        stats.latest_timestamp = latest_reading.timestamp if latest_reading else None
+        compacted_count, compacted_values = compacted.get(garden_id, (0, {}))
+        stats.readings_count = readings_count + compacted_count
+        
+        values = aggregates.get(garden_id)
+        for i, metric in enumerate(STATS_METRICS):
+            raw = values[i * 4:i * 4 + 4] if values else (None, None, None, 0)
+            merged = merge_metric_values(raw, compacted_values.get(metric, (None, None, None, 0)))
+            for suffix, value in zip(('min', 'max', 'sum', 'count'), merged):
+                setattr(stats, f'{metric}_{suffix}', value)
+    
+    db.session.flush()
+    return len(garden_ids)
+
+@app.cli.command('rebuild-garden-stats')
+def rebuild_garden_stats_command():
+    """Recompute every garden's rollup from plant_readings"""
+    rebuilt = rebuild_garden_stats()
+    db.session.commit()
+    print(f'Rebuilt stats for {rebuilt} gardens')
+
 # User loader for Flask-Login
+from sqlalchemy.orm import make_transient_to_detached
+from cache import MISSING, TTLCache
+
+# Logged-in users are cached between requests so @login_required costs no
+# query. Writes to a user call forget_user; the TTL bounds how long other
+# processes can serve a stale copy
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = 30  # seconds
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def user_snapshot(user):
+    """Detached copy of a user's column values, never attached to a session itself"""
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+def forget_user(user_id):
+    user_cache.pop(user_id)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    snapshot = user_cache.get(user_id)
+    if snapshot is MISSING:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, user_snapshot(user))
+        return user
+    # A copy in this request's session, made from the cached state without a SELECT
+    return db.session.merge(snapshot, load=False)
 
 # Authentication Routes
-from flask import Blueprint, request
+import functools
+from flask import Blueprint, Response, g, request, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import login_user, logout_user, login_required, current_user
+from jose import JWTError
+import security
 
 auth_bp = Blueprint('auth', __name__)
 
+# Besides the session cookie, API clients can send "Authorization: Bearer
+# <token>". Checking a token is CPU only (signature and expiry, with decoded
+# claims cached in security.token_cache); the user itself comes from user_cache
+def bearer_claims():
+    """Claims of the request's valid bearer token, or None; decoded once per request"""
+    if 'bearer_claims' not in g:
+        token = security.bearer_token(request.headers.get('Authorization'))
+        try:
+            g.bearer_claims = security.decode_access_token(token) if token else None
+        except JWTError:
+            g.bearer_claims = None
+    return g.bearer_claims
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    claims = bearer_claims()
+    if claims and claims.get('scope') == security.ACCESS_SCOPE:
+        return load_user(claims['sub'])
+    return None
+
+@login_manager.unauthorized_handler
+def unauthorized():
+    return jsonify({'error': 'Authentication required'}), 401
+
+# Device token versions are cached per garden; revoking in another process
+# takes effect here within the TTL
+DEVICE_TOKEN_VERSION_CACHE_SIZE = 4096
+DEVICE_TOKEN_VERSION_CACHE_TTL = 30  # seconds
+device_token_versions = TTLCache(maxsize=DEVICE_TOKEN_VERSION_CACHE_SIZE, ttl=DEVICE_TOKEN_VERSION_CACHE_TTL)
+
+def device_token_version(garden_id):
+    """Current version of a garden's device tokens (0 until they are first revoked)"""
+    version = device_token_versions.get(garden_id)
+    if version is MISSING:
+        row = db.session.get(DeviceTokenVersion, garden_id)
+        version = row.version if row else 0
+        device_token_versions.set(garden_id, version)
+    return version
+
+def login_or_device_required(view):
+    """login_required, or a device token scoped to the view's garden_id and not revoked
+    
+    A device request has no current_user; request_user_id() gives the
+    token's owner without loading them.
+    """
+    @functools.wraps(view)
+    def wrapped(garden_id, **kwargs):
+        claims = bearer_claims()
+        if claims and claims.get('scope') == security.DEVICE_SCOPE:
+            if claims.get('garden_id') != garden_id:
+                return jsonify({'error': 'Token is not valid for this garden'}), 403
+            if claims.get('ver', 0) != device_token_version(garden_id):
+                return jsonify({'error': 'Token has been revoked'}), 401
+            g.device_user_id = int(claims['sub'])
+            return view(garden_id, **kwargs)
+        return login_required(view)(garden_id, **kwargs)
+    return wrapped
+
+def request_user_id():
+    """Id of the user the request acts for: a device token's owner, else the logged-in user"""
+    return g.get('device_user_id') or current_user.id
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -214,6 +650,7 @@ def login():
             login_user(user, remember=True)
             user.last_login = datetime.utcnow()
             db.session.commit()
+            forget_user(user.id)
             
             return jsonify({
                 'message': 'Logged in successfully',
@@ -226,9 +663,32 @@ def login():
         app.logger.error(f"Login error: {str(e)}")
         return jsonify({'error': 'Login failed'}), 500
 
+def tokens_disabled():
+    return jsonify({'error': 'Bearer tokens are disabled until SECRET_KEY is set'}), 503
+
+@auth_bp.route('/token', methods=['POST'])
+def issue_token():
+    """Bearer access token for API clients, in exchange for a username and password"""
+    if not security.SECRET_KEY:
+        return tokens_disabled()
+    data = request.get_json(silent=True)
+    if not data or not data.get('username') or not data.get('password'):
+        return jsonify({'error': 'Username and password are required'}), 400
+    
+    user = User.query.filter_by(username=data['username'].strip()).first()
+    if not user or not check_password_hash(user.password, data['password']):
+        return jsonify({'error': 'Invalid username or password'}), 401
+    
+    return jsonify({
+        'access_token': security.create_access_token({'sub': str(user.id)}),
+        'token_type': 'bearer',
+        'expires_in': security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }), 200
+
 @auth_bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
+    forget_user(current_user.id)
     logout_user()
     return jsonify({'message': 'Logged out successfully'}), 200
 
@@ -271,6 +731,7 @@ def profile():
                 current_user.last_active_garden_id = data['last_active_garden_id']
             
             db.session.commit()
+            forget_user(current_user.id)
             return jsonify({'message': 'Profile updated successfully', 'user': current_user.to_dict()}), 200
             
         except Exception as e:
@@ -279,16 +740,103 @@ def profile():
             return jsonify({'error': 'Failed to update profile'}), 500
 
 # Garden Management Routes
+from access import AccessTracker
+from scheduler import PeriodicTask
+
 gardens_bp = Blueprint('gardens', __name__)
 
+access_tracker = AccessTracker()
+
+def flush_access_times():
+    """Write pending garden access times with one executemany UPDATE; returns the number written"""
+    pending = access_tracker.drain()
+    if not pending:
+        return 0
+    gardens = Garden.__table__
+    when = db.bindparam('b_last_accessed', type_=db.DateTime)
+    statement = gardens.update()\
+                       .where(gardens.c.id == db.bindparam('b_garden_id'),
+                              db.or_(gardens.c.last_accessed.is_(None), gardens.c.last_accessed < when))\
+                       .values(last_accessed=when)
+    try:
+        db.session.execute(statement, [{'b_garden_id': garden_id, 'b_last_accessed': accessed}
+                                       for garden_id, accessed in pending.items()])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        access_tracker.restore(pending)
+        raise
+    return len(pending)
+
+def scheduled_access_flush():
+    with app.app_context():
+        try:
+            flush_access_times()
+        except Exception as e:
+            app.logger.error(f"Access flush error: {str(e)}")
+
+# Every process flushes its own tracker, so this job takes no lock
+access_flush_task = PeriodicTask(scheduled_access_flush, app.config['ACCESS_FLUSH_INTERVAL'],
+                                 name='access-flush', run_at_start=False)
+atexit.register(scheduled_access_flush)
+
+def record_access(garden_ids):
+    """Note that gardens were accessed now, without writing to the database"""
+    access_tracker.record(garden_ids, datetime.utcnow())
+    access_flush_task.start()
+
+# ?format=columnar responses hold one array per field instead of one object
+# per row, with timestamps as epoch milliseconds
+READING_FIELDS = ('id', 'garden_id', 'timestamp', 'moisture_level', 'temperature', 'light_intensity',
+                  'humidity', 'ph_level', 'notes', 'is_manual')
+GARDEN_FIELDS = ('id', 'name', 'location', 'location_lat', 'location_lon', 'created_at', 'last_accessed',
+                 'sensor_type', 'plant_type', 'watering_frequency', 'latest_reading', 'readings_count', 'stats')
+GARDEN_TIME_FIELDS = ('created_at', 'last_accessed')
+EPOCH = datetime(1970, 1, 1)
+MILLISECOND = timedelta(milliseconds=1)
+
+def epoch_ms(value):
+    return (value - EPOCH) // MILLISECOND if value is not None else None
+
+def rows_to_columns(rows, fields, time_fields=('timestamp',)):
+    """Transpose row tuples (in `fields` order) into {field: [values]}"""
+    columns = {field: list(values) for field, values in zip(fields, zip(*rows))} if rows \
+              else {field: [] for field in fields}
+    for field in time_fields:
+        if field in columns:
+            columns[field] = [epoch_ms(value) for value in columns[field]]
+    return columns
+
+def dicts_to_columns(items, fields, time_fields=()):
+    """Columns from to_dict() output; ISO timestamps in time_fields become epoch milliseconds"""
+    columns = {field: [item[field] for item in items] for field in fields}
+    for field in time_fields:
+        columns[field] = [epoch_ms(datetime.fromisoformat(value)) if value else None for value in columns[field]]
+    return columns
+
+def readings_query(garden_id, columnar=False):
+    query = PlantReading.query.filter(PlantReading.garden_id == garden_id)
+    if columnar:
+        # Plain rows in READING_FIELDS order, skipping an ORM object per reading
+        query = query.with_entities(*[getattr(PlantReading, field) for field in READING_FIELDS])
+    return query
+
+def readings_payload(readings, columnar=False):
+    if columnar:
+        return rows_to_columns(readings, READING_FIELDS)
+    return [reading.to_dict() for reading in readings]
+
 @gardens_bp.route('/gardens', methods=['GET'])
 @login_required
 def get_gardens():
     try:
         gardens = Garden.query.filter_by(user_id=current_user.id).all()
-        return jsonify({
-            'gardens': [garden.to_dict() for garden in gardens]
-        }), 200
+        # Rollups are joined in; only gardens without one fall back to the batched query
+        summaries = get_garden_summaries([garden.id for garden in gardens if garden.stats is None])
+        gardens = [garden.to_dict(summaries.get(garden.id)) for garden in gardens]
+        if request.args.get('format') == 'columnar':
+            return jsonify({'gardens': dicts_to_columns(gardens, GARDEN_FIELDS, GARDEN_TIME_FIELDS)}), 200
+        return jsonify({'gardens': gardens}), 200
     except Exception as e:
         app.logger.error(f"Get gardens error: {str(e)}")
         return jsonify({'error': 'Failed to fetch gardens'}), 500
@@ -316,6 +864,8 @@ def add_garden():
         )
         
         db.session.add(new_garden)
+        db.session.flush()
+        db.session.add(GardenStats(garden_id=new_garden.id, readings_count=0))
         db.session.commit()
         
         return jsonify({
@@ -337,10 +887,7 @@ def get_garden(garden_id):
         if not garden:
             return jsonify({'error': 'Garden not found'}), 404
         
-        # Update last accessed
-        garden.last_accessed = datetime.utcnow()
-        db.session.commit()
-        
+        record_access([garden.id])
         return jsonify({'garden': garden.to_dict()}), 200
         
     except Exception as e:
@@ -373,8 +920,8 @@ def update_garden(garden_id):
         if 'watering_frequency' in data:
             garden.watering_frequency = data['watering_frequency']
         
-        garden.last_accessed = datetime.utcnow()
         db.session.commit()
+        record_access([garden.id])
         
         return jsonify({
             'message': 'Garden updated successfully',
@@ -405,6 +952,56 @@ def delete_garden(garden_id):
         app.logger.error(f"Delete garden error: {str(e)}")
         return jsonify({'error': 'Failed to delete garden'}), 500
 
+# Keyset pagination of readings, newest first. Pages hold raw readings only, so
+# their `total` counts the rows still in plant_readings; `readings_count` is the
+# garden's count of every reading recorded, compacted ones included
+READINGS_DEFAULT_LIMIT = 100
+READINGS_MAX_LIMIT = 1000
+# Garden totals for cursor pages are cached per (garden, rollup count, latest
+# reading); the TTL bounds staleness after compaction removes raw readings
+READINGS_TOTAL_CACHE_SIZE = 4096
+READINGS_TOTAL_CACHE_TTL = 60  # seconds
+readings_total_cache = TTLCache(maxsize=READINGS_TOTAL_CACHE_SIZE, ttl=READINGS_TOTAL_CACHE_TTL)
+
+def encode_cursor(reading):
+    return f'{reading.timestamp.isoformat()},{reading.id}'
+
+def parse_cursor(value):
+    """Split an `after` cursor ("<ISO timestamp>,<id>") into its parts, raising ValueError if malformed"""
+    try:
+        timestamp, reading_id = value.rsplit(',', 1)
+        return datetime.fromisoformat(timestamp), int(reading_id)
+    except ValueError:
+        raise ValueError('after must be a cursor of the form <timestamp>,<id>')
+
+def load_readings_page(garden_id, limit, after=None, columnar=False):
+    """Up to `limit` readings older than the `after` (timestamp, id) cursor, seeking on the index
+    
+    Returns (readings, next_cursor); next_cursor is None on the last page.
+    With columnar=True the readings are rows of READING_FIELDS.
+    """
+    query = readings_query(garden_id, columnar)
+    if after is not None:
+        query = query.filter(db.tuple_(PlantReading.timestamp, PlantReading.id) < after)
+    readings = query.order_by(PlantReading.timestamp.desc(), PlantReading.id.desc()).limit(limit + 1).all()
+    if len(readings) <= limit:
+        return readings, None
+    return readings[:limit], encode_cursor(readings[limit - 1])
+
+def recorded_readings_count(garden, raw_total):
+    """Readings recorded for garden, compacted ones included; raw_total when it has no rollup yet"""
+    return garden.stats.readings_count if garden.stats else raw_total
+
+def cached_readings_total(garden):
+    """Raw readings of garden still in plant_readings, cached per rollup state"""
+    stats = garden.stats
+    key = (garden.id, stats.readings_count if stats else None, stats.latest_reading_id if stats else None)
+    total = readings_total_cache.get(key)
+    if total is MISSING:
+        total = PlantReading.query.filter_by(garden_id=garden.id).count()
+        readings_total_cache.set(key, total)
+    return total
+
 @gardens_bp.route('/gardens/<int:garden_id>/readings', methods=['GET'])
 @login_required
 def get_garden_readings(garden_id):
@@ -414,17 +1011,41 @@ def get_garden_readings(garden_id):
         if not garden:
             return jsonify({'error': 'Garden not found'}), 404
         
+        columnar = request.args.get('format') == 'columnar'
+        
+        # Cursor mode: ?limit=&after=<timestamp,id>, with an opt-in cached total
+        if 'after' in request.args or 'limit' in request.args:
+            limit = request.args.get('limit', READINGS_DEFAULT_LIMIT, type=int)
+            if not 1 <= limit <= READINGS_MAX_LIMIT:
+                return jsonify({'error': f'limit must be between 1 and {READINGS_MAX_LIMIT}'}), 400
+            try:
+                after = parse_cursor(request.args['after']) if request.args.get('after') else None
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            readings, next_cursor = load_readings_page(garden_id, limit, after, columnar)
+            response = {
+                'readings': readings_payload(readings, columnar),
+                'next_cursor': next_cursor,
+                'limit': limit
+            }
+            if request.args.get('with_total', type=int):
+                response['total'] = cached_readings_total(garden)
+                response['readings_count'] = recorded_readings_count(garden, response['total'])
+            return jsonify(response), 200
+        
         # Pagination
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 100, type=int)
         
-        readings = PlantReading.query.filter_by(garden_id=garden_id)\
-                                   .order_by(PlantReading.timestamp.desc())\
-                                   .paginate(page=page, per_page=per_page, error_out=False)
+        readings = readings_query(garden_id, columnar)\
+                          .order_by(PlantReading.timestamp.desc())\
+                          .paginate(page=page, per_page=per_page, error_out=False)
         
         return jsonify({
-            'readings': [reading.to_dict() for reading in readings.items],
+            'readings': readings_payload(readings.items, columnar),
             'total': readings.total,
+            'readings_count': recorded_readings_count(garden, readings.total),
             'pages': readings.pages,
             'current_page': page
         }), 200
@@ -433,12 +1054,114 @@ def get_garden_readings(garden_id):
         app.logger.error(f"Get readings error: {str(e)}")
         return jsonify({'error': 'Failed to fetch readings'}), 500
 
-@gardens_bp.route('/gardens/<int:garden_id>/readings', methods=['POST'])
+# Ranges up to this long default to hourly buckets, longer ones to daily
+HOURLY_RESOLUTION_MAX_RANGE = timedelta(days=31)
+
+@gardens_bp.route('/gardens/<int:garden_id>/readings/aggregates', methods=['GET'])
 @login_required
-def add_reading(garden_id):
+def get_garden_reading_aggregates(garden_id):
+    try:
+        garden = Garden.query.filter_by(id=garden_id, user_id=current_user.id).first()
+        
+        if not garden:
+            return jsonify({'error': 'Garden not found'}), 404
+        
+        try:
+            since = parse_datetime_arg('since')
+            until = parse_datetime_arg('until')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        resolution = request.args.get('resolution', 'auto')
+        if resolution == 'auto':
+            span = (until or datetime.utcnow()) - since if since else None
+            resolution = 'hour' if span is not None and span <= HOURLY_RESOLUTION_MAX_RANGE else 'day'
+        if resolution not in ('hour', 'day'):
+            return jsonify({'error': 'resolution must be auto, hour or day'}), 400
+        
+        return jsonify({
+            'resolution': resolution,
+            'buckets': load_reading_buckets(garden_id, resolution, since, until)
+        }), 200
+        
+    except Exception as e:
+        app.logger.error(f"Get reading aggregates error: {str(e)}")
+        return jsonify({'error': 'Failed to fetch reading aggregates'}), 500
+
+# Chart series: default range and bounds on the number of points returned
+SERIES_DEFAULT_RANGE = timedelta(days=7)
+SERIES_DEFAULT_POINTS = 500
+SERIES_MAX_POINTS = 5000
+
+@gardens_bp.route('/gardens/<int:garden_id>/readings/series', methods=['GET'])
+@login_required
+def get_garden_reading_series(garden_id):
     try:
         garden = Garden.query.filter_by(id=garden_id, user_id=current_user.id).first()
         
+        if not garden:
+            return jsonify({'error': 'Garden not found'}), 404
+        
+        try:
+            end = parse_datetime_arg('to') or datetime.utcnow()
+            start = parse_datetime_arg('from') or end - SERIES_DEFAULT_RANGE
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if start >= end:
+            return jsonify({'error': 'from must be before to'}), 400
+        
+        points = request.args.get('points', SERIES_DEFAULT_POINTS, type=int)
+        if not 1 <= points <= SERIES_MAX_POINTS:
+            return jsonify({'error': f'points must be between 1 and {SERIES_MAX_POINTS}'}), 400
+        
+        slice_seconds, slices = load_reading_series(garden_id, start, end, points)
+        return jsonify(series_payload(start, end, slice_seconds, slices)), 200
+        
+    except Exception as e:
+        app.logger.error(f"Get reading series error: {str(e)}")
+        return jsonify({'error': 'Failed to fetch reading series'}), 500
+
+@gardens_bp.route('/gardens/<int:garden_id>/device-token', methods=['POST'])
+@login_required
+def create_device_token(garden_id):
+    """Token for a sensor gateway that may only post readings to this garden"""
+    if not security.SECRET_KEY:
+        return tokens_disabled()
+    garden = Garden.query.filter_by(id=garden_id, user_id=current_user.id).first()
+    if not garden:
+        return jsonify({'error': 'Garden not found'}), 404
+    
+    return jsonify({
+        'device_token': security.create_device_token(current_user.id, garden_id, device_token_version(garden_id)),
+        'token_type': 'bearer',
+        'garden_id': garden_id,
+        'expires_in': security.DEVICE_TOKEN_EXPIRE_DAYS * 86400
+    }), 201
+
+@gardens_bp.route('/gardens/<int:garden_id>/device-token', methods=['DELETE'])
+@login_required
+def revoke_device_tokens(garden_id):
+    """Revoke every device token issued for this garden so far"""
+    garden = Garden.query.filter_by(id=garden_id, user_id=current_user.id).first()
+    if not garden:
+        return jsonify({'error': 'Garden not found'}), 404
+    
+    row = db.session.get(DeviceTokenVersion, garden_id)
+    if row is None:
+        row = DeviceTokenVersion(garden_id=garden_id, version=0)
+        db.session.add(row)
+    row.version += 1
+    db.session.commit()
+    device_token_versions.pop(garden_id)
+    return jsonify({'message': 'Device tokens revoked'}), 200
+
+@gardens_bp.route('/gardens/<int:garden_id>/readings', methods=['POST'])
+@login_or_device_required
+def add_reading(garden_id):
+    try:
+        # Also what stops a device token once its garden is deleted or changes hands
+        garden = Garden.query.filter_by(id=garden_id, user_id=request_user_id()).first()
+        
         if not garden:
             return jsonify({'error': 'Garden not found'}), 404
         
@@ -453,21 +1176,33 @@ def add_reading(garden_id):
             if field not in data:
                 return jsonify({'error': f'{field} is required'}), 400
         
-        new_reading = PlantReading(
-            garden_id=garden_id,
-            moisture_level=float(data['moisture_level']),
-            temperature=float(data['temperature']),
-            light_intensity=float(data['light_intensity']),
-            humidity=float(data.get('humidity', 0)) if data.get('humidity') else None,
-            ph_level=float(data.get('ph_level', 0)) if data.get('ph_level') else None,
-            notes=data.get('notes', '').strip(),
-            is_manual=data.get('is_manual', True),
-            timestamp=datetime.utcnow()
-        )
+        row = {
+            'garden_id': garden_id,
+            'moisture_level': float(data['moisture_level']),
+            'temperature': float(data['temperature']),
+            'light_intensity': float(data['light_intensity']),
+            'humidity': float(data.get('humidity', 0)) if data.get('humidity') else None,
+            'ph_level': float(data.get('ph_level', 0)) if data.get('ph_level') else None,
+            'notes': data.get('notes', '').strip(),
+            'is_manual': data.get('is_manual', True),
+            'timestamp': datetime.utcnow()
+        }
         
+        if app.config['INGEST_WRITE_BEHIND']:
+            if not enqueue_readings([row]):
+                return ingest_queue_full()
+            return jsonify({
+                'message': 'Reading queued',
+                'reading': PlantReading(**row).to_dict()
+            }), 202
+        
+        new_reading = PlantReading(**row)
         db.session.add(new_reading)
-        garden.last_accessed = datetime.utcnow()
+        db.session.flush()
+        record_garden_readings(garden_id, [new_reading])
         db.session.commit()
+        record_access([garden_id])
+        invalidate_predictions([garden_id])
         
         return jsonify({
             'message': 'Reading added successfully',
@@ -481,12 +1216,248 @@ def add_reading(garden_id):
 
 # Data Management Routes
 import csv
+import codecs
 import io
+import math
 import pandas as pd
-from datetime import timedelta
+from datetime import timedelta, timezone
+import columnar
+from ingest import WriteBehindQueue
+from prediction import predict_watering_batch
 
 data_bp = Blueprint('data', __name__)
 
+# Rows written per bulk INSERT (and per commit) when importing CSV files
+IMPORT_BATCH_SIZE = 5000
+# Number of rejected rows reported back to the client
+IMPORT_ERROR_SAMPLES = 10
+
+def parse_reading_row(row, garden_id):
+    """Turn one CSV row into plant_readings column values, raising ValueError if invalid"""
+    timestamp_str = row.get('timestamp', row.get('Timestamp', ''))
+    if timestamp_str:
+        timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        timestamp = datetime.utcnow()
+    
+    return {
+        'garden_id': garden_id,
+        'timestamp': timestamp,
+        'moisture_level': float(row.get('moisture_level', row.get('Moisture', 0))),
+        'temperature': float(row.get('temperature', row.get('Temperature', 0))),
+        'light_intensity': float(row.get('light_intensity', row.get('Light', 0))),
+        'humidity': float(row['humidity']) if row.get('humidity') else None,
+        'ph_level': float(row['ph_level']) if row.get('ph_level') else None,
+        'notes': row.get('notes') or '',
+        'is_manual': True
+    }
+
+def finish_import(garden_id, imported_count):
+    """Commit the last batch of an import, then rebuild the garden's rollup and drop its cached predictions"""
+    # Bulk rows bypass the ORM, so the rollup is recomputed once in SQL
+    if imported_count:
+        rebuild_garden_stats([garden_id])
+    db.session.commit()
+    invalidate_predictions([garden_id])
+
+def import_readings_csv(garden_id, stream, batch_size=IMPORT_BATCH_SIZE):
+    """Stream a binary CSV upload into plant_readings in bounded batches
+    
+    Returns (imported_count, skipped_count, error_samples). Each batch is
+    committed as it is written, so memory stays flat regardless of file size;
+    if the upload fails partway (say it stops being valid UTF-8), the batches
+    already committed are kept and counted by the rollup.
+    """
+    csv_input = csv.DictReader(codecs.getreader('utf-8-sig')(stream))
+    insert = PlantReading.__table__.insert()
+    
+    imported_count = 0
+    skipped_count = 0
+    errors = []
+    batch = []
+    try:
+        for row in csv_input:
+            try:
+                batch.append(parse_reading_row(row, garden_id))
+            except (ValueError, KeyError, TypeError) as e:
+                skipped_count += 1
+                if len(errors) < IMPORT_ERROR_SAMPLES:
+                    errors.append({'line': csv_input.line_num, 'error': str(e)})
+                continue
+            
+            if len(batch) >= batch_size:
+                db.session.execute(insert, batch)
+                db.session.commit()
+                imported_count += len(batch)
+                batch = []
+        
+        if batch:
+            db.session.execute(insert, batch)
+            imported_count += len(batch)
+    except Exception:
+        db.session.rollback()
+        finish_import(garden_id, imported_count)
+        raise
+    
+    finish_import(garden_id, imported_count)
+    
+    if skipped_count:
+        app.logger.warning(f"Skipped {skipped_count} invalid rows importing into garden {garden_id}")
+    return imported_count, skipped_count, errors
+
+# Rows fetched per round trip and bytes buffered per chunk when streaming exports
+EXPORT_YIELD_PER = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = ('timestamp', 'moisture_level', 'temperature', 'light_intensity',
+                  'humidity', 'ph_level', 'notes', 'is_manual')
+
+def parse_datetime_arg(name):
+    """Read an optional ISO 8601 query parameter as a naive UTC datetime"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def readings_export_query(garden_id, since=None, until=None):
+    """Core select of the exported columns, oldest first"""
+    table = PlantReading.__table__
+    query = db.select(*[table.c[column] for column in EXPORT_COLUMNS])\
+              .where(table.c.garden_id == garden_id)
+    if since:
+        query = query.where(table.c.timestamp >= since)
+    if until:
+        query = query.where(table.c.timestamp < until)
+    return query.order_by(table.c.timestamp.asc(), table.c.id.asc())
+
+def iter_readings_csv(garden_id, since=None, until=None):
+    """Yield a garden's readings as CSV text chunks without materialising the result set"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    
+    result = db.session.execute(readings_export_query(garden_id, since, until),
+                                execution_options={'yield_per': EXPORT_YIELD_PER})
+    for row in result:
+        writer.writerow((row[0].isoformat(),) + tuple(row[1:]))
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_readings_columnar(garden_id, since=None, until=None):
+    """Yield the columnar JSON export, {"readings": {column: [values]}}, as text chunks
+    
+    Column-major output cannot come from one row-ordered pass without holding
+    every row, so each column is streamed by a query of its own (yield_per,
+    like iter_readings_csv). The passes share one read snapshot, so readings
+    added, deleted or compacted meanwhile cannot make columns uneven.
+    """
+    table = PlantReading.__table__
+    with database.read_snapshot(db.engine) as conn:
+        yield '{"readings":{'
+        for i, column in enumerate(EXPORT_COLUMNS):
+            yield f'{"," if i else ""}{app.json.dumps(column)}:['
+            query = readings_export_query(garden_id, since, until).with_only_columns(table.c[column])
+            result = conn.execute(query, execution_options={'yield_per': EXPORT_YIELD_PER})
+            separator = ''
+            for partition in result.partitions():
+                values = [row[0] for row in partition]
+                if column == 'timestamp':
+                    values = [epoch_ms(value) for value in values]
+                yield separator + app.json.dumps(values)[1:-1]
+                separator = ','
+            yield ']'
+        yield '}}'
+
+def gzip_chunks(chunks):
+    """Gzip-compress a stream of text chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+IMPORT_FORMATS = ('csv', 'parquet', 'arrow')
+IMPORT_REQUIRED_COLUMNS = ('moisture_level', 'temperature', 'light_intensity')
+
+def parse_columnar_row(record, garden_id, now):
+    """Turn one uploaded Parquet/Arrow record into plant_readings column values, raising ValueError if invalid"""
+    values = [record.get(column) for column in IMPORT_REQUIRED_COLUMNS]
+    if None in values:
+        raise ValueError('missing required value')
+    optional = [record.get(column) for column in ('humidity', 'ph_level')]
+    is_manual = record.get('is_manual')
+    return {
+        'garden_id': garden_id,
+        'timestamp': columnar.normalize_timestamp(record.get('timestamp')) or now,
+        'moisture_level': float(values[0]),
+        'temperature': float(values[1]),
+        'light_intensity': float(values[2]),
+        'humidity': float(optional[0]) if optional[0] is not None else None,
+        'ph_level': float(optional[1]) if optional[1] is not None else None,
+        'notes': record.get('notes') or '',
+        # Exports carry is_manual; files without it are taken as manual entries
+        'is_manual': True if is_manual is None else is_manual
+    }
+
+def import_readings_columnar(garden_id, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Bulk-load a Parquet or Arrow IPC upload, one record batch per INSERT
+    
+    Returns (imported_count, skipped_count, error_samples) like
+    import_readings_csv. The schema is checked before the first insert and
+    unusable values skip their row; if the upload still fails partway, the
+    batches already committed are kept and counted by the rollup.
+    """
+    insert = PlantReading.__table__.insert()
+    imported_count = 0
+    skipped_count = 0
+    errors = []
+    offset = 0
+    try:
+        for batch in columnar.read_batches(stream, fmt, batch_size):
+            columnar.check_schema(batch.schema, IMPORT_REQUIRED_COLUMNS)
+            now = datetime.utcnow()
+            rows = []
+            for i, record in enumerate(columnar.to_rows(batch)):
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    rows.append(parse_columnar_row(record, garden_id, now))
+                except (ValueError, TypeError) as e:
+                    skipped_count += 1
+                    if len(errors) < IMPORT_ERROR_SAMPLES:
+                        errors.append({'row': offset + i, 'error': str(e)})
+            offset += batch.num_rows
+            
+            if rows:
+                db.session.execute(insert, rows)
+                db.session.commit()
+                imported_count += len(rows)
+    except Exception:
+        db.session.rollback()
+        finish_import(garden_id, imported_count)
+        raise
+    
+    finish_import(garden_id, imported_count)
+    return imported_count, skipped_count, errors
+
+def iter_readings_batches(garden_id, since=None, until=None):
+    """Arrow record batches of a garden's readings, built straight from cursor partitions"""
+    result = db.session.execute(readings_export_query(garden_id, since, until),
+                                execution_options={'yield_per': EXPORT_YIELD_PER})
+    return columnar.record_batches(result.partitions())
+
 @data_bp.route('/gardens/<int:garden_id>/import_data', methods=['POST'])
 @login_required
 def import_garden_data(garden_id):
@@ -503,47 +1474,24 @@ def import_garden_data(garden_id):
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'File must be a CSV'}), 400
-        
-        # Read CSV data
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_input = csv.DictReader(stream)
-        
-        imported_count = 0
-        for row in csv_input:
-            try:
-                # Parse timestamp
-                timestamp_str = row.get('timestamp', row.get('Timestamp', ''))
-                if timestamp_str:
-                    timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                else:
-                    timestamp = datetime.utcnow()
-                
-                reading = PlantReading(
-                    garden_id=garden_id,
-                    timestamp=timestamp,
-                    moisture_level=float(row.get('moisture_level', row.get('Moisture', 0))),
-                    temperature=float(row.get('temperature', row.get('Temperature', 0))),
-                    light_intensity=float(row.get('light_intensity', row.get('Light', 0))),
-                    humidity=float(row.get('humidity', 0)) if row.get('humidity') else None,
-                    ph_level=float(row.get('ph_level', 0)) if row.get('ph_level') else None,
-                    notes=row.get('notes', ''),
-                    is_manual=True
-                )
-                
-                db.session.add(reading)
-                imported_count += 1
-                
-            except (ValueError, KeyError) as e:
-                app.logger.warning(f"Skipping invalid row: {row}, error: {str(e)}")
-                continue
+        fmt = request.args.get('format') or columnar.format_for_filename(file.filename)
+        if fmt not in IMPORT_FORMATS:
+            return jsonify({'error': 'File must be a CSV, Parquet or Arrow file'}), 400
         
-        db.session.commit()
+        try:
+            if fmt == 'csv':
+                imported_count, skipped_count, errors = import_readings_csv(garden_id, file.stream)
+            else:
+                imported_count, skipped_count, errors = import_readings_columnar(garden_id, file.stream, fmt)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'message': f'Successfully imported {imported_count} readings',
-            'imported_count': imported_count
+            'imported_count': imported_count,
+            'skipped_count': skipped_count,
+            'errors': errors
         }), 200
         
     except Exception as e:
@@ -560,46 +1508,343 @@ def export_garden_data(garden_id):
         if not garden:
             return jsonify({'error': 'Garden not found'}), 404
         
-        readings = PlantReading.query.filter_by(garden_id=garden_id)\
-                                   .order_by(PlantReading.timestamp.asc()).all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'timestamp', 'moisture_level', 'temperature', 'light_intensity',
-            'humidity', 'ph_level', 'notes', 'is_manual'
-        ])
-        
-        # Write data
-        for reading in readings:
-            writer.writerow([
-                reading.timestamp.isoformat(),
-                reading.moisture_level,
-                reading.temperature,
-                reading.light_intensity,
-                reading.humidity,
-                reading.ph_level,
-                reading.notes,
-                reading.is_manual
-            ])
-        
-        output.seek(0)
-        
-        from flask import Response
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename=garden_{garden_id}_data.csv'
-            }
-        )
+        try:
+            since = parse_datetime_arg('since')
+            until = parse_datetime_arg('until')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        fmt = request.args.get('format', 'csv')
+        if fmt == 'parquet':
+            # Parquet writes its footer last, so the (compressed) file is built before sending
+            return Response(
+                columnar.write_parquet(iter_readings_batches(garden_id, since, until)),
+                mimetype=columnar.MIMETYPES[fmt],
+                headers={'Content-Disposition': f'attachment; filename=garden_{garden_id}_data.parquet'}
+            )
+        if fmt == 'arrow':
+            return Response(
+                stream_with_context(columnar.iter_arrow_stream(iter_readings_batches(garden_id, since, until))),
+                mimetype=columnar.MIMETYPES[fmt],
+                headers={'Content-Disposition': f'attachment; filename=garden_{garden_id}_data.arrows'}
+            )
+        if fmt == 'columnar':
+            return Response(stream_with_context(iter_readings_columnar(garden_id, since, until)),
+                            mimetype='application/json')
+        if fmt != 'csv':
+            return jsonify({'error': 'format must be csv, parquet, arrow or columnar'}), 400
+        
+        chunks = stream_with_context(iter_readings_csv(garden_id, since, until))
+        headers = {
+            'Content-Disposition': f'attachment; filename=garden_{garden_id}_data.csv',
+            'Vary': 'Accept-Encoding'
+        }
+        if request.accept_encodings['gzip'] > 0:
+            chunks = gzip_chunks(chunks)
+            headers['Content-Encoding'] = 'gzip'
+        
+        return Response(chunks, mimetype='text/csv', headers=headers)
         
     except Exception as e:
         app.logger.error(f"Export data error: {str(e)}")
         return jsonify({'error': 'Failed to export data'}), 500
 
+# Bulk ingest for sensor gateways: readings for any of the user's gardens in one request
+INGEST_MAX_READINGS = 10000
+INGEST_ERROR_SAMPLES = 100
+INGEST_REQUIRED_FIELDS = ('moisture_level', 'temperature', 'light_intensity')
+
+def load_ingest_items():
+    """Items of a batch body: a JSON array (or {"readings": [...]}), or NDJSON one reading per line
+    
+    Returns (items, errors); an NDJSON line that does not parse is reported
+    as an error for its index and kept as None.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items, errors = [], []
+        for line in request.get_data().splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(app.json.loads(line))
+            except ValueError:
+                errors.append({'index': len(items), 'error': 'invalid JSON'})
+                items.append(None)
+        return items, errors
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('readings')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of readings or NDJSON')
+    return data, []
+
+def parse_ingest_item(item, now):
+    """Turn one batch item into plant_readings column values, raising ValueError if invalid"""
+    if not isinstance(item, dict):
+        raise ValueError('reading must be an object')
+    garden_id = item.get('garden_id')
+    if isinstance(garden_id, bool) or not isinstance(garden_id, int):
+        raise ValueError('garden_id must be an integer')
+    row = {'garden_id': garden_id}
+    for field in INGEST_REQUIRED_FIELDS + ('humidity', 'ph_level'):
+        value = item.get(field)
+        if value is None:
+            if field in INGEST_REQUIRED_FIELDS:
+                raise ValueError(f'{field} is required')
+            row[field] = None
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a number')
+        if not math.isfinite(value):
+            raise ValueError(f'{field} must be a number')
+        row[field] = value
+    
+    timestamp = item.get('timestamp')
+    if timestamp:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError('timestamp must be an ISO 8601 timestamp')
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    row['timestamp'] = timestamp or now
+    row['notes'] = str(item.get('notes') or '').strip()
+    row['is_manual'] = bool(item.get('is_manual', False))
+    return row
+
+def ingest_readings(rows):
+    """Write validated rows with one bulk INSERT, fold them into the rollups and commit once
+    
+    Returns the number of readings written.
+    """
+    garden_ids = {row['garden_id'] for row in rows}
+    with_rollup = {garden_id for (garden_id,) in
+                   db.session.query(GardenStats.garden_id).filter(GardenStats.garden_id.in_(garden_ids)).all()}
+    
+    # RETURNING order is not guaranteed for a multi-row INSERT (and asking for
+    # it makes SQLite insert row by row), so ids are matched on (garden, timestamp).
+    # Rows sharing a key (say a batch without timestamps) get ascending ids in
+    # row order, so each key's ids are handed out smallest first: the last row
+    # folded, which becomes latest_reading, is the one with the highest id
+    table = PlantReading.__table__
+    result = db.session.execute(table.insert().returning(table.c.id, table.c.garden_id, table.c.timestamp), rows)
+    grouped = {}
+    for reading_id, garden_id, timestamp in result:
+        grouped.setdefault((garden_id, timestamp), []).append(reading_id)
+    reading_ids = {key: iter(sorted(ids)) for key, ids in grouped.items()}
+    
+    folds = []
+    for row in rows:
+        if row['garden_id'] not in with_rollup:
+            continue
+        fold = {f'b_{metric}': row[metric] for metric in STATS_METRICS}
+        fold.update(b_garden_id=row['garden_id'], b_timestamp=row['timestamp'],
+                    b_reading_id=next(reading_ids[(row['garden_id'], row['timestamp'])]))
+        folds.append(fold)
+    if folds:
+        db.session.execute(rollup_fold_statement(), folds)
+    rebuild_garden_stats(list(garden_ids - with_rollup))
+    db.session.commit()
+    record_access(garden_ids)
+    invalidate_predictions(garden_ids)
+    return len(rows)
+
+# Seconds a client is asked to wait when the write-behind queue is full
+INGEST_RETRY_AFTER = 1
+
+def write_queued_readings(rows):
+    """Group commit for the write-behind queue, dropping rows for gardens deleted since they were queued"""
+    with app.app_context():
+        try:
+            existing = {garden_id for (garden_id,) in
+                        db.session.query(Garden.id).filter(Garden.id.in_({row['garden_id'] for row in rows})).all()}
+            rows = [row for row in rows if row['garden_id'] in existing]
+            if rows:
+                ingest_readings(rows)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+ingest_queue = WriteBehindQueue(write_queued_readings,
+                                maxsize=app.config['INGEST_QUEUE_SIZE'],
+                                batch_size=app.config['INGEST_FLUSH_ROWS'],
+                                interval=app.config['INGEST_FLUSH_INTERVAL_MS'] / 1000)
+# Queued readings are written out when the process exits
+atexit.register(ingest_queue.stop)
+
+def enqueue_readings(rows):
+    """Hand validated rows to the write-behind queue, starting its writer on first use"""
+    ingest_queue.start()
+    return ingest_queue.put(rows)
+
+def ingest_queue_full():
+    return jsonify({'error': 'Too many readings queued, retry later'}), 429, {'Retry-After': str(INGEST_RETRY_AFTER)}
+
+@data_bp.route('/readings/batch', methods=['POST'])
+@login_required
+def add_readings_batch():
+    try:
+        try:
+            items, errors = load_ingest_items()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not items:
+            return jsonify({'error': 'Reading data is required'}), 400
+        if len(items) > INGEST_MAX_READINGS:
+            return jsonify({'error': f'At most {INGEST_MAX_READINGS} readings per batch'}), 413
+        
+        now = datetime.utcnow()
+        rejected = {error['index'] for error in errors}
+        rows, indexes = [], []
+        for index, item in enumerate(items):
+            if index in rejected:
+                continue
+            try:
+                rows.append(parse_ingest_item(item, now))
+                indexes.append(index)
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+        
+        # Ownership of every referenced garden in one query
+        owned = {garden_id for (garden_id,) in
+                 db.session.query(Garden.id).filter(Garden.id.in_({row['garden_id'] for row in rows}),
+                                                    Garden.user_id == current_user.id).all()}
+        accepted = []
+        for index, row in zip(indexes, rows):
+            if row['garden_id'] in owned:
+                accepted.append(row)
+            else:
+                errors.append({'index': index, 'error': 'Garden not found'})
+        
+        errors.sort(key=lambda error: error['index'])
+        if accepted and app.config['INGEST_WRITE_BEHIND']:
+            if not enqueue_readings(accepted):
+                return ingest_queue_full()
+            return jsonify({
+                'queued': len(accepted),
+                'rejected': len(errors),
+                'errors': errors[:INGEST_ERROR_SAMPLES]
+            }), 202
+        
+        inserted = ingest_readings(accepted) if accepted else 0
+        return jsonify({
+            'inserted': inserted,
+            'rejected': len(errors),
+            'errors': errors[:INGEST_ERROR_SAMPLES]
+        }), 201 if inserted else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Batch readings error: {str(e)}")
+        return jsonify({'error': 'Failed to add readings'}), 500
+
+# Readings considered per garden when predicting the next watering
+PREDICTION_WINDOW = timedelta(days=7)
+PREDICTION_MAX_READINGS = 20
+
+def prediction_readings_query(garden_ids, since):
+    """Select (garden_id, timestamp, moisture_level) of each garden's most recent readings, oldest first"""
+    ranked = db.select(
+        PlantReading.garden_id,
+        PlantReading.timestamp,
+        PlantReading.moisture_level,
+        db.func.row_number().over(
+            partition_by=PlantReading.garden_id,
+            order_by=(PlantReading.timestamp.desc(), PlantReading.id.desc())
+        ).label('rank')
+    ).where(PlantReading.garden_id.in_(garden_ids), PlantReading.timestamp >= since).subquery()
+    return db.select(ranked.c.garden_id, ranked.c.timestamp, ranked.c.moisture_level)\
+             .where(ranked.c.rank <= PREDICTION_MAX_READINGS)\
+             .order_by(ranked.c.garden_id, ranked.c.timestamp)
+
+def load_prediction_readings(garden_ids, since):
+    """The most recent readings of each garden as parallel arrays, grouped by garden, oldest first"""
+    rows = db.session.execute(prediction_readings_query(garden_ids, since)).all()
+    if not rows:
+        return [], [], []
+    return tuple(zip(*rows))
+
+def predict_gardens(garden_ids, thresholds, smoothing=None):
+    """Predictions for several gardens from a single readings query; None where data is lacking"""
+    now = datetime.utcnow()
+    ids, timestamps, moisture = load_prediction_readings(garden_ids, now - PREDICTION_WINDOW)
+    predictions = predict_watering_batch(ids, timestamps, moisture, thresholds, now=now, smoothing=smoothing)
+    return {garden_id: predictions.get(garden_id) for garden_id in garden_ids}
+
+# Predictions only change when a reading lands, so they are cached per
+# (garden, latest reading, threshold, smoothing); the TTL bounds drift of the
+# relative days_until_watering figure between readings
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL = 300  # seconds
+prediction_cache = TTLCache(maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+
+def invalidate_predictions(garden_ids):
+    garden_ids = set(garden_ids)
+    if garden_ids:
+        prediction_cache.discard_where(lambda key: key[0] in garden_ids)
+
+def cached_predictions(gardens, threshold, smoothing=None):
+    """Predictions for Garden objects, computing only the cache misses (in one batch)"""
+    summaries = get_garden_summaries([garden.id for garden in gardens if garden.stats is None])
+    keys = {}
+    for garden in gardens:
+        latest_reading = garden.stats.latest_reading if garden.stats else summaries[garden.id][0]
+        keys[garden.id] = (garden.id, latest_reading.id if latest_reading else None, threshold, smoothing)
+    
+    predictions = {}
+    misses = []
+    for garden_id, key in keys.items():
+        prediction = prediction_cache.get(key)
+        if prediction is MISSING:
+            misses.append(garden_id)
+        else:
+            predictions[garden_id] = prediction
+    
+    if misses:
+        computed = predict_gardens(misses, {garden_id: threshold for garden_id in misses}, smoothing=smoothing)
+        for garden_id, prediction in computed.items():
+            prediction_cache.set(keys[garden_id], prediction)
+            predictions[garden_id] = prediction
+    return predictions
+
+def parse_smoothing_arg():
+    """The optional smoothing query parameter, raising ValueError unless it is a number in (0, 1]"""
+    value = request.args.get('smoothing')
+    if value is None:
+        return None
+    try:
+        smoothing = float(value)
+    except ValueError:
+        smoothing = None
+    if smoothing is None or not 0 < smoothing <= 1:
+        raise ValueError('smoothing must be between 0 (exclusive) and 1')
+    return smoothing
+
+@data_bp.route('/gardens/predictions', methods=['GET'])
+@login_required
+def get_predictions():
+    try:
+        try:
+            smoothing = parse_smoothing_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        gardens = Garden.query.filter_by(user_id=current_user.id).all()
+        predictions = cached_predictions(gardens, current_user.moisture_threshold, smoothing=smoothing)
+        
+        return jsonify({
+            'predictions': {str(garden_id): prediction for garden_id, prediction in predictions.items()}
+        }), 200
+        
+    except Exception as e:
+        app.logger.error(f"Batch prediction error: {str(e)}")
+        return jsonify({'error': 'Failed to generate predictions'}), 500
+
 @data_bp.route('/gardens/<int:garden_id>/prediction', methods=['GET'])
 @login_required
 def get_prediction(garden_id):
@@ -609,78 +1854,133 @@ def get_prediction(garden_id):
         if not garden:
             return jsonify({'error': 'Garden not found'}), 404
         
-        # Get recent readings for prediction
-        recent_readings = PlantReading.query.filter_by(garden_id=garden_id)\
-                                          .filter(PlantReading.timestamp >= datetime.utcnow() - timedelta(days=7))\
-                                          .order_by(PlantReading.timestamp.desc()).limit(20).all()
+        try:
+            smoothing = parse_smoothing_arg()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        if len(recent_readings) < 3:
+        prediction = cached_predictions([garden], current_user.moisture_threshold,
+                                        smoothing=smoothing)[garden_id]
+        if prediction is None:
             return jsonify({
                 'next_watering_estimate': 'Not enough data',
                 'recommendation': 'Add more readings to get predictions'
             }), 200
         
-        # Simple prediction based on moisture decline rate
-        moisture_values = [r.moisture_level for r in reversed(recent_readings)]
-        
-        # Calculate average moisture decline per day
-        if len(moisture_values) >= 2:
-            daily_decline = (moisture_values[0] - moisture_values[-1]) / len(moisture_values)
-            current_moisture = moisture_values[-1]
-            
-            # Predict when moisture will reach threshold
-            days_until_watering = max(0, (current_moisture - current_user.moisture_threshold) / max(daily_decline, 1))
-            
-            next_watering = datetime.utcnow() + timedelta(days=days_until_watering)
-            
-            recommendation = "Water soon" if days_until_watering < 1 else "Plant is healthy"
-            
-            return jsonify({
-                'next_watering_estimate': next_watering.isoformat(),
-                'days_until_watering': round(days_until_watering, 1),
-                'current_moisture': current_moisture,
-                'recommendation': recommendation
-            }), 200
-        
-        return jsonify({
-            'next_watering_estimate': 'Unable to calculate',
-            'recommendation': 'Monitor moisture levels'
-        }), 200
+        return jsonify(prediction), 200
         
     except Exception as e:
         app.logger.error(f"Prediction error: {str(e)}")
         return jsonify({'error': 'Failed to generate prediction'}), 500
 
 # Weather API Routes
-import requests
+from scheduler import FileLock, PeriodicTask
+from weather import OPENWEATHER_URL, WeatherService, WeatherUnavailable, location_key
 
 weather_bp = Blueprint('weather', __name__)
 
+# Shared by every request: one keep-alive connection pool and one response cache
+weather_service = WeatherService(
+    os.environ.get('WEATHER_API_KEY'),
+    url=os.environ.get('WEATHER_API_URL', OPENWEATHER_URL),
+    ttl=int(os.environ.get('WEATHER_CACHE_TTL', 600)),
+    stale_ttl=int(os.environ.get('WEATHER_STALE_TTL', 3600))
+)
+
+def garden_weather_cells():
+    """Distinct grid cells (weather location keys) of the gardens that have coordinates"""
+    rows = db.session.query(Garden.location_lat, Garden.location_lon)\
+                     .filter(Garden.location_lat.isnot(None), Garden.location_lon.isnot(None))\
+                     .distinct().all()
+    return {location_key(lat=lat, lon=lon) for lat, lon in rows}
+
+def prefetch_weather():
+    """Refresh the stored weather of every garden grid cell; returns how many cells were refreshed"""
+    if not weather_service.enabled:
+        return 0
+    cells = garden_weather_cells()
+    fetched = weather_service.refresh_many(cells, app.config['WEATHER_PREFETCH_CONCURRENCY'])
+    if not fetched:
+        return 0
+    now = datetime.utcnow()
+    snapshots = WeatherSnapshot.__table__
+    # Replace the refreshed cells' rows: one DELETE and one executemany INSERT
+    db.session.execute(snapshots.delete().where(
+        db.tuple_(snapshots.c.lat, snapshots.c.lon).in_([(lat, lon) for _, lat, lon in fetched])))
+    db.session.execute(snapshots.insert(), [{'lat': lat, 'lon': lon, 'fetched_at': now, 'data': data}
+                                            for (_, lat, lon), data in fetched.items()])
+    db.session.commit()
+    return len(fetched)
+
+def run_weather_prefetch():
+    with app.app_context():
+        try:
+            prefetch_weather()
+        except Exception as e:
+            app.logger.error(f"Weather prefetch error: {str(e)}")
+            db.session.rollback()
+
+weather_prefetch_task = PeriodicTask(run_weather_prefetch, app.config['WEATHER_PREFETCH_INTERVAL'],
+                                     name='weather-prefetch', lock=FileLock(app.config['WEATHER_PREFETCH_LOCK_FILE']))
+
+def start_weather_prefetch():
+    """Start the weather prefetch job in a background thread; it only runs in the process holding the lock"""
+    weather_prefetch_task.start()
+
+def stop_weather_prefetch(timeout=None):
+    weather_prefetch_task.stop(timeout)
+
+@app.cli.command('prefetch-weather')
+def prefetch_weather_command():
+    """Refresh the stored weather of every garden location once (suitable for cron)"""
+    print(f'Refreshed weather for {prefetch_weather()} grid cells')
+
+def stored_garden_weather(garden):
+    """The prefetched weather of a garden's grid cell, or None if there is none recent enough"""
+    _, lat, lon = location_key(lat=garden.location_lat, lon=garden.location_lon)
+    snapshot = db.session.get(WeatherSnapshot, (lat, lon))
+    if snapshot is None or datetime.utcnow() - snapshot.fetched_at > timedelta(seconds=weather_service.stale_ttl):
+        return None
+    return snapshot.data
+
 @weather_bp.route('/weather', methods=['GET'])
 @login_required
 def get_weather():
     try:
         location = request.args.get('location')
-        
-        if not location:
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        
+        garden_id = request.args.get('garden_id', type=int)
+        if garden_id is not None:
+            garden = Garden.query.filter_by(id=garden_id, user_id=current_user.id).first()
+            if not garden:
+                return jsonify({'error': 'Garden not found'}), 404
+            if garden.location_lat is not None and garden.location_lon is not None:
+                # Served from the prefetched snapshot, see prefetch_weather
+                stored = stored_garden_weather(garden)
+                if stored is not None:
+                    return jsonify(stored), 200
+                lat, lon = garden.location_lat, garden.location_lon
+            else:
+                location = garden.location
+        
+        if not location and (lat is None or lon is None):
             return jsonify({'error': 'Location parameter is required'}), 400
         
-        # For demo purposes, we'll simulate weather data
-        api_key = os.environ.get('WEATHER_API_KEY')
-        
-        if api_key:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}&units=metric"
-            response = requests.get(url)
-            if response.status_code == 200:
-                return jsonify(response.json()), 200
-            pass
+        if weather_service.enabled:
+            try:
+                return jsonify(weather_service.current(location, lat, lon)), 200
+            except WeatherUnavailable:
+                pass
         
+        # For demo purposes, we'll simulate weather data
         # Simulated weather data
         import random
         weather_conditions = ['sunny', 'cloudy', 'rainy', 'partly cloudy', 'overcast']
         
         simulated_data = {
-            'name': location,
+            'name': location or f'{lat:.2f},{lon:.2f}',
             'main': {
                 'temp': round(15 + random.random() * 20, 1),
                 'humidity': round(40 + random.random() * 40),
@@ -704,128 +2004,495 @@ def get_weather():
         return jsonify({'error': 'Failed to fetch weather data'}), 500
 
 # Simulation and Utility Functions
-import random
-import threading
-import time
+import click
+import numpy as np
+import simulation
+from scheduler import FileLock, SimulationScheduler
+
+# Seconds between re-reads of which gardens are simulated and how often
+SIMULATION_REFRESH_INTERVAL = 30
+
+def load_simulated_gardens(garden_ids=None):
+    """Simulated gardens with their rollup's garden_id and latest reading values, in one query
+    
+    The rollup column is None for gardens that have no rollup yet.
+    """
+    latest = db.aliased(PlantReading)
+    query = db.select(Garden.id, Garden.sensor_type, GardenStats.garden_id,
+                      *[getattr(latest, metric) for metric in STATS_METRICS], Garden.location_lon)\
+              .outerjoin(GardenStats, GardenStats.garden_id == Garden.id)\
+              .outerjoin(latest, latest.id == GardenStats.latest_reading_id)\
+              .where(Garden.sensor_type.in_(simulation.SENSOR_TYPES))
+    if garden_ids is not None:
+        query = query.where(Garden.id.in_(garden_ids))
+    return db.session.execute(query.order_by(Garden.id)).all()
+
+def rollup_fold_statement():
+    """UPDATE folding one new reading into a rollup, run executemany with one parameter set per garden"""
+    stats = GardenStats.__table__
+    timestamp = db.bindparam('b_timestamp', type_=db.DateTime)
+    is_latest = db.or_(stats.c.latest_timestamp.is_(None), stats.c.latest_timestamp <= timestamp)
+    values = {
+        'readings_count': stats.c.readings_count + 1,
+        'latest_reading_id': db.case((is_latest, db.bindparam('b_reading_id')), else_=stats.c.latest_reading_id),
+        'latest_timestamp': db.case((is_latest, timestamp), else_=stats.c.latest_timestamp),
+    }
+    for metric in STATS_METRICS:
+        value = db.bindparam(f'b_{metric}', type_=db.Float)
+        current_min = stats.c[f'{metric}_min']
+        current_max = stats.c[f'{metric}_max']
+        values[f'{metric}_min'] = db.case((value.is_(None), current_min),
+                                          (db.or_(current_min.is_(None), value < current_min), value),
+                                          else_=current_min)
+        values[f'{metric}_max'] = db.case((value.is_(None), current_max),
+                                          (db.or_(current_max.is_(None), value > current_max), value),
+                                          else_=current_max)
+        values[f'{metric}_sum'] = stats.c[f'{metric}_sum'] + db.func.coalesce(value, 0.0)
+        values[f'{metric}_count'] = stats.c[f'{metric}_count'] + db.case((value.is_(None), 0), else_=1)
+    return stats.update().where(stats.c.garden_id == db.bindparam('b_garden_id')).values(values)
+
+def simulate_tick(now=None, rng=None, garden_ids=None):
+    """Add one simulated reading to every simulated garden (or just garden_ids); returns the number written
+    
+    Latest readings come from one query and new values from one vectorised
+    step; they are written with one bulk INSERT and folded into the rollups
+    with one executemany UPDATE, whatever the number of gardens.
+    """
+    now = now or datetime.utcnow()
+    gardens = load_simulated_gardens(garden_ids)
+    if not gardens:
+        return 0
+    
+    previous = {metric: [garden[3 + i] for garden in gardens] for i, metric in enumerate(STATS_METRICS)}
+    full = [garden[1] == 'simulated_full' for garden in gardens]
+    # The light cycle follows the simulated clock, at each garden's longitude
+    hours = simulation.solar_hours(now, [garden.location_lon for garden in gardens])
+    draws = None
+    if rng is None and app.config['SIMULATION_SEED'] is not None:
+        draws = simulation.tick_draws(app.config['SIMULATION_SEED'], [garden[0] for garden in gardens],
+                                      (now - EPOCH).total_seconds())
+    values = simulation.simulate_readings(previous, full, hours, rng=rng, draws=draws)
+    
+    rows = []
+    for i, garden in enumerate(gardens):
+        row = {'garden_id': garden[0], 'timestamp': now, 'is_manual': False}
+        for metric in STATS_METRICS:
+            value = float(values[metric][i])
+            row[metric] = None if math.isnan(value) else value
+        rows.append(row)
+    
+    table = PlantReading.__table__
+    result = db.session.execute(table.insert().returning(table.c.id, table.c.garden_id), rows)
+    reading_ids = {garden_id: reading_id for reading_id, garden_id in result}
+    
+    # Gardens without a rollup are seeded from the table, which now holds the new rows
+    missing = [garden[0] for garden in gardens if garden[2] is None]
+    folds = []
+    for garden, row in zip(gardens, rows):
+        if garden[2] is None:
+            continue
+        fold = {f'b_{metric}': row[metric] for metric in STATS_METRICS}
+        fold.update(b_garden_id=garden[0], b_reading_id=reading_ids[garden[0]], b_timestamp=now)
+        folds.append(fold)
+    if folds:
+        db.session.execute(rollup_fold_statement(), folds)
+    rebuild_garden_stats(missing)
+    db.session.commit()
+    invalidate_predictions(reading_ids.keys())
+    return len(rows)
+
+# Rows per INSERT when backfilling simulated readings
+BACKFILL_BATCH_ROWS = 50000
 
-def generate_simulated_data():
-    """Background task to generate simulated sensor data"""
+def backfill_simulation(start, end, interval, seed=None, garden_ids=None):
+    """Simulated readings every `interval` over [start, end) for every simulated garden (or just garden_ids)
+    
+    Each garden's values come from its own seeded stream (random when seed
+    is None) and are generated for all gardens at once, a step at a time
+    (see simulation.simulate_series). Rows are bulk inserted in
+    BACKFILL_BATCH_ROWS batches straight through the DBAPI driver, and the
+    rollups rebuilt once at the end.
+    Returns the number of readings written.
+    """
+    gardens = load_simulated_gardens(garden_ids)
+    count = math.ceil((end - start) / interval)
+    if not gardens or count <= 0:
+        return 0
+    
+    ids = [garden[0] for garden in gardens]
+    rngs = [simulation.garden_rng(seed, garden_id) if seed is not None else np.random.default_rng()
+            for garden_id in ids]
+    full = [garden[1] == 'simulated_full' for garden in gardens]
+    series = simulation.simulate_series({}, full, [garden.location_lon for garden in gardens],
+                                        start, interval, count, rngs)
+    connection = db.session.connection()
+    table = PlantReading.__table__
+    insert = table.insert().compile(dialect=connection.dialect,
+                                    column_keys=['garden_id', 'timestamp', 'is_manual', *STATS_METRICS])
+    names = insert.positiontup if insert.positional else insert.binds
+    to_driver = table.c.timestamp.type.dialect_impl(connection.dialect).bind_processor(connection.dialect)
+    is_manual = table.c.is_manual.type.dialect_impl(connection.dialect).bind_processor(connection.dialect)
+    written = 0
+    for offset, chunk in series:
+        steps = len(chunk['moisture_level'])
+        timestamps = [start + (offset + step) * interval for step in range(steps)]
+        if to_driver:
+            timestamps = [to_driver(timestamp) for timestamp in timestamps]
+        # Step-major like the chunk arrays: every garden's reading for one time, then the next.
+        # Values go to the driver already in its form (timestamps processed once per step), which
+        # skips SQLAlchemy's per-row parameter processing, the bulk of the cost at this size.
+        values = {metric: [None if value != value else value for value in chunk[metric].ravel().tolist()]
+                  for metric in STATS_METRICS}
+        values['garden_id'] = ids * steps
+        values['timestamp'] = [timestamp for timestamp in timestamps for _ in ids]
+        values['is_manual'] = [is_manual(False) if is_manual else False] * (steps * len(ids))
+        rows = list(zip(*(values[name] for name in names)))
+        if not insert.positional:
+            rows = [dict(zip(names, row)) for row in rows]
+        for batch in range(0, len(rows), BACKFILL_BATCH_ROWS):
+            connection.exec_driver_sql(insert.string, rows[batch:batch + BACKFILL_BATCH_ROWS])
+        db.session.commit()
+        connection = db.session.connection()
+        written += len(rows)
+    
+    rebuild_garden_stats(ids)
+    db.session.commit()
+    invalidate_predictions(ids)
+    return written
+
+@app.cli.command('simulate-backfill')
+@click.option('--days', type=float, default=30, help='How far back from now to start')
+@click.option('--interval', type=int, default=600, help='Seconds between simulated readings')
+@click.option('--seed', type=int, default=None, help='Seed for reproducible readings')
+@click.option('--create-gardens', type=int, default=0, help='Create this many simulated gardens first')
+@click.option('--user', 'username', help='Owner of the created gardens')
+def simulate_backfill_command(days, interval, seed, create_gardens, username):
+    """Fill the past --days with simulated readings for every simulated garden (e.g. for load tests)"""
+    if create_gardens:
+        user = User.query.filter_by(username=username).first() if username else None
+        if user is None:
+            raise click.UsageError('--create-gardens needs the --user who owns them')
+        db.session.execute(Garden.__table__.insert(), [
+            {'user_id': user.id, 'name': f'Simulated garden {i + 1}', 'sensor_type': simulation.SENSOR_TYPES[i % 2]}
+            for i in range(create_gardens)])
+        db.session.commit()
+    end = datetime.utcnow()
+    started = datetime.utcnow()
+    written = backfill_simulation(end - timedelta(days=days), end, timedelta(seconds=interval), seed=seed)
+    print(f'Wrote {written} simulated readings in {(datetime.utcnow() - started).total_seconds():.1f} s')
+
+def load_simulation_frequencies():
+    """{garden_id: owner's simulation_frequency} for every simulated garden"""
+    return dict(db.session.query(Garden.id, User.simulation_frequency)
+                          .join(User, Garden.user_id == User.id)
+                          .filter(Garden.sensor_type.in_(simulation.SENSOR_TYPES)).all())
+
+def scheduled_frequencies():
     with app.app_context():
-        while True:
-            try:
-                # Get all gardens with simulation enabled
-                gardens = Garden.query.filter(Garden.sensor_type.like('simulated%')).all()
-                
-                for garden in gardens:
-                    if garden.sensor_type == 'none':
-                        continue
-                    
-                    # Get latest reading
-                    latest = PlantReading.query.filter_by(garden_id=garden.id)\
-                                             .order_by(PlantReading.timestamp.desc()).first()
-                    
-                    # Generate new reading based on sensor type and previous data
-                    if garden.sensor_type == 'simulated_basic':
-                        moisture = generate_moisture_reading(latest)
-                        temp = generate_temperature_reading(latest)
-                        light = generate_light_reading(latest)
-                        
-                        new_reading = PlantReading(
-                            garden_id=garden.id,
-                            moisture_level=moisture,
-                            temperature=temp,
-                            light_intensity=light,
-                            is_manual=False,
-                            timestamp=datetime.utcnow()
-                        )
-                        
-                    elif garden.sensor_type == 'simulated_full':
-                        moisture = generate_moisture_reading(latest)
-                        temp = generate_temperature_reading(latest)
-                        light = generate_light_reading(latest)
-                        humidity = generate_humidity_reading(latest)
-                        ph = generate_ph_reading(latest)
-                        
-                        new_reading = PlantReading(
-                            garden_id=garden.id,
-                            moisture_level=moisture,
-                            temperature=temp,
-                            light_intensity=light,
-                            humidity=humidity,
-                            ph_level=ph,
-                            is_manual=False,
-                            timestamp=datetime.utcnow()
-                        )
-                    else:
-                        continue
-                    
-                    db.session.add(new_reading)
-                    
-                    # Clean up old readings (keep last 1000 per garden)
-                    old_readings = PlantReading.query.filter_by(garden_id=garden.id)\
-                                                   .order_by(PlantReading.timestamp.desc())\
-                                                   .offset(1000).all()
-                    for old_reading in old_readings:
-                        db.session.delete(old_reading)
-                
-                db.session.commit()
-                
-            except Exception as e:
-                app.logger.error(f"Simulation error: {str(e)}")
-                db.session.rollback()
-            
-            # Wait before next simulation cycle
-            time.sleep(60)  # Generate data every minute
-
-def generate_moisture_reading(latest):
-    if latest:
-        # Gradual decline with some variation
-        base = latest.moisture_level - random.uniform(0.5, 2.0)
-        variation = random.uniform(-5, 5)
-        return max(0, min(100, base + variation))
-    return random.uniform(40, 80)
-
-def generate_temperature_reading(latest):
-    if latest:
-        # Small variations around previous reading
-        base = latest.temperature
-        variation = random.uniform(-2, 2)
-        return max(5, min(40, base + variation))
-    return random.uniform(18, 25)
-
-def generate_light_reading(latest):
-    # Simulate day/night cycle
-    hour = datetime.now().hour
-    if 6 <= hour <= 18:  # Daytime
-        base_light = random.uniform(500, 1500)
-    else:  # Nighttime
-        base_light = random.uniform(0, 100)
-    
-    if latest:
-        # Smooth transition
-        diff = base_light - latest.light_intensity
-        return latest.light_intensity + (diff * 0.3) + random.uniform(-50, 50)
-    return base_light
-
-def generate_humidity_reading(latest):
-    if latest and latest.humidity:
-        base = latest.humidity
-        variation = random.uniform(-3, 3)
-        return max(20, min(100, base + variation))
-    return random.uniform(45, 75)
-
-def generate_ph_reading(latest):
-    if latest and latest.ph_level:
-        base = latest.ph_level
-        variation = random.uniform(-0.1, 0.1)
-        return max(4.0, min(8.0, base + variation))
-    return random.uniform(6.0, 7.5)
+        return load_simulation_frequencies()
+
+def scheduled_tick(garden_ids, now):
+    """Simulate the gardens the scheduler found due, all in one batched tick"""
+    with app.app_context():
+        try:
+            simulate_tick(now=datetime.utcfromtimestamp(now), garden_ids=garden_ids)
+        except Exception as e:
+            app.logger.error(f"Simulation error: {str(e)}")
+            db.session.rollback()
+
+simulation_scheduler = SimulationScheduler(
+    scheduled_frequencies, scheduled_tick,
+    lock=FileLock(app.config['SIMULATION_LOCK_FILE']),
+    refresh_interval=SIMULATION_REFRESH_INTERVAL
+)
+
+def start_simulation():
+    """Start the simulator in a background thread; it only ticks in the process holding the lock"""
+    simulation_scheduler.start()
+
+def stop_simulation(timeout=None):
+    simulation_scheduler.stop(timeout)
+
+@app.cli.command('simulate')
+def simulate_command():
+    """Run the simulator in the foreground until interrupted"""
+    print(f"Simulating; lock file {app.config['SIMULATION_LOCK_FILE']}")
+    try:
+        simulation_scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+# Retention: raw readings are kept for RAW_RETENTION_DAYS and then compacted
+# into hourly buckets; hourly buckets older than HOURLY_RETENTION_DAYS are
+# compacted into daily buckets, which are kept indefinitely
+COMPACTION_INTERVAL = 3600  # seconds
+SQLITE_BUCKET_FORMATS = {'hour': '%Y-%m-%d %H:00:00', 'day': '%Y-%m-%d 00:00:00'}
+
+def truncate_datetime(value, unit):
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if unit == 'day' else value
+
+def time_bucket(column, unit):
+    """SQL expression truncating a timestamp column to the start of its hour or day"""
+    if db.engine.dialect.name == 'sqlite':
+        return db.type_coerce(db.func.strftime(SQLITE_BUCKET_FORMATS[unit], column), db.DateTime)
+    return db.func.date_trunc(unit, column)
+
+def bucket_query(source, unit, *criteria):
+    """Group raw readings or aggregate rows into hour or day buckets
+    
+    Rows are (garden_id, bucket, readings_count, then min/max/sum/count per
+    metric), the layout ReadingAggregateMixin.merge expects.
+    """
+    if source is PlantReading:
+        bucket = time_bucket(PlantReading.timestamp, unit)
+        columns = [PlantReading.garden_id, bucket, db.func.count()]
+        for metric in STATS_METRICS:
+            column = getattr(PlantReading, metric)
+            columns += [db.func.min(column), db.func.max(column), db.func.sum(column), db.func.count(column)]
+    else:
+        bucket = time_bucket(source.bucket, unit)
+        columns = [source.garden_id, bucket, db.func.sum(source.readings_count)]
+        for metric in STATS_METRICS:
+            columns += [db.func.min(getattr(source, f'{metric}_min')), db.func.max(getattr(source, f'{metric}_max')),
+                        db.func.sum(getattr(source, f'{metric}_sum')), db.func.sum(getattr(source, f'{metric}_count'))]
+    return db.select(*columns).where(*criteria).group_by(source.garden_id, bucket)
+
+def bucket_values(row):
+    """Per-metric (min, max, sum, count) tuples of a bucket_query row"""
+    return {metric: tuple(row[3 + i * 4:7 + i * 4]) for i, metric in enumerate(STATS_METRICS)}
+
+def merge_buckets(model, rows):
+    """Fold bucket_query rows into an aggregate table, adding to buckets that already exist"""
+    if not rows:
+        return
+    buckets = [row[1] for row in rows]
+    existing = {
+        (aggregate.garden_id, aggregate.bucket): aggregate
+        for aggregate in model.query.filter(model.garden_id.in_({row[0] for row in rows}),
+                                            model.bucket.between(min(buckets), max(buckets))).all()
+    }
+    for row in rows:
+        aggregate = existing.get((row[0], row[1]))
+        if aggregate is None:
+            aggregate = model(garden_id=row[0], bucket=row[1], readings_count=0)
+            db.session.add(aggregate)
+            existing[(row[0], row[1])] = aggregate
+        aggregate.merge(row[2], bucket_values(row))
+
+def compact_tier(source, time_column, target, unit, cutoff, window):
+    """Move source rows older than cutoff into target buckets, one window per transaction
+    
+    Returns the number of readings the moved rows stand for.
+    """
+    compacted = 0
+    while True:
+        oldest = db.session.query(db.func.min(time_column)).filter(time_column < cutoff).scalar()
+        if oldest is None:
+            return compacted
+        window_end = min(cutoff, truncate_datetime(oldest, 'day') + window)
+        rows = db.session.execute(bucket_query(source, unit, time_column < window_end)).all()
+        merge_buckets(target, rows)
+        db.session.flush()
+        
+        table = source.__table__
+        if source is PlantReading:
+            # Rollups keep their totals, but can no longer point at a compacted reading
+            stats = GardenStats.__table__
+            db.session.execute(stats.update().where(stats.c.latest_reading_id.in_(
+                db.select(table.c.id).where(table.c.timestamp < window_end)
+            )).values(latest_reading_id=None))
+        db.session.execute(table.delete().where(time_column < window_end))
+        db.session.commit()
+        compacted += sum(row[2] for row in rows)
+
+def compact_readings(now=None):
+    """Apply the retention tiers; returns (raw readings compacted, readings moved from hourly to daily)
+    
+    Rollups already hold every reading, so they are not touched; rebuilds read
+    the aggregate tables alongside plant_readings.
+    """
+    now = now or datetime.utcnow()
+    raw_cutoff = truncate_datetime(now - timedelta(days=app.config['RAW_RETENTION_DAYS']), 'hour')
+    hourly_cutoff = truncate_datetime(now - timedelta(days=app.config['HOURLY_RETENTION_DAYS']), 'day')
+    raw = compact_tier(PlantReading, PlantReading.timestamp, HourlyReadingAggregate, 'hour',
+                       raw_cutoff, timedelta(days=1))
+    hourly = compact_tier(HourlyReadingAggregate, HourlyReadingAggregate.bucket, DailyReadingAggregate, 'day',
+                          hourly_cutoff, timedelta(days=31))
+    return raw, hourly
+
+def load_reading_buckets(garden_id, unit, since=None, until=None):
+    """A garden's history in hour or day buckets, read from every tier
+    
+    Periods older than the hourly retention only exist as daily buckets, so
+    at hour resolution they come back as one bucket per day.
+    """
+    merged = {}
+    for source, time_column in ((PlantReading, PlantReading.timestamp),
+                                (HourlyReadingAggregate, HourlyReadingAggregate.bucket),
+                                (DailyReadingAggregate, DailyReadingAggregate.bucket)):
+        criteria = [source.garden_id == garden_id]
+        if since:
+            criteria.append(time_column >= since)
+        if until:
+            criteria.append(time_column < until)
+        for row in db.session.execute(bucket_query(source, unit, *criteria)):
+            readings_count, values = merged.get(row[1], (0, {}))
+            for metric, metric_values in bucket_values(row).items():
+                values[metric] = merge_metric_values(values.get(metric, (None, None, None, 0)), metric_values)
+            merged[row[1]] = (readings_count + row[2], values)
+    
+    buckets = []
+    for bucket in sorted(merged):
+        readings_count, values = merged[bucket]
+        entry = {'bucket': bucket.isoformat(), 'readings_count': readings_count}
+        for metric, (metric_min, metric_max, metric_sum, metric_count) in values.items():
+            entry[metric] = {
+                'min': metric_min,
+                'max': metric_max,
+                'mean': round(metric_sum / metric_count, 2) if metric_count else None
+            }
+        buckets.append(entry)
+    return buckets
+
+def run_compaction():
+    with app.app_context():
+        try:
+            raw, hourly = compact_readings()
+            if raw or hourly:
+                app.logger.info(f"Compacted {raw} raw readings and {hourly} hourly-bucketed readings")
+        except Exception as e:
+            app.logger.error(f"Compaction error: {str(e)}")
+            db.session.rollback()
+
+def epoch_seconds(column, dialect_name=None):
+    """SQL expression for a timestamp column as seconds since the Unix epoch"""
+    if (dialect_name or db.engine.dialect.name) == 'sqlite':
+        # Whole seconds: julianday() arithmetic drifts across slice boundaries
+        return db.cast(db.func.strftime('%s', column), db.Integer)
+    return db.func.extract('epoch', column)
+
+def reading_series_queries(garden_id, start, end, points, dialect_name=None):
+    """(slice_seconds, selects) for a garden's readings between start and end in `points` time slices
+    
+    One GROUP BY slice select per tier (raw readings, hourly and daily
+    buckets); fold their rows together with fold_series_rows.
+    """
+    slice_seconds = max((end - start).total_seconds() / points, 1.0)
+    start_epoch = (start - datetime(1970, 1, 1)).total_seconds()
+    
+    queries = []
+    for source, time_column in ((PlantReading, PlantReading.timestamp),
+                                (HourlyReadingAggregate, HourlyReadingAggregate.bucket),
+                                (DailyReadingAggregate, DailyReadingAggregate.bucket)):
+        index = db.cast((epoch_seconds(time_column, dialect_name) - start_epoch) / slice_seconds, db.Integer)
+        if source is PlantReading:
+            columns = [index, db.func.count()]
+            for metric in STATS_METRICS:
+                column = getattr(PlantReading, metric)
+                columns += [db.func.sum(column), db.func.count(column)]
+        else:
+            columns = [index, db.func.sum(source.readings_count)]
+            for metric in STATS_METRICS:
+                columns += [db.func.sum(getattr(source, f'{metric}_sum')),
+                            db.func.sum(getattr(source, f'{metric}_count'))]
+        queries.append(db.select(*columns)
+                         .where(source.garden_id == garden_id, time_column >= start, time_column < end)
+                         .group_by(index))
+    return slice_seconds, queries
+
+def fold_series_rows(slices, rows, points):
+    """Add rows of a reading_series_queries select into {slice index: (readings_count, {metric: (sum, count)})}"""
+    for row in rows:
+        # A slice index of `points` can only come from rounding at the very end of the range
+        slice_index = min(row[0], points - 1)
+        readings_count, values = slices.get(slice_index, (0, {}))
+        for i, metric in enumerate(STATS_METRICS):
+            metric_sum, metric_count = values.get(metric, (0.0, 0))
+            values[metric] = (metric_sum + (row[2 + i * 2] or 0.0), metric_count + (row[3 + i * 2] or 0))
+        slices[slice_index] = (readings_count + row[1], values)
+    return slices
+
+def load_reading_series(garden_id, start, end, points):
+    """A garden's readings between start and end averaged into at most `points` equal time slices
+    
+    Slices are computed in SQL over raw readings and both aggregate tiers, so
+    the result size depends on `points` rather than on how many readings
+    the range holds. Returns (slice_seconds, {slice index: (readings_count,
+    {metric: (sum, count)})}).
+    """
+    slice_seconds, queries = reading_series_queries(garden_id, start, end, points)
+    slices = {}
+    for query in queries:
+        fold_series_rows(slices, db.session.execute(query), points)
+    return slice_seconds, slices
+
+def series_payload(start, end, slice_seconds, slices):
+    """Parallel arrays, one entry per non-empty slice, timestamps as epoch milliseconds"""
+    start_ms = (start - datetime(1970, 1, 1)).total_seconds() * 1000
+    indexes = sorted(slices)
+    series = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'slice_seconds': slice_seconds,
+        'timestamps': [int(start_ms + index * slice_seconds * 1000) for index in indexes],
+        'readings_count': [slices[index][0] for index in indexes]
+    }
+    for metric in STATS_METRICS:
+        series[metric] = []
+        for index in indexes:
+            metric_sum, metric_count = slices[index][1][metric]
+            series[metric].append(round(metric_sum / metric_count, 2) if metric_count else None)
+    return series
+
+compaction_task = PeriodicTask(run_compaction, COMPACTION_INTERVAL, name='reading-compaction',
+                               lock=FileLock(app.config['COMPACTION_LOCK_FILE']))
+
+def start_compaction():
+    """Start the retention job in a background thread; it only runs in the process holding the lock"""
+    compaction_task.start()
+
+def stop_compaction(timeout=None):
+    compaction_task.stop(timeout)
+
+@app.cli.command('compact-readings')
+def compact_readings_command():
+    """Compact readings past their retention window once (suitable for cron)"""
+    raw, hourly = compact_readings()
+    print(f'Compacted {raw} raw readings into hourly buckets and {hourly} into daily buckets')
+
+# Monitoring Routes
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.before_request
+def require_metrics_enabled():
+    # Checked before the login so a disabled endpoint looks absent rather than protected
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'error': 'Not found'}), 404
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@login_required
+def get_metrics():
+    return jsonify({
+        'user_cache': user_cache.stats(),
+        'token_cache': security.token_cache.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'readings_total_cache': readings_total_cache.stats(),
+        'simulation': simulation_scheduler.stats(),
+        'compaction': compaction_task.stats(),
+        'ingest_queue': dict(ingest_queue.stats(), enabled=app.config['INGEST_WRITE_BEHIND']),
+        'access_flush': dict(access_flush_task.stats(), pending=len(access_tracker)),
+        'weather': weather_service.stats(),
+        'weather_prefetch': weather_prefetch_task.stats(),
+        'database': {'profile': app.config['DATABASE_PROFILE'], 'pool': db.engine.pool.status()}
+    }), 200
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(gardens_bp, url_prefix='/api')
 app.register_blueprint(data_bp, url_prefix='/api')
 app.register_blueprint(weather_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
 
 # Serve frontend
 @app.route('/')
@@ -846,13 +2513,32 @@ def internal_error(error):
     db.session.rollback()
     return jsonify({'error': 'Internal server error'}), 500
 
-# Create database tables and start simulation
+def ensure_indexes():
+    """Create indexes declared on the models that existing tables lack; returns their names
+    
+    db.create_all only creates missing tables, so an index added to a model
+    later would never reach a database created before it.
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+    for table in db.metadata.tables.values():
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    return created
+
+# Create database tables and any indexes they are missing
 with app.app_context():
     db.create_all()
-    
-    # Start simulation in background thread
-    simulation_thread = threading.Thread(target=generate_simulated_data, daemon=True)
-    simulation_thread.start()
+    for index_name in ensure_indexes():
+        app.logger.info(f"Created index {index_name}")
 
 if __name__ == '__main__':
+    start_simulation()
+    start_compaction()
+    start_weather_prefetch()
     app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""Next-watering prediction from moisture readings
+
+Moisture is modelled as a straight line against real elapsed time: the
+decline rate is the least-squares slope of moisture over the timestamps
+of the readings (not over their sample index), optionally combined with an
+exponentially smoothed estimate of the current level. Everything is done
+with NumPy over flat arrays so that one call can serve thousands of
+gardens at once.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Fewer readings than this give no prediction
+MIN_READINGS = 3
+# Decline rates are floored so a flat or rising trend still yields a finite estimate (% per day)
+MIN_DAILY_DECLINE = 1.0
+
+def _days_before(timestamps, now):
+    """Convert datetimes to float days relative to now (negative in the past)"""
+    stamps = np.asarray(timestamps, dtype='datetime64[us]')
+    return (stamps - np.datetime64(now, 'us')) / np.timedelta64(1, 'D')
+
+def predict_watering_batch(garden_ids, timestamps, moisture, thresholds, now=None, smoothing=None):
+    """Predict next watering for many gardens in one vectorised pass
+
+    garden_ids, timestamps and moisture are parallel sequences holding the
+    readings of every garden, grouped by garden and in ascending time within
+    each group. thresholds maps garden_id -> moisture threshold (%).
+    smoothing is an optional exponential smoothing factor in (0, 1] applied
+    to the current moisture level; None uses the latest reading as-is.
+
+    Returns {garden_id: prediction dict or None when there is too little data}.
+    """
+    now = now or datetime.utcnow()
+    ids = np.asarray(garden_ids)
+    if ids.size == 0:
+        return {}
+
+    t = _days_before(timestamps, now)
+    m = np.asarray(moisture, dtype=float)
+
+    # Contiguous group boundaries (input is grouped by garden)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], ids.size]
+    group = np.repeat(np.arange(starts.size), ends - starts)
+
+    # Least-squares slope per group from sums: (n*Stm - St*Sm) / (n*Stt - St^2)
+    n = np.bincount(group).astype(float)
+    sum_t = np.bincount(group, t)
+    sum_m = np.bincount(group, m)
+    sum_tt = np.bincount(group, t * t)
+    sum_tm = np.bincount(group, t * m)
+    denominator = n * sum_tt - sum_t ** 2
+    valid = (n >= MIN_READINGS) & (denominator > 1e-12)
+    slope = np.divide(n * sum_tm - sum_t * sum_m, denominator,
+                      out=np.zeros_like(denominator), where=valid)
+
+    last = ends - 1
+    if smoothing is None or smoothing >= 1:
+        current = m[last]
+    else:
+        # Exponentially weighted level: weight (1 - alpha)^k for the k-th reading before the latest
+        age = last[group] - np.arange(ids.size)
+        weights = (1.0 - smoothing) ** age
+        current = np.bincount(group, weights * m) / np.bincount(group, weights)
+
+    threshold = np.array([thresholds[garden_id] for garden_id in ids[starts].tolist()], dtype=float)
+    daily_decline = np.maximum(-slope, MIN_DAILY_DECLINE)
+    # Time since the latest reading has already been spent drying out
+    days_until = np.maximum(0.0, (current - threshold) / daily_decline + t[last])
+
+    predictions = {}
+    for i, garden_id in enumerate(ids[starts].tolist()):
+        if not valid[i]:
+            predictions[garden_id] = None
+            continue
+        predictions[garden_id] = {
+            'next_watering_estimate': (now + timedelta(days=float(days_until[i]))).isoformat(),
+            'days_until_watering': round(float(days_until[i]), 1),
+            'current_moisture': round(float(current[i]), 2),
+            'moisture_trend_per_day': round(float(slope[i]), 2),
+            'recommendation': 'Water soon' if days_until[i] < 1 else 'Plant is healthy'
+        }
+    return predictions
+
+def predict_watering(timestamps, moisture, threshold, now=None, smoothing=None):
+    """Predict next watering for a single garden's readings (ascending time)"""
+    return predict_watering_batch([0] * len(moisture), timestamps, moisture, {0: threshold},
+                                  now=now, smoothing=smoothing).get(0)
@@ -0,0 +1,250 @@
+"""Background jobs: per-garden simulation scheduling and periodic maintenance
+
+Each garden is due again `frequency` seconds after its last tick, where the
+frequency comes from the owner's simulation_frequency preference. Due times
+live in a heap, so every wake-up handles exactly the gardens that are due
+and sleeps until the next one. Only the process holding a job's exclusive
+file lock runs it; other workers wait on the lock and take over if the
+holder exits.
+"""
+import fcntl
+import heapq
+from abc import ABC, abstractmethod
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FREQUENCY = 60  # seconds
+MIN_FREQUENCY = 5  # seconds
+
+class FileLock:
+    """Non-blocking exclusive lock on a file, released by the OS if the process dies"""
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class BackgroundLoop(ABC):
+    """Thread that calls run_pending() and sleeps seconds_until_next(), only while holding lock"""
+    name = 'background-loop'
+
+    def __init__(self, lock=None, retry_interval=30.0, clock=time.time):
+        self.lock = lock
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    @abstractmethod
+    def run_pending(self, now=None):
+        """Do whatever work is due at `now`"""
+
+    @abstractmethod
+    def seconds_until_next(self, now=None):
+        """Seconds to sleep before run_pending() has work again"""
+
+    def run(self):
+        """Loop until stop() is called"""
+        try:
+            while not self._stop.is_set():
+                if self.lock is not None and not self.lock.acquire():
+                    self._stop.wait(self.retry_interval)
+                    continue
+                try:
+                    self.run_pending()
+                except Exception:
+                    logger.exception(f'{self.name} failed')
+                self._stop.wait(self.seconds_until_next())
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def leader(self):
+        return self.lock.held if self.lock is not None else self.running
+
+class PeriodicTask(BackgroundLoop):
+    """Run func() every interval seconds, starting at once unless run_at_start is False"""
+    def __init__(self, func, interval, name='periodic-task', run_at_start=True, **kwargs):
+        super().__init__(**kwargs)
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self.runs = 0
+        self.last_run = None
+        self.last_duration = None
+        self._next_run = 0.0 if run_at_start else None
+
+    def run_pending(self, now=None):
+        now = self.clock() if now is None else now
+        if self._next_run is None:
+            self._next_run = now + self.interval
+            return False
+        if now < self._next_run:
+            return False
+        self._next_run = now + self.interval
+        started = time.monotonic()
+        self.func()
+        self.last_duration = time.monotonic() - started
+        self.last_run = now
+        self.runs += 1
+        return True
+
+    def seconds_until_next(self, now=None):
+        now = self.clock() if now is None else now
+        if self._next_run is None:
+            return 0.0
+        return max(0.0, self._next_run - now)
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'leader': self.leader,
+            'interval': self.interval,
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'last_duration': round(self.last_duration, 3) if self.last_duration is not None else None
+        }
+
+class SimulationScheduler(BackgroundLoop):
+    """Run tick(garden_ids, now) for gardens as they fall due
+
+    load_frequencies() returns {garden_id: seconds or None} for every garden
+    that should be simulated; it is re-read every refresh_interval seconds so
+    new gardens and changed preferences are picked up.
+    """
+    name = 'simulation-scheduler'
+
+    def __init__(self, load_frequencies, tick, lock=None, refresh_interval=30.0, clock=time.time):
+        super().__init__(lock=lock, retry_interval=refresh_interval, clock=clock)
+        self.load_frequencies = load_frequencies
+        self.tick = tick
+        self.refresh_interval = refresh_interval
+        self.ticks = 0
+        self.lag_count = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = None
+        self._frequencies = {}
+        self._heap = []  # (due_at, garden_id)
+        self._next_refresh = 0.0
+
+    @staticmethod
+    def frequency_for(seconds):
+        return max(MIN_FREQUENCY, seconds or DEFAULT_FREQUENCY)
+
+    def refresh(self, now):
+        """Reload frequencies; new gardens are due immediately, changed ones are rescheduled"""
+        frequencies = {garden_id: self.frequency_for(seconds)
+                       for garden_id, seconds in self.load_frequencies().items()}
+        rescheduled = {garden_id for garden_id, frequency in frequencies.items()
+                       if self._frequencies.get(garden_id) != frequency}
+        if rescheduled or frequencies.keys() != self._frequencies.keys():
+            due_times = {garden_id: due_at for due_at, garden_id in self._heap}
+            heap = [(due_at, garden_id) for garden_id, due_at in due_times.items()
+                    if garden_id in frequencies and garden_id not in rescheduled]
+            for garden_id in rescheduled:
+                previous = self._frequencies.get(garden_id)
+                if previous is None:
+                    heap.append((now, garden_id))
+                else:
+                    # Keep the time of the last tick, but move to the new period
+                    last_tick = due_times[garden_id] - previous
+                    heap.append((max(now, last_tick + frequencies[garden_id]), garden_id))
+            heapq.heapify(heap)
+            self._heap = heap
+        self._frequencies = frequencies
+        self._next_refresh = now + self.refresh_interval
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def run_pending(self, now=None):
+        """Tick every garden that is due; returns the ids ticked"""
+        now = self.clock() if now is None else now
+        if now >= self._next_refresh:
+            self.refresh(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, garden_id = heapq.heappop(self._heap)
+            due.append(garden_id)
+            lag = now - due_at
+            self.lag_count += 1
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            self.last_lag = lag
+            frequency = self._frequencies[garden_id]
+            next_due = due_at + frequency
+            if next_due <= now:
+                # Fell more than a period behind: skip the missed ticks rather than burst
+                next_due = now + frequency
+            heapq.heappush(self._heap, (next_due, garden_id))
+
+        if due:
+            self.tick(due, now)
+            self.ticks += 1
+        return due
+
+    def seconds_until_next(self, now=None):
+        now = self.clock() if now is None else now
+        wake = self._next_refresh
+        if self._heap:
+            wake = min(wake, self._heap[0][0])
+        return max(0.0, wake - now)
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'leader': self.leader,
+            'gardens': len(self._frequencies),
+            'ticks': self.ticks,
+            'lag_seconds': {
+                'last': round(self.last_lag, 3) if self.last_lag is not None else None,
+                'mean': round(self.lag_total / self.lag_count, 3) if self.lag_count else None,
+                'max': round(self.lag_max, 3)
+            }
+        }
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, EmailStr, Field
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -12,4 +15,74 @@ class UserOut(BaseModel):
 
 class Token(BaseModel):
     access_token: str
-    token_type: str
\ No newline at end of file
+    token_type: str
+
+# Response models of the read API in basic.py; field names and formats match
+# the Flask endpoints' JSON so clients can use either
+
+class ReadingOut(BaseModel):
+    id: int
+    garden_id: int
+    timestamp: Optional[datetime]
+    moisture_level: float
+    temperature: float
+    light_intensity: float
+    humidity: Optional[float] = None
+    ph_level: Optional[float] = None
+    notes: Optional[str] = None
+    is_manual: Optional[bool] = None
+
+class MetricStatsOut(BaseModel):
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+
+class GardenStatsOut(BaseModel):
+    readings_count: int
+    latest_timestamp: Optional[datetime]
+    metrics: Dict[str, MetricStatsOut]
+
+class GardenOut(BaseModel):
+    id: int
+    name: str
+    location: Optional[str]
+    location_lat: Optional[float]
+    location_lon: Optional[float]
+    created_at: Optional[datetime]
+    last_accessed: Optional[datetime]
+    sensor_type: Optional[str]
+    plant_type: Optional[str]
+    watering_frequency: Optional[int]
+    latest_reading: Optional[ReadingOut]
+    readings_count: int
+    stats: Optional[GardenStatsOut]
+
+class GardenList(BaseModel):
+    gardens: List[GardenOut]
+
+class GardenDetail(BaseModel):
+    garden: GardenOut
+
+class ReadingsPage(BaseModel):
+    readings: List[ReadingOut]
+    next_cursor: Optional[str]
+    limit: int
+
+class ReadingSeries(BaseModel):
+    from_: datetime = Field(alias='from')
+    to: datetime
+    slice_seconds: float
+    timestamps: List[int]  # epoch milliseconds
+    readings_count: List[int]
+    moisture_level: List[Optional[float]]
+    temperature: List[Optional[float]]
+    light_intensity: List[Optional[float]]
+    humidity: List[Optional[float]]
+    ph_level: List[Optional[float]]
+
+class PredictionOut(BaseModel):
+    next_watering_estimate: str
+    days_until_watering: Optional[float] = None
+    current_moisture: Optional[float] = None
+    moisture_trend_per_day: Optional[float] = None
+    recommendation: str
@@ -1,14 +1,39 @@
 import os
+import time
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from dotenv import load_dotenv
 
+from cache import MISSING, TTLCache
+
 load_dotenv()
 
-SECRET_KEY = os.getenv("SECRET_KEY", "a_super_secret_key_for_dev") 
+# Tokens are refused altogether, issued or presented, while SECRET_KEY is
+# unset: a fallback key written here would let anyone mint them
+SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 
+ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+DEVICE_TOKEN_EXPIRE_DAYS = 365
+
+# An access token acts for its user on every endpoint; a device token only
+# posts readings to the one garden named in its garden_id claim
+ACCESS_SCOPE = "api"
+DEVICE_SCOPE = "readings:write"
+
+# Decoded claims per token, so a token's signature is checked once per
+# TOKEN_CACHE_TTL rather than on every request; never kept past its expiry
+TOKEN_CACHE_SIZE = 4096
+TOKEN_CACHE_TTL = 300  # seconds
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+class TokensDisabled(JWTError):
+    """SECRET_KEY is not set, so no token can be issued or accepted"""
+
+def signing_key():
+    if not SECRET_KEY:
+        raise TokensDisabled("SECRET_KEY is not set; bearer tokens are disabled")
+    return SECRET_KEY
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -18,9 +43,43 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = {"scope": ACCESS_SCOPE, **data}
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    encoded_jwt = jwt.encode(to_encode, signing_key(), algorithm=ALGORITHM)
+    return encoded_jwt
+
+def create_device_token(user_id: int, garden_id: int, version: int = 0, expires_delta: timedelta = None):
+    """Token for a sensor gateway, allowed only to post readings to garden_id
+
+    version is the garden's device token version when issued; bumping the
+    garden's version revokes the token.
+    """
+    return create_access_token({"sub": str(user_id), "scope": DEVICE_SCOPE, "garden_id": garden_id, "ver": version},
+                               expires_delta or timedelta(days=DEVICE_TOKEN_EXPIRE_DAYS))
+
+def decode_access_token(token: str):
+    """Claims of a token signed with SECRET_KEY, raising JWTError if it is invalid or expired (or tokens are disabled)
+
+    Checks the signature and expiry only, so it never touches the database.
+    """
+    key = signing_key()
+    claims = token_cache.get(token)
+    if claims is not MISSING:
+        return claims
+    # Every token this module issues expires; one without exp is refused, not cached forever
+    claims = jwt.decode(token, key, algorithms=[ALGORITHM], options={"require_exp": True})
+    if "sub" not in claims:
+        raise JWTError("Token has no subject")
+    remaining = claims["exp"] - time.time()
+    if remaining > 0:
+        token_cache.set(token, claims, ttl=min(TOKEN_CACHE_TTL, remaining))
+    return claims
+
+def bearer_token(authorization):
+    """The token of an "Authorization: Bearer <token>" header value, or None"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
@@ -0,0 +1,140 @@
+"""Simulated sensor readings, generated for many gardens at once
+
+Each tick nudges every simulated garden's previous reading by a random
+step (moisture drifts down, light follows a day/night target). Values are
+held in flat NumPy arrays, one slot per garden, with NaN standing for "no
+previous value" so a whole tick is a handful of array operations.
+
+Randomness comes in as a (gardens, N_DRAWS) array of uniform draws, so it
+can be taken from one generator for the batch or from a seeded stream per
+garden (garden_rng): with a seed, a garden's readings depend only on the
+seed, its id and the simulated time, not on which gardens share its batch.
+Time is always passed in, so the light cycle follows the simulated clock
+(simulate_series runs it months ahead in one call).
+"""
+import numpy as np
+
+# simulated_basic reports moisture, temperature and light; simulated_full adds humidity and pH
+SENSOR_TYPES = ('simulated_basic', 'simulated_full')
+
+# Columns of the uniform draws consumed per garden per step
+(MOISTURE_DECLINE, MOISTURE_NOISE, MOISTURE_START, TEMPERATURE_STEP, TEMPERATURE_START, LIGHT_TARGET,
+ LIGHT_NOISE, HUMIDITY_STEP, HUMIDITY_START, PH_STEP, PH_START) = range(11)
+N_DRAWS = 11
+
+# Uniform draws held at once by simulate_series (32 MiB), bounding its memory use
+SERIES_CHUNK_DRAWS = 4 * 1024 * 1024
+
+def garden_rng(seed, garden_id, *stream):
+    """Generator for one garden; the same (seed, garden_id, *stream) always yields the same numbers"""
+    return np.random.default_rng([seed, garden_id, *stream])
+
+def tick_draws(seed, garden_ids, when):
+    """Draws for one tick at `when` (epoch seconds), from each garden's own stream"""
+    return np.array([garden_rng(seed, garden_id, int(when)).random(N_DRAWS) for garden_id in garden_ids])\
+             .reshape(len(garden_ids), N_DRAWS)
+
+def _previous(values, size):
+    """Previous values as a float array with NaN for missing (None) entries"""
+    if values is None:
+        return np.full(size, np.nan)
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+def _solar_hours(when, lons):
+    utc_hour = when.hour + when.minute / 60 + when.second / 3600
+    return np.mod(utc_hour + np.nan_to_num(lons) / 15, 24)
+
+def solar_hours(when, lons):
+    """Local solar hour of each garden at `when` (a naive UTC datetime); UTC where the longitude is None"""
+    return _solar_hours(when, _previous(lons, len(lons)))
+
+def _uniform(draws, column, low, high):
+    return low + draws[:, column] * (high - low)
+
+def _drift(draws, previous, column, step, low, high, start_low, start_high, fresh=None):
+    """previous + U(-step, step) clipped to [low, high], or U(start_low, start_high) where fresh
+    
+    The step uses draw `column` and the start value the one after it.
+    """
+    fresh = np.isnan(previous) if fresh is None else fresh
+    drifted = np.clip(np.nan_to_num(previous) + _uniform(draws, column, -step, step), low, high)
+    return np.where(fresh, _uniform(draws, column + 1, start_low, start_high), drifted)
+
+def _step(state, full, hour, draws):
+    """One simulation step from float arrays (NaN for missing) to the next values"""
+    values = {}
+
+    moisture = state['moisture_level']
+    # Gradual decline with some variation
+    declined = np.nan_to_num(moisture) - _uniform(draws, MOISTURE_DECLINE, 0.5, 2.0)
+    values['moisture_level'] = np.where(
+        np.isnan(moisture),
+        _uniform(draws, MOISTURE_START, 40, 80),
+        np.clip(declined + _uniform(draws, MOISTURE_NOISE, -5, 5), 0, 100)
+    )
+
+    values['temperature'] = _drift(draws, state['temperature'], TEMPERATURE_STEP, 2, 5, 40, 18, 25)
+
+    # Light eases 30% of the way towards a day (06:00-18:59) or night target
+    day = (hour >= 6) & (hour < 19)
+    target = np.where(day, _uniform(draws, LIGHT_TARGET, 500, 1500), _uniform(draws, LIGHT_TARGET, 0, 100))
+    light = state['light_intensity']
+    values['light_intensity'] = np.where(
+        np.isnan(light),
+        target,
+        light + (target - light) * 0.3 + _uniform(draws, LIGHT_NOISE, -50, 50)
+    )
+
+    # A zero humidity or pH counts as missing and restarts from a fresh value
+    humidity = state['humidity']
+    ph = state['ph_level']
+    values['humidity'] = np.where(full, _drift(draws, humidity, HUMIDITY_STEP, 3, 20, 100, 45, 75,
+                                               fresh=np.nan_to_num(humidity) == 0), np.nan)
+    values['ph_level'] = np.where(full, _drift(draws, ph, PH_STEP, 0.1, 4.0, 8.0, 6.0, 7.5,
+                                               fresh=np.nan_to_num(ph) == 0), np.nan)
+    return values
+
+def _state(previous, size):
+    return {metric: _previous(previous.get(metric), size)
+            for metric in ('moisture_level', 'temperature', 'light_intensity', 'humidity', 'ph_level')}
+
+def simulate_readings(previous, full, hour, rng=None, draws=None):
+    """Next simulated values for a batch of gardens
+
+    previous maps metric -> sequence of the latest values (None where a
+    garden has no reading yet); full is a boolean sequence marking
+    simulated_full gardens; hour is the local hour driving the light cycle,
+    one for all gardens or an array with one per garden. draws (see
+    tick_draws) default to N_DRAWS uniforms per garden from rng.
+
+    Returns {metric: float array}; humidity and ph_level are NaN for basic sensors.
+    """
+    full = np.asarray(full, dtype=bool)
+    size = full.size
+    if draws is None:
+        draws = (rng or np.random.default_rng()).random((size, N_DRAWS))
+    return _step(_state(previous, size), full, np.asarray(hour, dtype=float), draws)
+
+def simulate_series(previous, full, lons, start, interval, count, rngs, chunk_steps=None):
+    """Simulate `count` consecutive steps, `interval` apart from `start`, for a batch of gardens
+
+    rngs holds one generator per garden (see garden_rng), each consumed in
+    order, so the result does not depend on chunk_steps. Yields (offset,
+    {metric: (steps, gardens) float array}) per chunk of at most chunk_steps
+    steps (by default as many as fit SERIES_CHUNK_DRAWS), offset being the
+    index of the chunk's first step.
+    """
+    full = np.asarray(full, dtype=bool)
+    state = _state(previous, full.size)
+    lons = _previous(lons, full.size)
+    chunk_steps = chunk_steps or max(1, SERIES_CHUNK_DRAWS // (max(full.size, 1) * N_DRAWS))
+    for offset in range(0, count, chunk_steps):
+        steps = min(chunk_steps, count - offset)
+        # (steps, gardens, N_DRAWS): each garden's stream is drawn in step order
+        draws = np.stack([rng.random((steps, N_DRAWS)) for rng in rngs], axis=1)
+        chunk = {metric: np.empty((steps, full.size)) for metric in state}
+        for i in range(steps):
+            state = _step(state, full, _solar_hours(start + (offset + i) * interval, lons), draws[i])
+            for metric, values in state.items():
+                chunk[metric][i] = values
+        yield offset, chunk
@@ -0,0 +1,175 @@
+"""Current weather from OpenWeatherMap, cached and fetched through one pooled HTTP session
+
+Responses are cached per location: place names are normalised ("  Cape
+Town" and "cape town" share an entry) and coordinates rounded to
+COORDINATE_PRECISION decimals (about 1 km). Concurrent misses for the same
+location wait for a single upstream request instead of each making one.
+An entry is fresh for `ttl` seconds; after that it is refetched, but if the
+upstream fails it is still served for up to `stale_ttl` seconds.
+refresh_many() refetches a set of locations ahead of demand, with a bound
+on how many upstream requests are in flight.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import MISSING, TTLCache
+
+OPENWEATHER_URL = 'https://api.openweathermap.org/data/2.5/weather'
+COORDINATE_PRECISION = 2
+
+logger = logging.getLogger(__name__)
+
+class WeatherUnavailable(Exception):
+    """The upstream request failed and there is no usable cached response"""
+
+def location_key(location=None, lat=None, lon=None):
+    """Cache key for a place name or a coordinate pair"""
+    if lat is not None and lon is not None:
+        return ('coords', round(float(lat), COORDINATE_PRECISION), round(float(lon), COORDINATE_PRECISION))
+    if location:
+        return ('name', ' '.join(location.lower().split()))
+    raise ValueError('A location or lat/lon is required')
+
+class _Flight:
+    """One upstream fetch that concurrent callers for the same key wait on"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class WeatherService:
+    def __init__(self, api_key, url=OPENWEATHER_URL, ttl=600, stale_ttl=3600, timeout=(3.05, 5),
+                 maxsize=1024, pool_size=10, clock=time.monotonic):
+        self.api_key = api_key
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout  # (connect, read) seconds
+        self.clock = clock
+        # Entries outlive `ttl` so they can be served stale while the upstream is down
+        self.cache = TTLCache(maxsize=maxsize, ttl=stale_ttl, clock=clock)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.errors = 0
+        self.upstream_requests = 0
+        self.upstream_last = None
+        self.upstream_total = 0.0
+        self.upstream_max = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def current(self, location=None, lat=None, lon=None):
+        """Current weather as OpenWeatherMap's JSON, raising WeatherUnavailable if it cannot be had"""
+        key = location_key(location, lat, lon)
+        entry = self.cache.get(key)
+        if entry is not MISSING and self.clock() - entry[0] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                flight.result = self._fetch(key)
+                self.cache.set(key, (self.clock(), flight.result))
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is None:
+            return flight.result
+        if entry is not MISSING:
+            with self._lock:
+                self.stale += 1
+            return entry[1]
+        raise WeatherUnavailable(str(flight.error)) from flight.error
+
+    def refresh(self, key):
+        """Fetch a location_key from upstream now and cache it, whatever the cache holds"""
+        data = self._fetch(key)
+        self.cache.set(key, (self.clock(), data))
+        return data
+
+    def refresh_many(self, keys, concurrency=4):
+        """Refresh location keys with at most `concurrency` requests in flight; {key: data} of those that succeeded"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='weather-refresh') as pool:
+            futures = {pool.submit(self.refresh, key): key for key in keys}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception:
+                    pass  # counted and logged by _fetch
+        return results
+
+    def _fetch(self, key):
+        if key[0] == 'coords':
+            params = {'lat': key[1], 'lon': key[2]}
+        else:
+            params = {'q': key[1]}
+        params.update(appid=self.api_key, units='metric')
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning(f'Weather fetch for {key[1:]} failed: {e}')
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.upstream_requests += 1
+                self.upstream_last = elapsed
+                self.upstream_total += elapsed
+                self.upstream_max = max(self.upstream_max, elapsed)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'enabled': self.enabled,
+            'size': len(self.cache),
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'stale': self.stale,
+            'errors': self.errors,
+            # Coalesced callers were served without an upstream request of their own
+            'hit_ratio': round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            'upstream_requests': self.upstream_requests,
+            'upstream_seconds': {
+                'last': round(self.upstream_last, 4) if self.upstream_last is not None else None,
+                'mean': round(self.upstream_total / self.upstream_requests, 4) if self.upstream_requests else None,
+                'max': round(self.upstream_max, 4)
+            }
+        }
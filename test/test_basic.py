@@ -0,0 +1,111 @@
+import unittest
+from datetime import datetime, timedelta
+
+# Shares test_model's throwaway database and fixtures
+import test_model
+
+from fastapi.testclient import TestClient
+
+from basic import app as api
+
+class AsyncReadApiTestCase(test_model.ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = TestClient(api)
+
+    def tearDown(self):
+        self.api.close()
+        super().tearDown()
+
+    def login_api(self):
+        # The FastAPI app accepts the Flask login session
+        self.api.cookies.set('session', self.client.get_cookie('session').value)
+
+    def assert_same(self, path, **params):
+        flask_rv = self.client.get(path, query_string=params)
+        api_rv = self.api.get(path, params=params)
+        self.assertEqual(flask_rv.status_code, 200)
+        self.assertEqual(api_rv.status_code, 200, api_rv.text)
+        self.assertEqual(api_rv.json(), flask_rv.get_json())
+        return api_rv.json()
+
+    def test_requires_the_flask_login(self):
+        rv = self.api.get('/api/gardens')
+        self.assertEqual(rv.status_code, 401)
+        self.assertIn('error', rv.json())
+        self.api.cookies.set('session', 'forged')
+        self.assertEqual(self.api.get('/api/gardens').status_code, 401)
+
+    def test_accepts_bearer_access_tokens(self):
+        user_id = self.create_user()
+        self.create_garden(user_id, readings=2)
+        token = self.client.post('/api/token', json={'username': 'gardener', 'password': 'secret123'})\
+                           .get_json()['access_token']
+        rv = self.api.get('/api/gardens', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(len(rv.json()['gardens']), 1)
+
+        garden_id = rv.json()['gardens'][0]['id']
+        device_token = self.client.post(f'/api/gardens/{garden_id}/device-token').get_json()['device_token']
+        for bad in (device_token, token + 'x'):
+            self.assertEqual(self.api.get('/api/gardens', headers={'Authorization': f'Bearer {bad}'}).status_code, 401)
+
+    def test_gardens_match_the_flask_endpoints(self):
+        user_id = self.create_user()
+        self.login_api()
+        self.client.post('/api/gardens', json={'name': 'Rollup', 'sensor_type': 'manual'})
+        garden_id = self.create_garden(user_id, readings=5)  # no rollup: summarised by query
+
+        gardens = self.assert_same('/api/gardens')['gardens']
+        self.assertEqual(len(gardens), 2)
+        self.assertEqual({g['readings_count'] for g in gardens}, {0, 5})
+
+        rv = self.api.get(f'/api/gardens/{garden_id}')
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.json()['garden']['latest_reading'],
+                         self.client.get(f'/api/gardens/{garden_id}').get_json()['garden']['latest_reading'])
+
+    def test_other_users_gardens_are_not_found(self):
+        owner_id = self.create_user('owner')
+        garden_id = self.create_garden(owner_id, readings=3)
+        self.create_user('other')
+        self.login_api()
+        for path in ('', '/readings', '/readings/series', '/prediction'):
+            rv = self.api.get(f'/api/gardens/{garden_id}{path}')
+            self.assertEqual(rv.status_code, 404, path)
+            self.assertEqual(rv.json(), {'error': 'Garden not found'})
+
+    def test_reading_pages_match_the_flask_endpoint(self):
+        user_id = self.create_user()
+        self.login_api()
+        garden_id = self.create_garden(user_id, readings=5)
+
+        seen = []
+        after = None
+        while True:
+            params = {'limit': 2, **({'after': after} if after else {})}
+            page = self.assert_same(f'/api/gardens/{garden_id}/readings', **params)
+            seen += [reading['id'] for reading in page['readings']]
+            after = page['next_cursor']
+            if after is None:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(self.api.get(f'/api/gardens/{garden_id}/readings', params={'after': 'bad'}).status_code, 400)
+
+    def test_series_and_prediction_match_the_flask_endpoints(self):
+        user_id = self.create_user()
+        self.login_api()
+        garden_id = self.create_garden(user_id, readings=30)
+        empty_id = self.create_garden(user_id, name='Empty')
+        end = datetime.utcnow() + timedelta(minutes=1)
+
+        series = self.assert_same(f'/api/gardens/{garden_id}/readings/series',
+                                  **{'from': (end - timedelta(hours=1)).isoformat(), 'to': end.isoformat(), 'points': 6})
+        self.assertEqual(sum(series['readings_count']), 30)
+
+        prediction = self.assert_same(f'/api/gardens/{garden_id}/prediction')
+        self.assertIn('days_until_watering', prediction)
+        self.assert_same(f'/api/gardens/{empty_id}/prediction')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from cache import MISSING, TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TTLCacheTestCase(unittest.TestCase):
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+        cache.set('a', None)
+        self.assertIsNone(cache.get('a'))
+        clock.now = 5
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+    def test_discard_where(self):
+        cache = TTLCache()
+        for garden_id in range(4):
+            cache.set((garden_id, 'x'), garden_id)
+        self.assertEqual(cache.discard_where(lambda key: key[0] % 2 == 0), 2)
+        self.assertEqual(len(cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
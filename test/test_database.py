@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from sqlalchemy import pool
+
+import database
+
+class DatabaseUriTestCase(unittest.TestCase):
+    def test_relative_sqlite_paths_resolve_to_the_instance_folder(self):
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'sqlite:///plant_care.db'}):
+            self.assertEqual(database.database_uri(),
+                             'sqlite:///' + os.path.join(database.INSTANCE_DIR, 'plant_care.db'))
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgresql://user:secret@db/gardens'}):
+            self.assertEqual(database.database_uri(), 'postgresql://user:secret@db/gardens')
+
+    def test_turso_urls_carry_the_auth_token(self):
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'libsql://gardens.turso.io',
+                                          'DATABASE_AUTH_TOKEN': 'token'}):
+            self.assertEqual(database.database_uri(),
+                             'sqlite+libsql://gardens.turso.io/?authToken=token&secure=true')
+
+    def test_async_uri_swaps_in_the_asyncio_driver(self):
+        self.assertEqual(database.async_uri('sqlite:////tmp/gardens.db'), 'sqlite+aiosqlite:////tmp/gardens.db')
+        self.assertEqual(database.async_uri('postgresql+psycopg2://user:secret@db/gardens'),
+                         'postgresql+asyncpg://user:secret@db/gardens')
+        with self.assertRaises(ValueError):
+            database.async_uri('oracle://db/gardens')
+
+class SharedEngineTestCase(unittest.TestCase):
+    def test_one_engine_per_database(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            engine = database.get_engine(f'sqlite:///{path}')
+            self.assertIs(database.get_engine(f'sqlite:///{path}'), engine)
+            self.assertFalse(engine.echo)
+            with engine.connect() as connection:
+                self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+            engine.dispose()
+        finally:
+            os.unlink(path)
+
+    def test_in_memory_database_is_shared_across_threads(self):
+        engine = database.make_engine('sqlite://')
+        self.assertIsInstance(engine.pool, pool.StaticPool)
+
+    def test_read_snapshot_ignores_later_writes(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            engine = database.make_engine(f'sqlite:///{path}')
+            with engine.begin() as connection:
+                connection.exec_driver_sql('CREATE TABLE t (x INTEGER)')
+                connection.exec_driver_sql('INSERT INTO t VALUES (1), (2)')
+            with database.read_snapshot(engine) as snapshot:
+                self.assertEqual(snapshot.exec_driver_sql('SELECT count(*) FROM t').scalar(), 2)
+                with engine.begin() as connection:
+                    connection.exec_driver_sql('DELETE FROM t WHERE x = 1')
+                self.assertEqual(snapshot.exec_driver_sql('SELECT count(*) FROM t').scalar(), 2)
+            with engine.connect() as connection:
+                self.assertEqual(connection.exec_driver_sql('SELECT count(*) FROM t').scalar(), 1)
+            engine.dispose()
+        finally:
+            os.unlink(path)
+
+    def test_echo_is_opt_in(self):
+        with mock.patch.dict(os.environ, {'DATABASE_ECHO': 'true'}):
+            self.assertTrue(database.make_engine('sqlite://').echo)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from sqlalchemy import create_engine
+
+import dbtuning
+
+class EngineOptionsTestCase(unittest.TestCase):
+    def test_server_databases_get_a_sized_pool(self):
+        options = dbtuning.engine_options('postgresql://user@localhost/gardens', pool_size=4, max_overflow=None)
+        self.assertEqual(options['pool_size'], 4)
+        self.assertEqual(options['max_overflow'], dbtuning.POOL_OPTIONS['max_overflow'])
+        self.assertTrue(options['pool_pre_ping'])
+
+    def test_sqlite_and_default_profile_leave_engine_options_alone(self):
+        self.assertEqual(dbtuning.engine_options('sqlite:///plant_care.db'), {})
+        self.assertEqual(dbtuning.engine_options('postgresql://localhost/gardens', 'default'), {})
+        with self.assertRaises(ValueError):
+            dbtuning.engine_options('sqlite://', 'fast')
+
+class SqlitePragmasTestCase(unittest.TestCase):
+    def test_pragmas_apply_to_every_connection(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{path}')
+        try:
+            dbtuning.install_sqlite_pragmas(engine, dbtuning.sqlite_pragmas(busy_timeout=1234))
+            for _ in range(2):
+                with engine.connect() as connection:
+                    pragmas = dbtuning.current_pragmas(connection)
+                engine.dispose()
+                self.assertEqual(pragmas['journal_mode'], 'wal')
+                self.assertEqual(pragmas['busy_timeout'], 1234)
+                self.assertEqual(pragmas['synchronous'], 1)  # NORMAL
+                self.assertEqual(pragmas['cache_size'], dbtuning.SQLITE_PRAGMAS['cache_size'])
+        finally:
+            engine.dispose()
+            os.unlink(path)
+
+if __name__ == '__main__':
+    unittest.main()
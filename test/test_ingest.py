@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from ingest import WriteBehindQueue
+
+class WriteBehindQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.written = threading.Event()
+
+    def write(self, rows):
+        self.batches.append(list(rows))
+        self.written.set()
+
+    def test_full_batches_are_written_in_group_commits(self):
+        queue = WriteBehindQueue(self.write, maxsize=100, batch_size=10, interval=60)
+        self.assertTrue(queue.put(list(range(25))))
+        queue.start()
+        self.assertTrue(self.written.wait(5))
+        queue.stop()
+        self.assertEqual([len(batch) for batch in self.batches], [10, 10, 5])
+        self.assertEqual(sum(self.batches, []), list(range(25)))
+        stats = queue.stats()
+        self.assertEqual((stats['written'], stats['flushes'], stats['depth']), (25, 3, 0))
+        self.assertFalse(stats['running'])
+
+    def test_partial_batch_is_written_after_interval(self):
+        queue = WriteBehindQueue(self.write, batch_size=100, interval=0.01)
+        queue.start()
+        try:
+            queue.put([1, 2])
+            self.assertTrue(self.written.wait(5))
+            self.assertEqual(self.batches, [[1, 2]])
+        finally:
+            queue.stop()
+
+    def test_full_queue_rejects_whole_put(self):
+        queue = WriteBehindQueue(self.write, maxsize=5, batch_size=10)
+        self.assertTrue(queue.put([1, 2, 3]))
+        self.assertFalse(queue.put([4, 5, 6]))
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.stats()['rejected'], 3)
+        # Stopping without a running writer still writes what was queued
+        queue.stop()
+        self.assertEqual(self.batches, [[1, 2, 3]])
+
+    def test_failed_write_is_counted_and_writer_keeps_going(self):
+        def write(rows):
+            if rows[0] == 'bad':
+                raise RuntimeError('database is locked')
+            self.write(rows)
+        queue = WriteBehindQueue(write, batch_size=1, interval=0)
+        queue.put(['bad', 'good'])
+        queue.start()
+        queue.stop()
+        self.assertEqual(self.batches, [['good']])
+        self.assertEqual((queue.stats()['failed'], queue.stats()['written']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
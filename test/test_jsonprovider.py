@@ -0,0 +1,73 @@
+import unittest
+import importlib.util
+import os
+import sys
+from datetime import date, datetime, time, timezone
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from flask import Flask
+
+import jsonprovider
+
+def load_without_orjson():
+    """A separate copy of jsonprovider imported as if orjson were not installed"""
+    spec = importlib.util.spec_from_file_location('jsonprovider_fallback', jsonprovider.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(sys.modules, {'orjson': None}):
+        spec.loader.exec_module(module)
+    return module
+
+PAYLOAD = {
+    'name': 'Ünïcode',
+    'zeta': 1,
+    'alpha': [1.5, float('nan'), float('inf'), None],
+    'created_at': datetime(2025, 7, 6, 10, 0, 0, 250),
+    'synced_at': datetime(2025, 7, 6, tzinfo=timezone.utc),
+    'day': date(2025, 7, 6),
+    'at': time(6, 30),
+    7: 'int key',
+}
+EXPECTED = ('{"name":"Ünïcode","zeta":1,"alpha":[1.5,null,null,null],'
+            '"created_at":"2025-07-06T10:00:00.000250","synced_at":"2025-07-06T00:00:00+00:00",'
+            '"day":"2025-07-06","at":"06:30:00","7":"int key"}')
+
+class JSONProviderTestCase(unittest.TestCase):
+    def providers(self):
+        fallback = load_without_orjson()
+        self.assertIsNone(fallback.orjson)
+        modules = [('json', fallback)]
+        if jsonprovider.orjson is not None:
+            modules.append(('orjson', jsonprovider))
+        for label, module in modules:
+            app = Flask(f'jsonprovider_{label}')
+            yield label, app, module.install(app)
+
+    def test_both_encoders_write_the_same_json(self):
+        outputs = {}
+        for label, app, provider in self.providers():
+            with self.subTest(encoder=label):
+                self.assertEqual(provider.dumps(PAYLOAD), EXPECTED)
+                with app.app_context():
+                    response = provider.response(PAYLOAD)
+                self.assertEqual(response.get_data(as_text=True), EXPECTED)
+                self.assertEqual(response.mimetype, 'application/json')
+                outputs[label] = response.get_data()
+        self.assertEqual(len(set(outputs.values())), 1)
+
+    def test_both_encoders_indent_in_debug(self):
+        for label, app, provider in self.providers():
+            with self.subTest(encoder=label):
+                app.debug = True
+                self.assertEqual(provider.dumps({'a': [1]}), '{\n  "a": [\n    1\n  ]\n}')
+
+    def test_both_decoders_reject_nan(self):
+        for label, app, provider in self.providers():
+            with self.subTest(encoder=label):
+                self.assertEqual(provider.loads('{"a":[1,null]}'), {'a': [1, None]})
+                with self.assertRaises(ValueError):
+                    provider.loads('[NaN]')
+
+if __name__ == '__main__':
+    unittest.main()
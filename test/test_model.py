@@ -0,0 +1,1277 @@
+import unittest
+import csv
+import gzip
+import io
+import tempfile
+import os
+import sys
+import threading
+from unittest import mock
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway database before it is imported
+_db_fd, _temp_db = tempfile.mkstemp(suffix='.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{_temp_db}'
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')  # bearer tokens are disabled without one
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+import numpy as np
+import pyarrow as pa
+import columnar
+import security
+from jose import jwt
+from sqlalchemy import event
+from model import (app, db, access_tracker, DailyReadingAggregate, Garden, GardenStats, HourlyReadingAggregate, PlantReading,
+                   compact_readings, ensure_indexes, flush_access_times, get_garden_summaries, import_readings_csv, ingest_queue,
+                   iter_readings_columnar, load_prediction_readings, load_simulation_frequencies, prediction_cache, user_cache, device_token_versions,
+                   backfill_simulation, prefetch_weather, rebuild_garden_stats, simulate_tick, weather_service, WeatherSnapshot)
+
+class QueryCounter:
+    """Counts SQL statements executed on the app engine while active"""
+    def __init__(self):
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        with app.app_context():
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+class StatementRecorder(QueryCounter):
+    """Keeps the text of every statement executed while active"""
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        super()._on_execute()
+        self.statements.append(statement)
+
+    def writes(self):
+        return [statement for statement in self.statements
+                if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+
+class QueryRecorder(QueryCounter):
+    """Keeps the SELECTs reading from plant_readings while active, with their parameters"""
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith('SELECT') and 'FROM plant_readings' in statement:
+            self.statements.append((statement, parameters))
+
+    def plans(self):
+        with self.engine.connect() as conn:
+            return [[row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                    for statement, parameters in self.statements]
+
+class ModelTestCase(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        user_cache.clear()  # ids are reused once the tables are recreated
+        device_token_versions.clear()
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        access_tracker.drain()
+        with app.app_context():
+            db.drop_all()
+
+    def register(self, username, password):
+        return self.client.post('/api/register', json={'username': username, 'password': password})
+
+    def login(self, username, password):
+        return self.client.post('/api/login', json={'username': username, 'password': password})
+
+    def create_user(self, username='gardener', password='secret123'):
+        self.register(username, password)
+        rv = self.login(username, password)
+        return rv.get_json()['user']['id']
+
+    def get_metrics(self):
+        with mock.patch.dict(app.config, METRICS_ENABLED=True):
+            return self.client.get('/api/metrics').get_json()
+
+    def create_garden(self, user_id, name='Garden', readings=0, sensor_type='manual'):
+        with app.app_context():
+            garden = Garden(user_id=user_id, name=name, sensor_type=sensor_type)
+            db.session.add(garden)
+            db.session.flush()
+            start = datetime.utcnow() - timedelta(minutes=readings)
+            for i in range(readings):
+                db.session.add(PlantReading(
+                    garden_id=garden.id,
+                    timestamp=start + timedelta(minutes=i),
+                    moisture_level=80 - i * 0.01,
+                    temperature=20.0,
+                    light_intensity=500.0
+                ))
+            db.session.commit()
+            return garden.id
+
+class GardenSummaryTestCase(ModelTestCase):
+    def test_garden_list_includes_latest_reading_and_count(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=5)
+        self.create_garden(user_id, name='Empty')
+
+        rv = self.client.get('/api/gardens')
+        self.assertEqual(rv.status_code, 200)
+        gardens = {g['id']: g for g in rv.get_json()['gardens']}
+        self.assertEqual(gardens[garden_id]['readings_count'], 5)
+        with app.app_context():
+            latest = PlantReading.query.filter_by(garden_id=garden_id)\
+                                       .order_by(PlantReading.timestamp.desc()).first()
+            self.assertEqual(gardens[garden_id]['latest_reading']['id'], latest.id)
+        empty = [g for g in gardens.values() if g['name'] == 'Empty'][0]
+        self.assertEqual(empty['readings_count'], 0)
+        self.assertIsNone(empty['latest_reading'])
+
+    def test_garden_list_query_count_is_flat(self):
+        user_id = self.create_user()
+
+        def count_queries():
+            with QueryCounter() as counter:
+                rv = self.client.get('/api/gardens')
+            self.assertEqual(rv.status_code, 200)
+            return counter.count, len(rv.get_json()['gardens'])
+
+        for i in range(2):
+            self.create_garden(user_id, name=f'Garden {i}', readings=3)
+        count_queries()  # caches the logged-in user
+        few_queries, few = count_queries()
+
+        for i in range(2, 12):
+            self.create_garden(user_id, name=f'Garden {i}', readings=3)
+        many_queries, many = count_queries()
+
+        self.assertEqual((few, many), (2, 12))
+        self.assertEqual(few_queries, many_queries)
+
+class UserCacheTestCase(ModelTestCase):
+    def get_profile(self):
+        with QueryCounter() as counter:
+            rv = self.client.get('/api/profile')
+        self.assertEqual(rv.status_code, 200)
+        return counter.count, rv.get_json()['user']
+
+    def test_authenticated_requests_skip_the_user_query(self):
+        user_id = self.create_user()
+        before, user = self.get_profile()  # loads the user once
+        after, cached = self.get_profile()
+        self.assertEqual(before, 1)
+        self.assertEqual(after, 0)
+        self.assertEqual(cached, user)
+        self.assertEqual(cached['id'], user_id)
+
+        with QueryCounter() as counter:
+            self.assertEqual(self.client.get('/api/status').status_code, 200)
+            self.assertEqual(self.client.get('/api/gardens').status_code, 200)
+        with QueryCounter() as baseline:
+            # The same garden list without the cache: one extra query for the user
+            user_cache.clear()
+            self.client.get('/api/gardens')
+        self.assertEqual(baseline.count, counter.count + 1)
+
+    def test_profile_updates_are_seen_at_once(self):
+        self.create_user()
+        self.get_profile()
+        rv = self.client.put('/api/profile', json={'preferences': {'moisture_threshold': 45}})
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(self.get_profile()[1]['preferences']['moisture_threshold'], 45)
+        # The cached copy is attached to each request's session, so lazy relationships still load
+        self.client.post('/api/gardens', json={'name': 'Herbs', 'sensor_type': 'manual'})
+        self.assertEqual(len(self.client.get('/api/gardens').get_json()['gardens']), 1)
+
+    def test_logout_forgets_the_user(self):
+        user_id = self.create_user()
+        self.get_profile()
+        self.assertEqual(self.client.post('/api/logout').status_code, 200)
+        self.assertEqual(user_cache.get(user_id, None), None)
+        self.assertNotEqual(self.client.get('/api/profile').status_code, 200)
+
+class TokenAuthTestCase(ModelTestCase):
+    def issue_token(self, username='gardener', password='secret123'):
+        rv = self.client.post('/api/token', json={'username': username, 'password': password})
+        self.assertEqual(rv.status_code, 200)
+        return rv.get_json()['access_token']
+
+    def test_bearer_requests_need_no_session_or_user_query(self):
+        user_id = self.create_user()
+        token = self.issue_token()
+        self.assertEqual(self.client.post('/api/token', json={'username': 'gardener', 'password': 'wrong'})
+                                    .status_code, 401)
+        client = app.test_client()  # no session cookie
+        headers = {'Authorization': f'Bearer {token}'}
+        self.assertEqual(client.get('/api/profile').status_code, 401)
+
+        with QueryCounter() as first:
+            rv = client.get('/api/profile', headers=headers)
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.get_json()['user']['id'], user_id)
+        with QueryCounter() as second:
+            self.assertEqual(client.get('/api/profile', headers=headers).status_code, 200)
+        self.assertEqual((first.count, second.count), (1, 0))
+        self.assertIsNone(client.get_cookie('session'))
+
+        self.assertEqual(client.get('/api/profile', headers={'Authorization': f'Bearer {token}x'}).status_code, 401)
+        # Correctly signed but without an expiry
+        unexpiring = jwt.encode({'sub': str(user_id), 'scope': 'api'}, security.SECRET_KEY,
+                                algorithm=security.ALGORITHM)
+        self.assertEqual(client.get('/api/profile', headers={'Authorization': f'Bearer {unexpiring}'}).status_code,
+                         401)
+
+    def test_device_tokens_only_post_readings_to_their_garden(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        other_id = self.create_garden(user_id, name='Other')
+        rv = self.client.post(f'/api/gardens/{garden_id}/device-token')
+        self.assertEqual(rv.status_code, 201)
+        headers = {'Authorization': f'Bearer {rv.get_json()["device_token"]}'}
+        device = app.test_client()
+        reading = {'moisture_level': 40, 'temperature': 21, 'light_intensity': 600, 'is_manual': False}
+
+        self.assertEqual(device.post(f'/api/gardens/{garden_id}/readings', json=reading, headers=headers)
+                               .status_code, 201)
+        self.assertEqual(device.post(f'/api/gardens/{other_id}/readings', json=reading, headers=headers)
+                               .status_code, 403)
+        self.assertEqual(device.get(f'/api/gardens/{garden_id}/readings', headers=headers).status_code, 401)
+        self.assertEqual(device.get('/api/profile', headers=headers).status_code, 401)
+
+        # Ownership is still checked, so deleting the garden revokes its tokens
+        self.client.delete(f'/api/gardens/{garden_id}')
+        self.assertEqual(device.post(f'/api/gardens/{garden_id}/readings', json=reading, headers=headers)
+                               .status_code, 404)
+
+        self.create_user('other')
+        self.assertEqual(self.client.post(f'/api/gardens/{other_id}/device-token').status_code, 404)
+
+    def test_device_tokens_can_be_revoked(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        old = self.client.post(f'/api/gardens/{garden_id}/device-token').get_json()['device_token']
+        device = app.test_client()
+        reading = {'moisture_level': 40, 'temperature': 21, 'light_intensity': 600}
+
+        def post(token):
+            return device.post(f'/api/gardens/{garden_id}/readings', json=reading,
+                               headers={'Authorization': f'Bearer {token}'}).status_code
+
+        self.assertEqual(post(old), 201)
+        with QueryCounter() as counter:
+            self.assertEqual(post(old), 201)  # the version is cached: no extra query
+        self.assertEqual(self.client.delete(f'/api/gardens/{garden_id}/device-token').status_code, 200)
+        self.assertEqual(post(old), 401)
+        new = self.client.post(f'/api/gardens/{garden_id}/device-token').get_json()['device_token']
+        self.assertEqual(post(new), 201)
+        with QueryCounter() as again:
+            post(new)
+        self.assertEqual(again.count, counter.count)
+
+    def test_tokens_are_refused_without_a_secret_key(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        token = self.client.post('/api/token', json={'username': 'gardener', 'password': 'secret123'})\
+                           .get_json()['access_token']
+        with mock.patch('security.SECRET_KEY', None):
+            rv = self.client.post('/api/token', json={'username': 'gardener', 'password': 'secret123'})
+            self.assertEqual(rv.status_code, 503)
+            self.assertEqual(self.client.post(f'/api/gardens/{garden_id}/device-token').status_code, 503)
+            rv = app.test_client().get('/api/profile', headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(rv.status_code, 401)
+
+class CsvImportTestCase(ModelTestCase):
+    def test_import_streams_in_batches(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        lines = ['timestamp,moisture_level,temperature,light_intensity,notes']
+        lines += [f'2025-07-06T10:{i:02d}:00Z,{50 + i},21,700,row {i}' for i in range(25)]
+        lines.append('2025-07-06T11:00:00,,21,700,missing moisture')
+        stream = io.BytesIO('\n'.join(lines).encode())
+
+        with app.app_context():
+            imported, skipped, errors = import_readings_csv(garden_id, stream, batch_size=10)
+            self.assertEqual((imported, skipped, len(errors)), (25, 1, 1))
+            readings = PlantReading.query.filter_by(garden_id=garden_id)\
+                                         .order_by(PlantReading.timestamp).all()
+            self.assertEqual(len(readings), 25)
+            self.assertEqual(readings[-1].moisture_level, 74)
+            self.assertEqual(readings[-1].notes, 'row 24')
+            self.assertIsNone(readings[0].timestamp.tzinfo)
+            self.assertEqual(db.session.get(GardenStats, garden_id).readings_count, 25)
+
+    def test_rollup_counts_batches_written_before_a_failure(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        lines = ['timestamp,moisture_level,temperature,light_intensity']
+        lines += [f'2025-07-06T10:{i:02d}:00,{50 + i},21,700' for i in range(15)]
+        # Invalid UTF-8 once the first batch of 10 is committed
+        stream = io.BytesIO('\n'.join(lines).encode() + b'\n2025-07-06T11:00:00,\xff\xfe,21,700\n')
+
+        with app.app_context():
+            with self.assertRaises(UnicodeDecodeError):
+                import_readings_csv(garden_id, stream, batch_size=10)
+            self.assertEqual(PlantReading.query.count(), 10)
+            self.assertEqual(db.session.get(GardenStats, garden_id).readings_count, 10)
+
+class CsvExportTestCase(ModelTestCase):
+    def test_export_streams_filtered_rows(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=30)
+        with app.app_context():
+            timestamps = [r.timestamp for r in PlantReading.query.filter_by(garden_id=garden_id)
+                                                                 .order_by(PlantReading.timestamp)]
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/export_data')
+        self.assertEqual(rv.status_code, 200)
+        self.assertNotIn('Content-Encoding', rv.headers)
+        rows = list(csv.reader(io.StringIO(rv.get_data(as_text=True))))
+        self.assertEqual(rows[0][:2], ['timestamp', 'moisture_level'])
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[1][0], timestamps[0].isoformat())
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/export_data', query_string={
+            'since': timestamps[10].isoformat(), 'until': timestamps[20].isoformat()})
+        rows = list(csv.reader(io.StringIO(rv.get_data(as_text=True))))
+        self.assertEqual([row[0] for row in rows[1:]], [t.isoformat() for t in timestamps[10:20]])
+
+    def test_export_gzip_and_bad_filter(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=5)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/export_data',
+                             headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(rv.headers['Content-Encoding'], 'gzip')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(rv.data).decode())))
+        self.assertEqual(len(rows), 6)
+        for accept in ('gzip;q=0, deflate', 'x-gzip', 'identity'):
+            rv = self.client.get(f'/api/gardens/{garden_id}/export_data', headers={'Accept-Encoding': accept})
+            self.assertNotIn('Content-Encoding', rv.headers, accept)
+            self.assertEqual(len(list(csv.reader(io.StringIO(rv.get_data(as_text=True))))), 6)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/export_data', query_string={'since': 'yesterday'})
+        self.assertEqual(rv.status_code, 400)
+
+class ReadingsPaginationTestCase(ModelTestCase):
+    def test_cursor_pages_walk_all_readings(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=25)
+        with app.app_context():
+            # Two readings sharing a timestamp must both be returned, ordered by id
+            tied = PlantReading.query.filter_by(garden_id=garden_id).order_by(PlantReading.id).first()
+            db.session.add(PlantReading(garden_id=garden_id, timestamp=tied.timestamp, moisture_level=50,
+                                        temperature=20, light_intensity=500))
+            db.session.commit()
+
+        seen = []
+        params = {'limit': 10, 'with_total': 1}
+        while True:
+            rv = self.client.get(f'/api/gardens/{garden_id}/readings', query_string=params)
+            self.assertEqual(rv.status_code, 200)
+            data = rv.get_json()
+            self.assertEqual(data['total'], 26)
+            seen += [(r['timestamp'], r['id']) for r in data['readings']]
+            if not data['next_cursor']:
+                break
+            params = {'limit': 10, 'after': data['next_cursor'], 'with_total': 1}
+        self.assertEqual(len(seen), 26)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+        # The page/per_page parameters keep their behaviour
+        legacy = self.client.get(f'/api/gardens/{garden_id}/readings',
+                                 query_string={'page': 2, 'per_page': 10}).get_json()
+        self.assertEqual((legacy['total'], legacy['pages'], len(legacy['readings'])), (26, 3, 10))
+
+    def test_bad_cursor_and_limit(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=2)
+        for params in ({'after': 'yesterday'}, {'limit': 0}, {'limit': 5000}):
+            rv = self.client.get(f'/api/gardens/{garden_id}/readings', query_string=params)
+            self.assertEqual(rv.status_code, 400)
+
+class BulkIngestTestCase(ModelTestCase):
+    def test_batch_writes_valid_readings_and_reports_errors(self):
+        user_id = self.create_user()
+        first_id = self.create_garden(user_id, readings=2)
+        second_id = self.create_garden(user_id, name='Second')
+        with app.app_context():
+            # The first garden's rollup is folded into, the second's is built from scratch
+            rebuild_garden_stats([first_id])
+            db.session.commit()
+        readings = [
+            {'garden_id': first_id, 'moisture_level': 10, 'temperature': 21.5, 'light_intensity': 300,
+             'timestamp': '2030-01-01T00:00:00Z'},
+            {'garden_id': second_id, 'moisture_level': 20, 'temperature': 19, 'light_intensity': 400, 'humidity': 55},
+            {'garden_id': first_id, 'temperature': 20, 'light_intensity': 100},
+            {'garden_id': 9999, 'moisture_level': 5, 'temperature': 20, 'light_intensity': 100},
+            {'garden_id': first_id, 'moisture_level': 'wet', 'temperature': 20, 'light_intensity': 100},
+            {'garden_id': first_id, 'moisture_level': 30, 'temperature': 22, 'light_intensity': 500},
+        ]
+        with QueryCounter() as counter:
+            rv = self.client.post('/api/readings/batch', json=readings)
+        self.assertEqual(rv.status_code, 201)
+        result = rv.get_json()
+        self.assertEqual((result['inserted'], result['rejected']), (3, 3))
+        self.assertEqual([error['index'] for error in result['errors']], [2, 3, 4])
+        self.assertEqual(result['errors'][1]['error'], 'Garden not found')
+
+        with app.app_context():
+            stats = db.session.get(GardenStats, first_id)
+            self.assertEqual(stats.readings_count, 4)
+            self.assertEqual(stats.latest_timestamp, datetime(2030, 1, 1))
+            self.assertEqual(stats.latest_reading.temperature, 21.5)
+            self.assertEqual(stats.moisture_level_min, 10)
+            self.assertEqual(db.session.get(GardenStats, second_id).humidity_sum, 55)
+
+        # A larger batch costs the same number of statements
+        with QueryCounter() as larger:
+            self.client.post('/api/readings/batch', json=[
+                {'garden_id': first_id, 'moisture_level': 50, 'temperature': 20, 'light_intensity': 100}
+            ] * 50)
+        self.assertLessEqual(larger.count, counter.count)
+
+    def test_rows_sharing_a_timestamp_keep_the_last_as_latest(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=1)
+        with app.app_context():
+            rebuild_garden_stats([garden_id])
+            db.session.commit()
+        # No timestamps: every row is stamped with the same utcnow()
+        rv = self.client.post('/api/readings/batch', json=[
+            {'garden_id': garden_id, 'moisture_level': moisture, 'temperature': 20, 'light_intensity': 100}
+            for moisture in (10, 20, 30)
+        ])
+        self.assertEqual(rv.status_code, 201)
+
+        with app.app_context():
+            maintained = db.session.get(GardenStats, garden_id).latest_reading_id
+            rebuild_garden_stats([garden_id])
+            db.session.commit()
+            rebuilt = db.session.get(GardenStats, garden_id)
+            self.assertEqual(maintained, rebuilt.latest_reading_id)
+            self.assertEqual(rebuilt.latest_reading.moisture_level, 30)
+        gardens = self.client.get('/api/gardens').get_json()['gardens']
+        self.assertEqual(gardens[0]['latest_reading']['moisture_level'], 30)
+
+    def test_ndjson_and_rejected_batches(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        body = '\n'.join([
+            f'{{"garden_id": {garden_id}, "moisture_level": 40, "temperature": 20, "light_intensity": 100}}',
+            '{broken',
+            '',
+            f'{{"garden_id": {garden_id}, "moisture_level": 41, "temperature": 20, "light_intensity": 100}}',
+        ])
+        rv = self.client.post('/api/readings/batch', data=body, content_type='application/x-ndjson')
+        self.assertEqual(rv.status_code, 201)
+        self.assertEqual(rv.get_json()['inserted'], 2)
+        self.assertEqual(rv.get_json()['errors'], [{'index': 1, 'error': 'invalid JSON'}])
+
+        rv = self.client.post('/api/readings/batch', json=[{'garden_id': garden_id}])
+        self.assertEqual(rv.status_code, 400)
+        self.assertEqual(rv.get_json()['inserted'], 0)
+        self.assertEqual(self.client.post('/api/readings/batch', json={'a': 1}).status_code, 400)
+
+class WriteBehindIngestTestCase(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        app.config['INGEST_WRITE_BEHIND'] = True
+
+    def tearDown(self):
+        ingest_queue.stop()
+        app.config['INGEST_WRITE_BEHIND'] = False
+        super().tearDown()
+
+    def test_readings_are_queued_and_written_on_flush(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        reading = {'moisture_level': 40, 'temperature': 20, 'light_intensity': 100}
+        rv = self.client.post(f'/api/gardens/{garden_id}/readings', json=reading)
+        self.assertEqual(rv.status_code, 202)
+        self.assertIsNone(rv.get_json()['reading']['id'])
+        rv = self.client.post('/api/readings/batch', json=[dict(reading, garden_id=garden_id)] * 3)
+        self.assertEqual(rv.status_code, 202)
+        self.assertEqual(rv.get_json()['queued'], 3)
+
+        ingest_queue.stop()
+        with app.app_context():
+            self.assertEqual(PlantReading.query.filter_by(garden_id=garden_id).count(), 4)
+            self.assertEqual(db.session.get(GardenStats, garden_id).readings_count, 4)
+        self.assertEqual(self.get_metrics()['ingest_queue']['written'], 4)
+
+    def test_full_queue_answers_429(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        maxsize = ingest_queue.maxsize
+        ingest_queue.maxsize = 2
+        try:
+            rv = self.client.post('/api/readings/batch', json=[
+                {'garden_id': garden_id, 'moisture_level': 40, 'temperature': 20, 'light_intensity': 100}
+            ] * 3)
+        finally:
+            ingest_queue.maxsize = maxsize
+        self.assertEqual(rv.status_code, 429)
+        self.assertEqual(rv.headers['Retry-After'], '1')
+
+class AccessTrackingTestCase(ModelTestCase):
+    def last_accessed(self, garden_id):
+        with app.app_context():
+            return db.session.get(Garden, garden_id).last_accessed
+
+    def test_reads_record_access_in_memory_until_flushed(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        before = self.last_accessed(garden_id)
+        with StatementRecorder() as statements:
+            rv = self.client.get(f'/api/gardens/{garden_id}')
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(statements.writes(), [])
+        shown = datetime.fromisoformat(rv.get_json()['garden']['last_accessed'])
+        self.assertGreater(shown, before)
+        self.assertEqual(self.last_accessed(garden_id), before)
+
+        with app.app_context(), QueryCounter() as counter:
+            self.assertEqual(flush_access_times(), 1)
+            self.assertEqual(flush_access_times(), 0)
+        self.assertEqual(counter.count, 1)
+        self.assertEqual(self.last_accessed(garden_id), shown)
+
+    def test_parallel_readers_never_write(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=5)
+        readers, requests_per_reader = 8, 25
+        clients = []
+        for _ in range(readers):
+            client = app.test_client()
+            client.post('/api/login', json={'username': 'gardener', 'password': 'secret123'})
+            clients.append(client)
+        statuses = []
+
+        def read(client):
+            for _ in range(requests_per_reader):
+                statuses.append(client.get(f'/api/gardens/{garden_id}').status_code)
+
+        with StatementRecorder() as statements:
+            threads = [threading.Thread(target=read, args=(client,)) for client in clients]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(statuses, [200] * readers * requests_per_reader)
+        self.assertEqual(statements.writes(), [])
+        self.assertEqual(len(access_tracker), 1)
+
+class ColumnarJsonTestCase(ModelTestCase):
+    def test_readings_as_parallel_arrays(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=12)
+        rows = self.client.get(f'/api/gardens/{garden_id}/readings', query_string={'limit': 10}).get_json()
+        columns = self.client.get(f'/api/gardens/{garden_id}/readings',
+                                  query_string={'limit': 10, 'format': 'columnar'}).get_json()
+        self.assertEqual(columns['next_cursor'], rows['next_cursor'])
+        readings = columns['readings']
+        self.assertEqual(len(readings['id']), 10)
+        self.assertEqual(readings['id'], [row['id'] for row in rows['readings']])
+        self.assertEqual(readings['moisture_level'], [row['moisture_level'] for row in rows['readings']])
+        self.assertEqual(readings['timestamp'],
+                         [(datetime.fromisoformat(row['timestamp']) - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+                          for row in rows['readings']])
+
+        page = self.client.get(f'/api/gardens/{garden_id}/readings', query_string={'format': 'columnar'}).get_json()
+        self.assertEqual(len(page['readings']['timestamp']), 12)
+        self.assertEqual(page['total'], 12)
+
+    def test_export_and_garden_list(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=5)
+        self.create_garden(user_id, name='Empty')
+        export = self.client.get(f'/api/gardens/{garden_id}/export_data', query_string={'format': 'columnar'})
+        self.assertEqual(export.status_code, 200)
+        readings = export.get_json()['readings']
+        self.assertEqual(len(readings['timestamp']), 5)
+        self.assertEqual(readings['timestamp'], sorted(readings['timestamp']))
+        self.assertEqual(readings['is_manual'], [False] * 5)
+        self.assertEqual(sorted(readings['moisture_level'], reverse=True), readings['moisture_level'])
+
+        # Streamed a page of rows at a time, one column after another
+        with mock.patch('model.EXPORT_YIELD_PER', 2):
+            chunks = list(self.client.get(f'/api/gardens/{garden_id}/export_data',
+                                          query_string={'format': 'columnar'}).response)
+        self.assertEqual(app.json.loads(b''.join(chunks))['readings'], readings)
+        self.assertGreater(len(chunks), 3 * len(readings))
+        since = datetime.utcfromtimestamp(readings['timestamp'][3] / 1000).isoformat()
+        tail = self.client.get(f'/api/gardens/{garden_id}/export_data',
+                               query_string={'format': 'columnar', 'since': since}).get_json()['readings']
+        self.assertEqual(tail['moisture_level'], readings['moisture_level'][3:])
+        empty_id = self.client.get('/api/gardens').get_json()['gardens'][1]['id']
+        empty = self.client.get(f'/api/gardens/{empty_id}/export_data', query_string={'format': 'columnar'})
+        self.assertEqual(empty.get_json(), {'readings': {column: [] for column in readings}})
+
+        gardens = self.client.get('/api/gardens', query_string={'format': 'columnar'}).get_json()['gardens']
+        self.assertEqual(gardens['name'], ['Garden', 'Empty'])
+        self.assertEqual(gardens['readings_count'], [5, 0])
+        self.assertIsInstance(gardens['created_at'][0], int)
+
+    def test_export_columns_stay_even_when_rows_change_between_passes(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=5)
+        with app.app_context():
+            chunks = []
+            for chunk in iter_readings_columnar(garden_id):
+                chunks.append(chunk)
+                if chunk == ']' and chunks.count(']') == 1:
+                    # Another session deletes a reading once the first column is out
+                    with app.app_context():
+                        db.session.delete(PlantReading.query.filter_by(garden_id=garden_id).first())
+                        db.session.commit()
+        readings = app.json.loads(''.join(chunks))['readings']
+        self.assertEqual({len(values) for values in readings.values()}, {5})
+        self.assertEqual(self.client.get(f'/api/gardens/{garden_id}/readings').get_json()['total'], 4)
+
+    def test_fast_encoder_round_trips(self):
+        self.create_user()
+        rv = self.client.post('/api/gardens', json={'name': 'Ünïcode', 'sensor_type': 'manual'})
+        self.assertEqual(rv.get_json()['garden']['name'], 'Ünïcode')
+        with self.assertRaises(ValueError):
+            app.json.loads('{not json')
+
+class ReadingSeriesTestCase(ModelTestCase):
+    def test_series_is_downsampled_to_requested_points(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        start = datetime(2025, 6, 1)
+        with app.app_context():
+            for i in range(600):
+                db.session.add(PlantReading(garden_id=garden_id, timestamp=start + timedelta(minutes=i),
+                                            moisture_level=float(i // 60), temperature=20.0, light_intensity=500.0))
+            db.session.commit()
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/series', query_string={
+            'from': start.isoformat(), 'to': (start + timedelta(hours=10)).isoformat(), 'points': 10})
+        self.assertEqual(rv.status_code, 200)
+        series = rv.get_json()
+        self.assertEqual(series['slice_seconds'], 3600)
+        self.assertEqual(series['readings_count'], [60] * 10)
+        self.assertEqual(series['moisture_level'], [float(i) for i in range(10)])
+        self.assertEqual(series['timestamps'][1] - series['timestamps'][0], 3600 * 1000)
+        self.assertEqual(series['timestamps'][0], int((start - datetime(1970, 1, 1)).total_seconds() * 1000))
+        self.assertEqual(series['humidity'], [None] * 10)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/series', query_string={
+            'from': start.isoformat(), 'to': (start + timedelta(hours=10)).isoformat(), 'points': 7})
+        self.assertLessEqual(len(rv.get_json()['timestamps']), 7)
+        self.assertEqual(sum(rv.get_json()['readings_count']), 600)
+
+    def test_series_includes_compacted_history(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        now = datetime(2025, 6, 1)
+        with app.app_context():
+            for days in (100, 99, 1):
+                db.session.add(PlantReading(garden_id=garden_id, timestamp=now - timedelta(days=days),
+                                            moisture_level=days, temperature=20.0, light_intensity=500.0))
+            db.session.commit()
+            compact_readings(now=now)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/series', query_string={
+            'from': (now - timedelta(days=150)).isoformat(), 'to': now.isoformat(), 'points': 2})
+        series = rv.get_json()
+        self.assertEqual(series['readings_count'], [2, 1])
+        self.assertEqual(series['moisture_level'], [99.5, 1])
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/series', query_string={'points': 0})
+        self.assertEqual(rv.status_code, 400)
+
+class ColumnarFormatTestCase(ModelTestCase):
+    def round_trip(self, fmt, filename):
+        user_id = self.create_user()
+        source_id = self.create_garden(user_id, readings=40)
+        target_id = self.create_garden(user_id, name='Copy')
+
+        rv = self.client.get(f'/api/gardens/{source_id}/export_data', query_string={'format': fmt})
+        self.assertEqual(rv.status_code, 200)
+        payload = rv.data
+
+        rv = self.client.post(f'/api/gardens/{target_id}/import_data',
+                              data={'file': (io.BytesIO(payload), filename)},
+                              content_type='multipart/form-data')
+        self.assertEqual(rv.status_code, 200)
+        self.assertEqual(rv.get_json()['imported_count'], 40)
+
+        original = self.client.get(f'/api/gardens/{source_id}/export_data').get_data(as_text=True)
+        copied = self.client.get(f'/api/gardens/{target_id}/export_data').get_data(as_text=True)
+        self.assertEqual(original, copied)
+        return payload
+
+    def test_parquet_round_trip(self):
+        payload = self.round_trip('parquet', 'readings.parquet')
+        self.assertTrue(payload.startswith(b'PAR1'))
+
+    def test_arrow_round_trip(self):
+        self.round_trip('arrow', 'readings.arrows')
+
+    def test_arrow_file_import_skips_incomplete_rows(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        table = pa.table({
+            'timestamp': pa.array([datetime(2025, 1, 1, 12), datetime(2025, 1, 1, 13)]),
+            'moisture_level': [55.0, None],
+            'temperature': [20.0, 21.0],
+            'light_intensity': [400.0, 410.0],
+        })
+        sink = io.BytesIO()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        rv = self.client.post(f'/api/gardens/{garden_id}/import_data',
+                              data={'file': (io.BytesIO(sink.getvalue()), 'readings.arrow')},
+                              content_type='multipart/form-data')
+        result = rv.get_json()
+        self.assertEqual((result['imported_count'], result['skipped_count']), (1, 1))
+
+        rv = self.client.post(f'/api/gardens/{garden_id}/import_data',
+                              data={'file': (io.BytesIO(b'not parquet'), 'readings.parquet')},
+                              content_type='multipart/form-data')
+        self.assertEqual(rv.status_code, 400)
+
+    def upload(self, garden_id, table, filename='readings.arrows', batch_size=None):
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=batch_size):
+                writer.write_batch(batch)
+        return self.client.post(f'/api/gardens/{garden_id}/import_data',
+                                data={'file': (io.BytesIO(sink.getvalue()), filename)},
+                                content_type='multipart/form-data')
+
+    def test_bad_columns_are_rejected_before_anything_is_written(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        columns = {'moisture_level': [50.0] * 4, 'temperature': [20.0] * 4, 'light_intensity': [300.0] * 4}
+        rv = self.upload(garden_id, pa.table({'timestamp': ['2025-01-01T00:00:00'] * 4, **columns}), batch_size=2)
+        self.assertEqual(rv.status_code, 400)
+        self.assertIn('timestamp', rv.get_json()['error'])
+        self.assertEqual(self.client.get('/api/gardens').get_json()['gardens'][0]['readings_count'], 0)
+
+        # A timestamp Python cannot hold skips its row only; is_manual is kept as uploaded
+        table = pa.table({
+            'timestamp': pa.array([0, 1, 300000000000000000, 3], type=pa.timestamp('us')),
+            'is_manual': [False, True, False, False],
+            **columns,
+        })
+        rv = self.upload(garden_id, table, batch_size=2)
+        self.assertEqual(rv.status_code, 200)
+        result = rv.get_json()
+        self.assertEqual((result['imported_count'], result['skipped_count']), (3, 1))
+        self.assertEqual(result['errors'][0]['row'], 2)
+        with app.app_context():
+            self.assertEqual(sorted(reading.is_manual for reading in PlantReading.query.all()), [False, False, True])
+
+    def test_rollup_counts_batches_written_before_a_failure(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        table = pa.table({'moisture_level': [50.0] * 4, 'temperature': [20.0] * 4, 'light_intensity': [300.0] * 4})
+        read_batches = columnar.read_batches
+
+        def failing_after_one(*args):
+            yield next(read_batches(*args))
+            raise ValueError('Invalid arrow file: truncated')
+
+        with mock.patch('columnar.read_batches', failing_after_one):
+            rv = self.upload(garden_id, table, batch_size=2)
+        self.assertEqual(rv.status_code, 400)
+        with app.app_context():
+            self.assertEqual(PlantReading.query.count(), 2)
+            self.assertEqual(db.session.get(GardenStats, garden_id).readings_count, 2)
+
+class PredictionEndpointTestCase(ModelTestCase):
+    def test_single_and_batch_predictions_agree(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=30)
+        sparse_id = self.create_garden(user_id, name='Sparse', readings=2)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/prediction')
+        self.assertEqual(rv.status_code, 200)
+        prediction = rv.get_json()
+        # The helper's readings lose 0.01% a minute
+        self.assertAlmostEqual(prediction['moisture_trend_per_day'], -14.4, places=1)
+
+        rv = self.client.get(f'/api/gardens/{sparse_id}/prediction')
+        self.assertEqual(rv.get_json()['next_watering_estimate'], 'Not enough data')
+
+        rv = self.client.get('/api/gardens/predictions')
+        self.assertEqual(rv.status_code, 200)
+        predictions = rv.get_json()['predictions']
+        self.assertIsNone(predictions[str(sparse_id)])
+        self.assertEqual(predictions[str(garden_id)]['current_moisture'], prediction['current_moisture'])
+        self.assertEqual(predictions[str(garden_id)]['moisture_trend_per_day'],
+                         prediction['moisture_trend_per_day'])
+
+        for smoothing in (2, 0, 'abc', '', 'nan'):
+            rv = self.client.get(f'/api/gardens/{garden_id}/prediction', query_string={'smoothing': smoothing})
+            self.assertEqual(rv.status_code, 400, smoothing)
+        rv = self.client.get('/api/gardens/predictions', query_string={'smoothing': 'abc'})
+        self.assertEqual(rv.status_code, 400)
+        rv = self.client.get(f'/api/gardens/{garden_id}/prediction', query_string={'smoothing': '0.5'})
+        self.assertEqual(rv.status_code, 200)
+
+class PredictionCacheTestCase(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        prediction_cache.clear()
+
+    def cache_counts(self):
+        stats = self.get_metrics()['prediction_cache']
+        return stats['hits'], stats['misses']
+
+    def test_cache_hits_until_a_reading_lands(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=30)
+        hits, misses = self.cache_counts()
+
+        first = self.client.get(f'/api/gardens/{garden_id}/prediction').get_json()
+        second = self.client.get(f'/api/gardens/{garden_id}/prediction').get_json()
+        self.assertIn('current_moisture', first)
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache_counts(), (hits + 1, misses + 1))
+
+        # The batch endpoint shares the cache entry
+        self.client.get('/api/gardens/predictions')
+        self.assertEqual(self.cache_counts(), (hits + 2, misses + 1))
+
+        self.client.post(f'/api/gardens/{garden_id}/readings',
+                         json={'moisture_level': 40, 'temperature': 20, 'light_intensity': 500})
+        self.assertEqual(len(prediction_cache), 0)
+        third = self.client.get(f'/api/gardens/{garden_id}/prediction').get_json()
+        self.assertEqual(third['current_moisture'], 40)
+        self.assertEqual(self.cache_counts(), (hits + 2, misses + 2))
+
+class GardenStatsTestCase(ModelTestCase):
+    def create_api_garden(self, name='Stats garden'):
+        rv = self.client.post('/api/gardens', json={'name': name, 'sensor_type': 'manual'})
+        self.assertEqual(rv.status_code, 201)
+        return rv.get_json()['garden']['id']
+
+    def assert_stats_consistent(self, garden_id):
+        with app.app_context():
+            maintained = db.session.get(GardenStats, garden_id).to_dict()
+            rebuild_garden_stats([garden_id])
+            rebuilt = db.session.get(GardenStats, garden_id).to_dict()
+        self.assertEqual(maintained, rebuilt)
+        return maintained
+
+    def test_stats_follow_added_readings(self):
+        self.create_user()
+        garden_id = self.create_api_garden()
+        for moisture, humidity in ((60, None), (40, 50), (50, 70)):
+            reading = {'moisture_level': moisture, 'temperature': 20, 'light_intensity': 800}
+            if humidity:
+                reading['humidity'] = humidity
+            rv = self.client.post(f'/api/gardens/{garden_id}/readings', json=reading)
+            self.assertEqual(rv.status_code, 201)
+        latest_id = rv.get_json()['reading']['id']
+
+        stats = self.assert_stats_consistent(garden_id)
+        self.assertEqual(stats['readings_count'], 3)
+        self.assertEqual(stats['metrics']['moisture_level'], {'min': 40, 'max': 60, 'mean': 50})
+        self.assertEqual(stats['metrics']['humidity'], {'min': 50, 'max': 70, 'mean': 60})
+        self.assertIsNone(stats['metrics']['ph_level']['mean'])
+
+        garden = self.client.get(f'/api/gardens/{garden_id}').get_json()['garden']
+        self.assertEqual(garden['readings_count'], 3)
+        self.assertEqual(garden['latest_reading']['id'], latest_id)
+
+    def test_concurrent_readings_are_all_counted(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=2)
+        with app.app_context():
+            rebuild_garden_stats([garden_id])
+            db.session.commit()
+        add_reading = app.view_functions['gardens.add_reading']
+        headers = {'Authorization': f"Bearer {security.create_access_token({'sub': str(user_id)})}"}
+
+        def post(moisture):
+            reading = {'moisture_level': moisture, 'temperature': 20, 'light_intensity': 800}
+            with app.test_request_context(method='POST', json=reading, headers=headers):
+                rv, status = add_reading(garden_id=garden_id)
+            self.assertEqual(status, 201)
+
+        # Each app context has its own session; the first has read the rollup
+        # before the second commits a reading, as a concurrent request would
+        with app.app_context():
+            garden = db.session.get(Garden, garden_id)
+            self.assertEqual(garden.stats.readings_count, 2)
+            with app.app_context():
+                post(10)
+            post(90)
+
+        stats = self.assert_stats_consistent(garden_id)
+        self.assertEqual(stats['readings_count'], 4)
+        self.assertEqual((stats['metrics']['moisture_level']['min'], stats['metrics']['moisture_level']['max']),
+                         (10, 90))
+
+    def test_stats_follow_imported_readings(self):
+        self.create_user()
+        garden_id = self.create_api_garden()
+        csv_data = ('timestamp,moisture_level,temperature,light_intensity\n'
+                    '2025-07-06T10:00:00,60,23,900\n'
+                    'not-a-date,58,24,850\n'
+                    '2025-07-06T11:00:00,58,24,850\n')
+        rv = self.client.post(f'/api/gardens/{garden_id}/import_data',
+                              data={'file': (io.BytesIO(csv_data.encode()), 'readings.csv')},
+                              content_type='multipart/form-data')
+        self.assertEqual(rv.status_code, 200)
+        result = rv.get_json()
+        self.assertEqual((result['imported_count'], result['skipped_count']), (2, 1))
+        self.assertEqual(result['errors'][0]['line'], 3)
+
+        stats = self.assert_stats_consistent(garden_id)
+        self.assertEqual(stats['readings_count'], 2)
+        self.assertEqual(stats['latest_timestamp'], '2025-07-06T11:00:00')
+
+    def test_rebuild_repairs_drift(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id, readings=4)
+        with app.app_context():
+            db.session.add(GardenStats(garden_id=garden_id, readings_count=99))
+            db.session.commit()
+            self.assertEqual(rebuild_garden_stats(), 1)
+            db.session.commit()
+            self.assertEqual(db.session.get(GardenStats, garden_id).readings_count, 4)
+
+class SimulationTickTestCase(ModelTestCase):
+    def test_tick_adds_one_reading_per_simulated_garden(self):
+        user_id = self.create_user()
+        basic_id = self.create_garden(user_id, name='Basic', readings=3, sensor_type='simulated_basic')
+        full_id = self.create_garden(user_id, name='Full', sensor_type='simulated_full')
+        manual_id = self.create_garden(user_id, name='Manual', readings=3)
+
+        with app.app_context():
+            self.assertEqual(simulate_tick(rng=np.random.default_rng(0)), 2)
+            counts = dict(db.session.query(PlantReading.garden_id, db.func.count())
+                                    .group_by(PlantReading.garden_id).all())
+            self.assertEqual(counts, {basic_id: 4, full_id: 1, manual_id: 3})
+            full = PlantReading.query.filter_by(garden_id=full_id).one()
+            self.assertIsNotNone(full.humidity)
+            self.assertFalse(full.is_manual)
+            basic = db.session.get(GardenStats, basic_id)
+            self.assertEqual(basic.latest_reading.is_manual, False)
+            self.assertIsNone(basic.latest_reading.humidity)
+
+        # Rollups folded on the fly match a rebuild from the table
+        for garden_id in (basic_id, full_id):
+            with app.app_context():
+                maintained = db.session.get(GardenStats, garden_id).to_dict()
+                rebuild_garden_stats([garden_id])
+                self.assertEqual(maintained, db.session.get(GardenStats, garden_id).to_dict())
+
+    def test_tick_query_count_is_flat(self):
+        user_id = self.create_user()
+        for i in range(2):
+            self.create_garden(user_id, name=f'Few {i}', readings=4, sensor_type='simulated_basic')
+        with app.app_context():
+            rebuild_garden_stats()
+            db.session.commit()
+
+        def tick_queries():
+            with app.app_context(), QueryCounter() as counter:
+                simulate_tick()
+            return counter.count
+
+        few_queries = tick_queries()
+        for i in range(10):
+            self.create_garden(user_id, name=f'Many {i}', readings=4, sensor_type='simulated_basic')
+        with app.app_context():
+            rebuild_garden_stats()
+            db.session.commit()
+        self.assertEqual(tick_queries(), few_queries)
+
+    def test_scheduler_follows_owner_frequency(self):
+        user_id = self.create_user()
+        self.client.put('/api/profile', json={'preferences': {'simulation_frequency': 15}})
+        simulated_id = self.create_garden(user_id, sensor_type='simulated_full')
+        other_id = self.create_garden(user_id, name='Other', sensor_type='simulated_basic')
+        self.create_garden(user_id, name='Manual')
+
+        with app.app_context():
+            self.assertEqual(load_simulation_frequencies(), {simulated_id: 15, other_id: 15})
+            self.assertEqual(simulate_tick(garden_ids=[simulated_id]), 1)
+            self.assertEqual(PlantReading.query.filter_by(garden_id=other_id).count(), 0)
+
+        stats = self.get_metrics()['simulation']
+        self.assertFalse(stats['running'])
+        self.assertIn('lag_seconds', stats)
+
+    def test_seeded_tick_does_not_depend_on_the_batch(self):
+        user_id = self.create_user()
+        first_id = self.create_garden(user_id, name='First', sensor_type='simulated_full')
+        self.create_garden(user_id, name='Second', sensor_type='simulated_basic')
+        now = datetime(2025, 6, 1, 12, 0)
+
+        def first_reading(garden_ids):
+            with app.app_context():
+                simulate_tick(now=now, garden_ids=garden_ids)
+                reading = PlantReading.query.filter_by(garden_id=first_id).one().to_dict()
+                GardenStats.query.delete()
+                PlantReading.query.delete()
+                db.session.commit()
+            return {key: value for key, value in reading.items() if key != 'id'}
+
+        with mock.patch.dict(app.config, {'SIMULATION_SEED': 42}):
+            self.assertEqual(first_reading([first_id]), first_reading(None))
+        self.assertNotEqual(first_reading([first_id]), first_reading([first_id]))
+
+class SimulationBackfillTestCase(ModelTestCase):
+    def backfilled_values(self, seed):
+        with app.app_context():
+            written = backfill_simulation(datetime(2025, 6, 1), datetime(2025, 6, 2), timedelta(hours=1), seed=seed)
+            rows = db.session.query(PlantReading.garden_id, PlantReading.timestamp, PlantReading.moisture_level,
+                                    PlantReading.humidity).order_by(PlantReading.garden_id, PlantReading.timestamp).all()
+            stats = {garden_id: db.session.get(GardenStats, garden_id).readings_count for garden_id, *_ in rows}
+            PlantReading.query.delete()
+            db.session.commit()
+        return written, rows, stats
+
+    def test_backfill_is_bulk_and_reproducible(self):
+        user_id = self.create_user()
+        basic_id = self.create_garden(user_id, name='Basic', sensor_type='simulated_basic')
+        full_id = self.create_garden(user_id, name='Full', sensor_type='simulated_full')
+        self.create_garden(user_id, name='Manual')
+
+        with StatementRecorder() as recorder:
+            written, rows, stats = self.backfilled_values(seed=7)
+        self.assertEqual(written, 48)
+        self.assertEqual(stats, {basic_id: 24, full_id: 24})
+        self.assertEqual(rows[0][1], datetime(2025, 6, 1))
+        self.assertEqual(rows[23][1], datetime(2025, 6, 1, 23))
+        self.assertTrue(all(row[3] is None for row in rows if row[0] == basic_id))
+        self.assertTrue(all(row[3] is not None for row in rows if row[0] == full_id))
+        self.assertEqual(len([statement for statement in recorder.writes() if 'INSERT INTO plant_readings' in statement]), 1)
+
+        self.assertEqual(self.backfilled_values(seed=7)[1], rows)
+        self.assertNotEqual(self.backfilled_values(seed=8)[1], rows)
+
+    def test_backfill_command_creates_gardens(self):
+        self.create_user()
+        result = app.test_cli_runner().invoke(args=['simulate-backfill', '--days', '1', '--interval', '3600',
+                                                     '--create-gardens', '3', '--user', 'gardener', '--seed', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Wrote 72 simulated readings', result.output)
+        result = app.test_cli_runner().invoke(args=['simulate-backfill', '--create-gardens', '3'])
+        self.assertNotEqual(result.exit_code, 0)
+
+class RetentionTestCase(ModelTestCase):
+    NOW = datetime(2025, 6, 1, 12, 30)
+
+    def add_history(self, garden_id):
+        """Four readings two hours apart, 400 days back, plus one each 40 and 2 days back"""
+        ages = [timedelta(days=400, hours=h) for h in (0, 0.5, 2, 2.5)]
+        ages += [timedelta(days=40, minutes=10), timedelta(days=2)]
+        with app.app_context():
+            for i, age in enumerate(ages):
+                db.session.add(PlantReading(garden_id=garden_id, timestamp=self.NOW - age,
+                                            moisture_level=40 + i * 10, temperature=20.0,
+                                            light_intensity=500.0, humidity=60.0 if i == 0 else None))
+            db.session.commit()
+            rebuild_garden_stats([garden_id])
+            db.session.commit()
+            return db.session.get(GardenStats, garden_id).to_dict()
+
+    def test_compaction_moves_old_readings_into_tiers(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        before = self.add_history(garden_id)
+
+        with app.app_context():
+            self.assertEqual(compact_readings(now=self.NOW), (5, 4))
+            self.assertEqual(PlantReading.query.filter_by(garden_id=garden_id).count(), 1)
+            hourly = HourlyReadingAggregate.query.filter_by(garden_id=garden_id).all()
+            self.assertEqual([(a.bucket.day, a.readings_count) for a in hourly], [(22, 1)])
+            daily = DailyReadingAggregate.query.filter_by(garden_id=garden_id).one()
+            self.assertEqual(daily.readings_count, 4)
+            self.assertEqual((daily.moisture_level_min, daily.moisture_level_max), (40, 70))
+            self.assertEqual(daily.humidity_count, 1)
+
+            # Nothing is left to compact, and the rollup still covers every reading
+            self.assertEqual(compact_readings(now=self.NOW), (0, 0))
+            rebuild_garden_stats([garden_id])
+            self.assertEqual(db.session.get(GardenStats, garden_id).to_dict(), before)
+
+        # Readings pages list the one raw reading left, next to the count of all six
+        for params in ({}, {'limit': 10, 'with_total': 1}):
+            page = self.client.get(f'/api/gardens/{garden_id}/readings', query_string=params).get_json()
+            self.assertEqual((len(page['readings']), page['total'], page['readings_count']), (1, 1, 6))
+        garden = self.client.get(f'/api/gardens/{garden_id}').get_json()['garden']
+        self.assertEqual(garden['readings_count'], 6)
+
+    def test_aggregates_endpoint_spans_all_tiers(self):
+        user_id = self.create_user()
+        garden_id = self.create_garden(user_id)
+        self.add_history(garden_id)
+        with app.app_context():
+            compact_readings(now=self.NOW)
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/aggregates')
+        self.assertEqual(rv.status_code, 200)
+        data = rv.get_json()
+        self.assertEqual(data['resolution'], 'day')
+        self.assertEqual([b['readings_count'] for b in data['buckets']], [4, 1, 1])
+        self.assertEqual(data['buckets'][0]['moisture_level'], {'min': 40, 'max': 70, 'mean': 55})
+
+        since = (self.NOW - timedelta(days=41)).isoformat()
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/aggregates',
+                             query_string={'since': since, 'until': (self.NOW - timedelta(days=39)).isoformat()})
+        data = rv.get_json()
+        self.assertEqual(data['resolution'], 'hour')
+        self.assertEqual(len(data['buckets']), 1)
+        self.assertTrue(data['buckets'][0]['bucket'].endswith(':00:00'))
+
+        rv = self.client.get(f'/api/gardens/{garden_id}/readings/aggregates', query_string={'resolution': 'week'})
+        self.assertEqual(rv.status_code, 400)
+
+class MetricsTestCase(ModelTestCase):
+    def test_metrics_are_off_by_default_and_need_a_login(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 404)
+        with mock.patch.dict(app.config, METRICS_ENABLED=True):
+            self.assertEqual(self.client.get('/api/metrics').status_code, 401)
+            self.create_user()
+            rv = self.client.get('/api/metrics')
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn('pool', rv.get_json()['database'])
+        self.assertEqual(self.client.get('/api/metrics').status_code, 404)
+
+class SharedEngineTestCase(ModelTestCase):
+    def test_flask_app_uses_the_shared_engine(self):
+        import database
+        with app.app_context():
+            self.assertIs(db.engine, database.get_engine())
+            self.assertFalse(db.engine.echo)
+
+    def test_private_engine_hook_is_still_called(self):
+        # SharedEngineSQLAlchemy overrides Flask-SQLAlchemy's private _make_engine;
+        # this fails if an upgrade stops calling it
+        from flask import Flask
+        import database
+        from model import SharedEngineSQLAlchemy
+        other = Flask('other')
+        other.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI']
+        with mock.patch.object(SharedEngineSQLAlchemy, '_make_engine',
+                               autospec=True, side_effect=SharedEngineSQLAlchemy._make_engine) as hook:
+            other_db = SharedEngineSQLAlchemy(other)
+        hook.assert_called_once()
+        with other.app_context():
+            self.assertIs(other_db.engine, database.get_engine())
+
+        other = Flask('options')
+        other.config['SQLALCHEMY_DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI']
+        other.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 3}
+        with self.assertRaises(ValueError):
+            SharedEngineSQLAlchemy(other)
+
+class WeatherRouteTestCase(ModelTestCase):
+    def test_cached_upstream_response_and_simulated_fallback(self):
+        from weather import WeatherUnavailable
+        self.create_user()
+        self.assertEqual(self.client.get('/api/weather').status_code, 400)
+
+        calls = []
+        def current(location=None, lat=None, lon=None):
+            calls.append((location, lat, lon))
+            if location == 'Nowhere':
+                raise WeatherUnavailable('404 Client Error')
+            return {'name': location, 'main': {'temp': 18.0}}
+
+        with mock.patch.object(weather_service, 'api_key', 'key'), \
+             mock.patch.object(weather_service, 'current', current):
+            self.assertEqual(self.client.get('/api/weather?location=Cape Town').get_json()['main']['temp'], 18.0)
+            self.client.get('/api/weather?lat=-33.92&lon=18.42')
+            self.assertEqual(calls[-1], (None, -33.92, 18.42))
+            self.assertTrue(self.client.get('/api/weather?location=Nowhere').get_json()['simulated'])
+        self.assertIn('hit_ratio', self.get_metrics()['weather'])
+
+class WeatherPrefetchTestCase(ModelTestCase):
+    def test_one_fetch_per_grid_cell_served_by_garden_id(self):
+        from weather import location_key
+        self.create_user()
+        gardens = []
+        for name, lat, lon in (('A', -33.921, 18.424), ('B', -33.919, 18.4238), ('C', -26.2, 28.04), ('D', None, None)):
+            rv = self.client.post('/api/gardens', json={'name': name, 'sensor_type': 'manual',
+                                                         'location': 'Cape Town', 'location_lat': lat, 'location_lon': lon})
+            gardens.append(rv.get_json()['garden']['id'])
+
+        fetched = []
+        def fetch(key):
+            fetched.append(key)
+            return {'name': ','.join(str(part) for part in key[1:]), 'main': {'temp': 18.0}}
+
+        with mock.patch.object(weather_service, 'api_key', 'key'), \
+             mock.patch.object(weather_service, '_fetch', fetch):
+            with app.app_context():
+                self.assertEqual(prefetch_weather(), 2)
+            self.assertEqual(sorted(fetched), sorted([location_key(lat=-33.92, lon=18.42),
+                                                      location_key(lat=-26.2, lon=28.04)]))
+            weather_service.cache.clear()
+
+            for garden_id in gardens[:3]:
+                rv = self.client.get(f'/api/weather?garden_id={garden_id}')
+                self.assertEqual(rv.status_code, 200)
+                self.assertIn(rv.get_json()['name'], ('-33.92,18.42', '-26.2,28.04'))
+            self.assertEqual(len(fetched), 2)
+            # A garden without coordinates falls back to its place name
+            self.assertEqual(self.client.get(f'/api/weather?garden_id={gardens[3]}').get_json()['name'], 'cape town')
+
+            with app.app_context():
+                prefetch_weather()
+                self.assertEqual(WeatherSnapshot.query.count(), 2)
+
+        self.create_user('other')
+        self.assertEqual(self.client.get(f'/api/weather?garden_id={gardens[0]}').status_code, 404)
+
+class ReadingsIndexTestCase(ModelTestCase):
+    INDEX = 'ix_plant_readings_garden_timestamp'
+
+    def assert_uses_index(self, run, allow_final_sort=False):
+        with QueryRecorder() as recorder:
+            run()
+        self.assertTrue(recorder.statements)
+        for plan in recorder.plans():
+            details = '\n'.join(plan)
+            self.assertIn(self.INDEX, details)
+            self.assertNotIn('SCAN plant_readings', details)
+            if not allow_final_sort:
+                self.assertNotIn('TEMP B-TREE', details)
+            else:
+                # Only the last step may sort: ordering the few rows that survive the window
+                self.assertNotIn('TEMP B-TREE', '\n'.join(plan[:-1]))
+
+    def test_hot_queries_use_the_composite_index(self):
+        user_id = self.create_user()
+        garden_ids = [self.create_garden(user_id, name=f'Garden {i}', readings=5) for i in range(3)]
+
+        self.assert_uses_index(lambda: self.client.get(f'/api/gardens/{garden_ids[0]}/readings'))
+        self.assert_uses_index(lambda: self.client.get(f'/api/gardens/{garden_ids[0]}/readings', query_string={
+            'limit': 2, 'after': f'{datetime.utcnow().isoformat()},1'}))
+        self.assert_uses_index(lambda: self.client.get(f'/api/gardens/{garden_ids[0]}/export_data').data)
+        with app.app_context():
+            self.assert_uses_index(lambda: get_garden_summaries(garden_ids))
+            self.assert_uses_index(lambda: load_prediction_readings(garden_ids, datetime.utcnow() - timedelta(days=7)),
+                                   allow_final_sort=True)
+
+    def test_missing_index_is_created_on_existing_database(self):
+        with app.app_context():
+            db.session.execute(db.text(f'DROP INDEX {self.INDEX}'))
+            db.session.commit()
+            self.assertEqual(ensure_indexes(), [self.INDEX])
+            self.assertEqual(ensure_indexes(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from prediction import MIN_DAILY_DECLINE, predict_watering, predict_watering_batch
+
+NOW = datetime(2025, 7, 1, 12, 0, 0)
+
+def curve(func, hours, step_hours=1.0):
+    """Sample moisture = func(days ago) every step_hours, oldest first, ending at NOW"""
+    ages = [h * step_hours / 24 for h in reversed(range(hours))]
+    return [NOW - timedelta(days=age) for age in ages], [func(age) for age in ages]
+
+class PredictionTestCase(unittest.TestCase):
+    def test_linear_decline_uses_real_elapsed_time(self):
+        # 80% falling 5% per day; readings every 6 hours for two days
+        timestamps, moisture = curve(lambda age: 60 + 5 * age, 9, step_hours=6)
+        prediction = predict_watering(timestamps, moisture, threshold=30, now=NOW)
+        self.assertEqual(prediction['moisture_trend_per_day'], -5.0)
+        self.assertEqual(prediction['current_moisture'], 60)
+        self.assertEqual(prediction['days_until_watering'], 6.0)
+        self.assertEqual(prediction['recommendation'], 'Plant is healthy')
+
+        # Same curve sampled four times as often must give the same answer
+        dense = predict_watering(*curve(lambda age: 60 + 5 * age, 33, step_hours=1.5), threshold=30, now=NOW)
+        self.assertEqual(dense['days_until_watering'], 6.0)
+
+    def test_elapsed_time_since_latest_reading_is_subtracted(self):
+        timestamps, moisture = curve(lambda age: 40 + 10 * age, 5, step_hours=12)
+        prediction = predict_watering(timestamps, moisture, threshold=30, now=NOW + timedelta(hours=12))
+        self.assertEqual(prediction['days_until_watering'], 0.5)
+        self.assertEqual(prediction['recommendation'], 'Water soon')
+
+    def test_exponential_decay_tracks_local_slope(self):
+        # m(t) = 20 + 60 e^(-t/5) in days since watering; fit over the last day around t = 4
+        def moisture_at(age):
+            return 20 + 60 * math.exp(-(4 - age) / 5)
+        prediction = predict_watering(*curve(moisture_at, 25), threshold=30, now=NOW)
+        # A least-squares line over a convex curve matches its slope at the window midpoint (t = 3.5)
+        true_slope = -12 * math.exp(-3.5 / 5)
+        self.assertAlmostEqual(prediction['moisture_trend_per_day'], true_slope, delta=0.05)
+        # The linear extrapolation is a lower bound on the true crossing time (ln(6) * 5 - 4)
+        self.assertLess(prediction['days_until_watering'], 5 * math.log(6) - 4)
+
+    def test_smoothing_damps_a_noisy_latest_reading(self):
+        timestamps, moisture = curve(lambda age: 50.0, 10)
+        moisture[-1] = 80.0
+        raw = predict_watering(timestamps, moisture, threshold=30, now=NOW)
+        smoothed = predict_watering(timestamps, moisture, threshold=30, now=NOW, smoothing=0.3)
+        self.assertEqual(raw['current_moisture'], 80)
+        self.assertLess(smoothed['current_moisture'], 65)
+        self.assertGreater(smoothed['current_moisture'], 50)
+
+    def test_flat_trend_uses_minimum_decline(self):
+        timestamps, moisture = curve(lambda age: 50.0, 5)
+        prediction = predict_watering(timestamps, moisture, threshold=30, now=NOW)
+        self.assertEqual(prediction['days_until_watering'], 20 / MIN_DAILY_DECLINE)
+
+    def test_not_enough_data(self):
+        timestamps, moisture = curve(lambda age: 50 + age, 2)
+        self.assertIsNone(predict_watering(timestamps, moisture, threshold=30, now=NOW))
+        self.assertIsNone(predict_watering([NOW] * 4, [50, 49, 48, 47], threshold=30, now=NOW))
+        self.assertIsNone(predict_watering([], [], threshold=30, now=NOW))
+
+    def test_batch_matches_individual_predictions(self):
+        rng = np.random.default_rng(7)
+        garden_ids, timestamps, moisture, thresholds, expected = [], [], [], {}, {}
+        for garden_id in (3, 11, 12, 40):
+            rate = rng.uniform(1, 10)
+            stamps, values = curve(lambda age: 50 + rate * age + rng.normal(0, 1), 12 + garden_id % 5)
+            thresholds[garden_id] = 20 + garden_id % 15
+            expected[garden_id] = predict_watering(stamps, values, thresholds[garden_id], now=NOW, smoothing=0.5)
+            garden_ids += [garden_id] * len(values)
+            timestamps += stamps
+            moisture += values
+        garden_ids += [99, 99]
+        timestamps += [NOW, NOW]
+        moisture += [50, 50]
+        thresholds[99] = 30
+
+        batch = predict_watering_batch(garden_ids, timestamps, moisture, thresholds, now=NOW, smoothing=0.5)
+        self.assertIsNone(batch.pop(99))
+        self.assertEqual(batch, expected)
+
+if __name__ == '__main__':
+    unittest.main()
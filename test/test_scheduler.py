@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from scheduler import MIN_FREQUENCY, FileLock, PeriodicTask, SimulationScheduler
+
+class SchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.frequencies = {1: 10, 2: 30}
+        self.ticks = []
+        self.scheduler = SimulationScheduler(lambda: dict(self.frequencies),
+                                             lambda garden_ids, now: self.ticks.append((now, sorted(garden_ids))),
+                                             refresh_interval=1000, clock=lambda: 0.0)
+
+    def test_gardens_tick_at_their_own_frequency(self):
+        for now in range(0, 61, 5):
+            self.scheduler.run_pending(now)
+        self.assertEqual(self.ticks, [(0, [1, 2]), (10, [1]), (20, [1]), (30, [1, 2]),
+                                      (40, [1]), (50, [1]), (60, [1, 2])])
+        self.assertEqual(self.scheduler.next_due(), 70)
+        self.assertEqual(self.scheduler.seconds_until_next(60), 10)
+
+    def test_lag_is_reported_and_missed_ticks_are_skipped(self):
+        self.scheduler.run_pending(0)
+        self.scheduler.run_pending(12)
+        self.assertEqual(self.scheduler.stats()['lag_seconds']['last'], 2)
+        # Garden 1 is several periods late: one catch-up tick, then back on period
+        self.scheduler.run_pending(55)
+        self.assertEqual(self.ticks[-1], (55, [1, 2]))
+        self.assertEqual(self.scheduler.next_due(), 60)
+        lag = self.scheduler.stats()['lag_seconds']
+        self.assertEqual(lag['max'], 35)
+        self.assertEqual(self.scheduler.stats()['ticks'], 3)
+
+    def test_refresh_picks_up_new_gardens_and_frequencies(self):
+        self.scheduler.run_pending(0)
+        self.frequencies = {1: 1, 3: None}
+        self.scheduler.refresh(4)
+        self.scheduler.run_pending(4)
+        self.assertEqual(self.ticks[-1], (4, [3]))
+        # The minimum frequency applies to garden 1, measured from its last tick
+        self.assertEqual(self.scheduler.next_due(), MIN_FREQUENCY)
+        self.assertEqual(self.scheduler.stats()['gardens'], 2)
+
+class PeriodicTaskTestCase(unittest.TestCase):
+    def test_runs_once_per_interval(self):
+        calls = []
+        task = PeriodicTask(lambda: calls.append(1), interval=60, clock=lambda: 0.0)
+        self.assertEqual([task.run_pending(now) for now in (0, 30, 60, 61)], [True, False, True, False])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(task.seconds_until_next(100), 20)
+        self.assertEqual(task.stats()['runs'], 2)
+
+    def test_first_run_can_wait_an_interval(self):
+        calls = []
+        task = PeriodicTask(lambda: calls.append(1), interval=60, run_at_start=False, clock=lambda: 0.0)
+        self.assertEqual([task.run_pending(now) for now in (10, 30, 70)], [False, False, True])
+        self.assertEqual(task.seconds_until_next(70), 60)
+
+class FileLockTestCase(unittest.TestCase):
+    def test_only_one_holder(self):
+        fd, path = tempfile.mkstemp(suffix='.lock')
+        os.close(fd)
+        first, second = FileLock(path), FileLock(path)
+        try:
+            self.assertTrue(first.acquire())
+            self.assertFalse(second.acquire())
+            first.release()
+            self.assertTrue(second.acquire())
+            self.assertTrue(second.held)
+        finally:
+            first.release()
+            second.release()
+            os.unlink(path)
+
+if __name__ == '__main__':
+    unittest.main()
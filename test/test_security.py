@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+from datetime import timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')  # bearer tokens are disabled without one
+
+from jose import JWTError, jwt
+
+import security
+from security import (ACCESS_SCOPE, DEVICE_SCOPE, TokensDisabled, bearer_token, create_access_token,
+                      create_device_token, decode_access_token, token_cache)
+
+class TokenTestCase(unittest.TestCase):
+    def setUp(self):
+        token_cache.clear()
+
+    def test_access_and_device_tokens_carry_their_scope(self):
+        claims = decode_access_token(create_access_token({'sub': '7'}))
+        self.assertEqual((claims['sub'], claims['scope']), ('7', ACCESS_SCOPE))
+        claims = decode_access_token(create_device_token(7, 3, version=2))
+        self.assertEqual((claims['sub'], claims['scope'], claims['garden_id'], claims['ver']),
+                         ('7', DEVICE_SCOPE, 3, 2))
+
+    def test_claims_are_cached_per_token(self):
+        token = create_access_token({'sub': '1'})
+        with mock.patch.object(security.jwt, 'decode', wraps=jwt.decode) as decode:
+            for _ in range(3):
+                decode_access_token(token)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_bad_tokens_are_rejected(self):
+        token = create_access_token({'sub': '1'})
+        with self.assertRaises(JWTError):
+            decode_access_token(token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'))
+        with self.assertRaises(JWTError):
+            decode_access_token(create_access_token({'sub': '1'}, timedelta(seconds=-1)))
+        with self.assertRaises(JWTError):
+            decode_access_token(jwt.encode({'sub': '1'}, 'another key', algorithm=security.ALGORITHM))
+        with self.assertRaises(JWTError):
+            decode_access_token(create_access_token({'user': '1'}))
+        with self.assertRaises(JWTError):
+            decode_access_token(jwt.encode({'sub': '1'}, security.SECRET_KEY, algorithm=security.ALGORITHM))
+        self.assertEqual(len(token_cache), 0)
+
+    def test_no_tokens_without_a_secret_key(self):
+        token = create_access_token({'sub': '1'})
+        decode_access_token(token)  # cached
+        with mock.patch.object(security, 'SECRET_KEY', None):
+            with self.assertRaises(TokensDisabled):
+                create_access_token({'sub': '1'})
+            with self.assertRaises(JWTError):
+                decode_access_token(token)
+
+    def test_bearer_header_parsing(self):
+        self.assertEqual(bearer_token('Bearer abc'), 'abc')
+        self.assertEqual(bearer_token('bearer  abc '), 'abc')
+        for header in (None, '', 'Basic abc', 'Bearer'):
+            self.assertIsNone(bearer_token(header))
+
+if __name__ == '__main__':
+    unittest.main()
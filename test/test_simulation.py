@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from datetime import datetime, timedelta
+
+from simulation import garden_rng, simulate_readings, simulate_series, solar_hours, tick_draws
+
+class SimulationTestCase(unittest.TestCase):
+    def test_fresh_gardens_start_in_range(self):
+        values = simulate_readings({}, [False, True], hour=12, rng=np.random.default_rng(1))
+        self.assertTrue(np.all((values['moisture_level'] >= 40) & (values['moisture_level'] <= 80)))
+        self.assertTrue(np.all((values['temperature'] >= 18) & (values['temperature'] <= 25)))
+        self.assertTrue(np.all(values['light_intensity'] >= 500))
+        self.assertTrue(np.isnan(values['humidity'][0]))
+        self.assertTrue(45 <= values['humidity'][1] <= 75)
+        self.assertTrue(6.0 <= values['ph_level'][1] <= 7.5)
+
+    def test_readings_drift_from_previous_values(self):
+        size = 1000
+        previous = {
+            'moisture_level': [50.0] * size,
+            'temperature': [39.5] * size,
+            'light_intensity': [1000.0] * size,
+            'humidity': [60.0] * size,
+            'ph_level': [None] * size,
+        }
+        values = simulate_readings(previous, [True] * size, hour=0, rng=np.random.default_rng(2))
+        self.assertTrue(np.all(values['moisture_level'] <= 54.5))
+        self.assertTrue(np.all(values['moisture_level'] >= 43))
+        self.assertLess(values['moisture_level'].mean(), 50)
+        self.assertTrue(np.all(values['temperature'] <= 40))
+        # At night light eases from 1000 towards 0-100 lux
+        self.assertTrue(np.all(values['light_intensity'] < 800))
+        self.assertTrue(np.all(np.abs(values['humidity'] - 60) <= 3))
+        self.assertTrue(np.all((values['ph_level'] >= 6.0) & (values['ph_level'] <= 7.5)))
+
+    def test_seeded_generator_is_repeatable(self):
+        previous = {'moisture_level': [70.0, None], 'temperature': [20.0, None]}
+        first = simulate_readings(previous, [False, True], hour=9, rng=np.random.default_rng(3))
+        second = simulate_readings(previous, [False, True], hour=9, rng=np.random.default_rng(3))
+        for metric, values in first.items():
+            np.testing.assert_array_equal(values, second[metric])
+
+    def test_tick_draws_are_per_garden(self):
+        batch = tick_draws(42, [1, 2, 3], 1748779200)
+        np.testing.assert_array_equal(batch[1], tick_draws(42, [2], 1748779200)[0])
+        self.assertFalse(np.array_equal(batch[1], tick_draws(42, [2], 1748779260)[0]))
+        self.assertEqual(tick_draws(42, [], 0).shape, (0, batch.shape[1]))
+
+    def test_solar_hour_follows_longitude(self):
+        hours = solar_hours(datetime(2025, 6, 1, 12, 30), [0.0, 30.0, -150.0, None])
+        np.testing.assert_allclose(hours, [12.5, 14.5, 2.5, 12.5])
+
+    def series(self, chunk_steps):
+        rngs = [garden_rng(5, garden_id) for garden_id in (1, 2)]
+        chunks = list(simulate_series({}, [False, True], [0.0, 180.0], datetime(2025, 6, 1), timedelta(hours=1), 48,
+                                      rngs, chunk_steps=chunk_steps))
+        return {metric: np.concatenate([chunk[metric] for _, chunk in chunks])
+                for metric in ('moisture_level', 'light_intensity', 'humidity')}
+
+    def test_series_is_reproducible_whatever_the_chunking(self):
+        whole = self.series(chunk_steps=100)
+        chunked = self.series(chunk_steps=7)
+        for metric, values in whole.items():
+            self.assertEqual(values.shape, (48, 2))
+            np.testing.assert_array_equal(values, chunked[metric])
+        self.assertTrue(np.all(np.isnan(whole['humidity'][:, 0])))
+
+    def test_series_light_follows_the_simulated_day(self):
+        light = self.series(chunk_steps=None)['light_intensity']
+        # Garden 1 is at longitude 0 and garden 2 at 180: noon for one is midnight for the other
+        self.assertGreater(light[[12, 36], 0].min(), 300)
+        self.assertLess(light[[12, 36], 1].max(), 300)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'host'))
+
+from weather import WeatherService, WeatherUnavailable, location_key
+
+class StubWeatherServer:
+    """Local stand-in for OpenWeatherMap that counts requests and can be slowed down or failed"""
+    def __init__(self):
+        self.requests = []
+        self.delay = 0.0
+        self.status = 200
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                stub.requests.append(query)
+                stub.connections.add(self.client_address)
+                with lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.delay)
+                with lock:
+                    stub.in_flight -= 1
+                body = json.dumps({'name': query.get('q'), 'coord': {'lat': query.get('lat'), 'lon': query.get('lon')},
+                                   'main': {'temp': 21.5}}).encode()
+                try:
+                    self.send_response(stub.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    pass  # the client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/weather'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class WeatherServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubWeatherServer()
+        self.clock = FakeClock()
+        self.service = WeatherService('key', url=self.stub.url, ttl=600, stale_ttl=3600, timeout=2, clock=self.clock)
+
+    def tearDown(self):
+        self.service.session.close()
+        self.stub.close()
+
+    def test_location_keys_are_normalised(self):
+        self.assertEqual(location_key('  Cape   Town '), location_key('cape town'))
+        self.assertEqual(location_key(lat=-33.92491, lon=18.42406), location_key(lat=-33.9213, lon=18.4222))
+        with self.assertRaises(ValueError):
+            location_key()
+
+    def test_responses_are_cached_until_the_ttl(self):
+        self.assertEqual(self.service.current('Cape Town')['name'], 'cape town')
+        self.service.current('cape  town')
+        self.service.current(lat=-33.92, lon=18.42)
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(self.stub.requests[0]['appid'], 'key')
+        self.assertEqual(self.stub.requests[1]['lat'], '-33.92')
+
+        self.clock.now = 600
+        self.service.current('Cape Town')
+        self.assertEqual(len(self.stub.requests), 3)
+        stats = self.service.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(stats['upstream_requests'], 3)
+        self.assertIsNotNone(stats['upstream_seconds']['mean'])
+
+    def test_connections_are_reused(self):
+        for city in ('Durban', 'Pretoria', 'Soweto'):
+            self.service.current(city)
+        self.assertEqual(len(self.stub.connections), 1)
+
+    def test_concurrent_misses_make_one_upstream_request(self):
+        self.stub.delay = 0.2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.service.current('Nairobi')))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual([result['name'] for result in results], ['nairobi'] * 8)
+        self.assertEqual(self.service.stats()['coalesced'], 7)
+
+    def test_stale_response_is_served_when_the_upstream_fails(self):
+        self.service.current('Lagos')
+        self.stub.status = 503
+        self.clock.now = 601
+        self.assertEqual(self.service.current('Lagos')['name'], 'lagos')
+        self.assertEqual(self.service.stats()['stale'], 1)
+        self.assertEqual(self.service.stats()['errors'], 1)
+
+        self.clock.now = 3601
+        with self.assertRaises(WeatherUnavailable):
+            self.service.current('Lagos')
+
+    def test_refresh_many_bounds_requests_in_flight(self):
+        self.stub.delay = 0.05
+        keys = [location_key(lat=lat, lon=18.0) for lat in range(10)]
+        results = self.service.refresh_many(keys, concurrency=3)
+        self.assertEqual(set(results), set(keys))
+        self.assertEqual(len(self.stub.requests), 10)
+        self.assertLessEqual(self.stub.max_in_flight, 3)
+        # Refreshed entries are served from the cache
+        self.service.current(lat=5, lon=18)
+        self.assertEqual(len(self.stub.requests), 10)
+
+    def test_slow_upstream_times_out(self):
+        self.service.timeout = 0.1
+        self.stub.delay = 0.5
+        started = time.perf_counter()
+        with self.assertRaises(WeatherUnavailable):
+            self.service.current('Accra')
+        self.assertLess(time.perf_counter() - started, 0.45)
+
+if __name__ == '__main__':
+    unittest.main()